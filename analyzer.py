@@ -0,0 +1,1011 @@
+"""
+Cœur de l'analyseur YouTube, indépendant de Streamlit
+Récupération (métadonnées, transcriptions, commentaires), analyses IA et pipeline par vidéo
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Callable, Generator, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any
+
+import metrics
+from cache import CACHE_TTLS, DiskCache
+from llm import DEFAULT_MODEL, LLMCache, chat_completion, route_model, use_routes
+from structured import dump_result, load_result, structured_completion
+from tokens import count_tokens, pack, split_to_tokens, truncate_to_tokens
+from transcripts import TranscriptService, transcript_text
+from youtube_api import get_client as youtube_client
+from pipeline import BACKEND_LIMITS, backend_slot, bind_context, collect_warnings, warn
+from store import utc_timestamp
+
+if TYPE_CHECKING:
+    from groq import Groq
+
+    from store import Store
+
+    from transcript_index import TranscriptIndex
+
+# Résultat d'analyse : document JSON validé, ou texte (erreur, réponse non structurée, anciennes analyses)
+AnalysisResult = dict | str
+
+# ============================================================================
+# FONCTIONS UTILITAIRES
+# ============================================================================
+
+def extract_video_id(url: str) -> str | None:
+    """Extrait l'ID de la vidéo YouTube depuis différents formats d'URL."""
+    patterns = [
+        r'(?:youtube\.com\/watch\?v=|youtu\.be\/|youtube\.com\/embed\/)([a-zA-Z0-9_-]{11})',
+        r'youtube\.com\/shorts\/([a-zA-Z0-9_-]{11})',
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, url)
+        if match:
+            return match.group(1)
+    return None
+
+
+def parse_urls(text: str) -> list[str]:
+    """Parse les URLs depuis le texte (séparées par virgules ou retours à la ligne)."""
+    separators = re.split(r'[,\n]+', text)
+    urls = [url.strip() for url in separators if url.strip()]
+    return urls
+
+
+
+# ============================================================================
+# ÉTAPES PARTAGÉES (SYNCHRONE / ASYNCHRONE)
+# ============================================================================
+
+# Les étapes du pipeline sont des générateurs sans entrées/sorties, comme
+# `structured._structured_steps` : ils produisent les requêtes ci-dessous et
+# reçoivent leurs résultats (ou leurs exceptions). `run_steps` les exécute
+# dans le thread courant, `async_analyzer.run_steps` dans la boucle asyncio.
+
+Steps = Generator[Any, Any, Any]
+
+
+class Fetch:
+    """Appel GET à l'API YouTube Data ; l'exécuteur précharge la page suivante s'il y en a une."""
+
+    def __init__(self, endpoint: str, params: dict):
+        self.endpoint = endpoint
+        self.params = params
+
+    def key(self) -> tuple:
+        return self.endpoint, tuple(sorted(self.params.items()))
+
+
+class Offload:
+    """Calcul CPU ou accès SQLite, exécuté hors de la boucle d'événements en asynchrone."""
+
+    def __init__(self, function: Callable, *args):
+        self.function = function
+        self.args = args
+
+
+class Completion:
+    """Appel Groq : complétion validée par le schéma `schema` (structured.py), ou texte libre."""
+
+    def __init__(self, groq_client, prompt: str, max_tokens: int, temperature: float,
+                 cache: LLMCache | None, task: str, schema: str | None = None):
+        self.groq_client = groq_client
+        self.prompt = prompt
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.cache = cache
+        self.task = task
+        self.schema = schema
+
+
+class TranscriptFetch:
+    """Transcription horodatée d'une vidéo (pool du TranscriptService du lot s'il y en a un)."""
+
+    def __init__(self, video_id: str, channel_id: str | None, cache: DiskCache | None,
+                 service: TranscriptService | None, collector: metrics.Metrics | None = None):
+        self.video_id = video_id
+        self.channel_id = channel_id
+        self.cache = cache
+        self.service = service
+        self.collector = collector
+
+
+class Gather:
+    """Sous-étapes indépendantes, au plus `concurrency` à la fois ; renvoie leurs résultats dans l'ordre."""
+
+    def __init__(self, steps: list[Steps], concurrency: int):
+        self.steps = steps
+        self.concurrency = max(1, concurrency)
+
+
+def next_page_params(params: dict, data: dict) -> dict | None:
+    """Paramètres de la page suivante d'une réponse paginée, None à la dernière page."""
+    next_page_token = data.get("nextPageToken")
+    return {**params, "pageToken": next_page_token} if next_page_token else None
+
+
+def _youtube_get(endpoint: str, params: dict) -> dict:
+    with backend_slot("youtube"):
+        return youtube_client().get(endpoint, params)
+
+
+def run_steps(steps: Steps) -> Any:
+    """Exécute des étapes dans le thread courant et renvoie leur résultat."""
+    with ThreadPoolExecutor(max_workers=1) as prefetcher:
+        prefetched = {}
+        try:
+            request = next(steps)
+            while True:
+                try:
+                    value = _perform(request, prefetcher, prefetched)
+                except Exception as e:
+                    request = steps.throw(e)
+                else:
+                    request = steps.send(value)
+        except StopIteration as done:
+            return done.value
+        finally:
+            for pending in prefetched.values():
+                pending.cancel()
+
+
+def _perform(request, prefetcher: ThreadPoolExecutor, prefetched: dict) -> Any:
+    if isinstance(request, Offload):
+        return request.function(*request.args)
+    if isinstance(request, Fetch):
+        pending = prefetched.pop(request.key(), None)
+        data = pending.result() if pending is not None else _youtube_get(request.endpoint, request.params)
+        next_params = next_page_params(request.params, data)
+        if next_params is not None:
+            # Télécharge la page suivante pendant que les étapes traitent celle-ci
+            next_page = Fetch(request.endpoint, next_params)
+            prefetched[next_page.key()] = prefetcher.submit(bind_context(_youtube_get), request.endpoint,
+                                                            next_params)
+        return data
+    if isinstance(request, Completion):
+        if request.schema is not None:
+            return structured_completion(request.groq_client, request.prompt, request.schema,
+                                         max_tokens=request.max_tokens, temperature=request.temperature,
+                                         cache=request.cache, task=request.task)
+        return chat_completion(request.groq_client, request.prompt, max_tokens=request.max_tokens,
+                               temperature=request.temperature, cache=request.cache, task=request.task)
+    if isinstance(request, TranscriptFetch):
+        return get_transcript(request.video_id, request.cache, request.service, request.channel_id)
+    if isinstance(request, Gather):
+        if request.concurrency == 1 or len(request.steps) <= 1:
+            return [run_steps(steps) for steps in request.steps]
+        with ThreadPoolExecutor(max_workers=min(request.concurrency, len(request.steps))) as executor:
+            return list(executor.map(bind_context(run_steps), request.steps))
+    raise TypeError(f"requête d'étape inconnue: {request!r}")
+
+# Nombre maximal d'IDs acceptés par un appel videos.list de l'API YouTube
+VIDEOS_BATCH_SIZE = 50
+
+
+def parse_video_item(item: dict) -> dict:
+    """Extrait les champs utiles d'un élément renvoyé par l'endpoint videos."""
+    return {
+        "title": item["snippet"]["title"],
+        "channel": item["snippet"]["channelTitle"],
+        "channel_id": item["snippet"].get("channelId"),
+        "description": item["snippet"]["description"][:500],
+        "views": item["statistics"].get("viewCount", "N/A"),
+        "likes": item["statistics"].get("likeCount", "N/A"),
+        "comments_count": item["statistics"].get("commentCount", "N/A")
+    }
+
+
+def get_video_info(video_id: str, api_key: str, cache: DiskCache | None = None) -> dict | None:
+    """Récupère les informations de la vidéo via l'API YouTube."""
+    return run_steps(videos_info_steps([video_id], api_key, cache, stage="video_info")).get(video_id)
+
+
+def cached_videos_info(video_ids: list[str], cache: DiskCache | None) -> tuple[dict[str, dict], list[list[str]]]:
+    """Infos déjà en cache et lots (≤ 50 IDs) des vidéos restant à demander à l'API."""
+    infos = {}
+    missing = []
+    for video_id in dict.fromkeys(video_ids):
+        cached = cache.get("video_info", video_id) if cache is not None else None
+        if cached is not None:
+            infos[video_id] = cached
+            metrics.add(cache_hit=True)
+        else:
+            missing.append(video_id)
+    return infos, [missing[start:start + VIDEOS_BATCH_SIZE] for start in range(0, len(missing), VIDEOS_BATCH_SIZE)]
+
+
+def videos_params(batch: list[str], api_key: str) -> dict:
+    return {
+        "part": "snippet,statistics",
+        "id": ",".join(batch),
+        "key": api_key,
+        "maxResults": VIDEOS_BATCH_SIZE
+    }
+
+
+def remember_videos_info(data: dict, cache: DiskCache | None) -> dict[str, dict]:
+    """Infos extraites d'une réponse de l'endpoint videos, mises en cache."""
+    infos = {}
+    for item in data.get("items", []):
+        infos[item["id"]] = parse_video_item(item)
+        if cache is not None:
+            cache.set("video_info", item["id"], infos[item["id"]], CACHE_TTLS["video_info"])
+    return infos
+
+
+def videos_info_steps(video_ids: list[str], api_key: str, cache: DiskCache | None,
+                      stage: str = "video_info_batch") -> Steps:
+    """Étapes de `get_videos_info` : lots de 50 IDs demandés simultanément."""
+    with metrics.measure(stage):
+        infos, batches = yield Offload(cached_videos_info, video_ids, cache)
+        batch_steps = [_videos_batch_steps(batch, api_key, cache) for batch in batches]
+        for fetched in (yield Gather(batch_steps, BACKEND_LIMITS["youtube"])):
+            infos.update(fetched)
+    return infos
+
+
+def _videos_batch_steps(batch: list[str], api_key: str, cache: DiskCache | None) -> Steps:
+    try:
+        data = yield Fetch("videos", videos_params(batch, api_key))
+    except Exception as e:
+        warn(f"⚠️ Impossible de récupérer les infos vidéo: {e}")
+        return {}
+    return (yield Offload(remember_videos_info, data, cache))
+
+
+def get_videos_info(video_ids: list[str], api_key: str, cache: DiskCache | None = None) -> dict[str, dict]:
+    """Récupère les informations de plusieurs vidéos en ceil(N/50) appels à l'API YouTube."""
+    return run_steps(videos_info_steps(video_ids, api_key, cache))
+
+
+def get_transcript(video_id: str, cache: DiskCache | None = None, service: TranscriptService | None = None,
+                   channel_id: str | None = None) -> dict | None:
+    """Récupère la transcription horodatée de la vidéo (préchargée par le service du lot s'il y en a un)."""
+    if service is None:
+        service = TranscriptService(cache)
+    return service.get(video_id, channel_id)
+
+
+# Taille maximale d'une page commentThreads / comments de l'API YouTube
+COMMENTS_PAGE_SIZE = 100
+
+# Plafond configurable du nombre de commentaires récoltés par vidéo
+MAX_COMMENTS_LIMIT = 50_000
+
+
+def parse_comment(comment: dict, parent_id: str | None = None) -> dict:
+    """Extrait les champs utiles d'une ressource comment de l'API YouTube."""
+    snippet = comment["snippet"]
+    return {
+        "id": comment["id"],
+        "text": snippet["textDisplay"],
+        "author": snippet.get("authorDisplayName", ""),
+        "likes": snippet.get("likeCount", 0),
+        "published_at": snippet.get("publishedAt", ""),
+        "parent_id": parent_id,
+    }
+
+
+def iter_pages(endpoint: str, params: dict) -> Iterator[dict]:
+    """Parcourt toutes les pages d'un endpoint en préchargeant la page suivante."""
+    client = youtube_client()
+    with ThreadPoolExecutor(max_workers=1) as prefetcher:
+        fetch_page = bind_context(client.get)
+        pending = prefetcher.submit(fetch_page, endpoint, dict(params))
+        try:
+            while pending is not None:
+                data = pending.result()
+                params = next_page_params(params, data)
+                pending = None
+                if params is not None:
+                    # Télécharge la page suivante pendant que l'appelant traite celle-ci
+                    pending = prefetcher.submit(fetch_page, endpoint, params)
+                yield from data.get("items", [])
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+
+def comment_threads_params(video_id: str, api_key: str, include_replies: bool, order: str) -> dict:
+    return {
+        "part": "snippet,replies" if include_replies else "snippet",
+        "videoId": video_id,
+        "key": api_key,
+        "maxResults": COMMENTS_PAGE_SIZE,
+        "order": order,
+        "textFormat": "plainText"
+    }
+
+
+def replies_params(parent_id: str, api_key: str) -> dict:
+    return {
+        "part": "snippet",
+        "parentId": parent_id,
+        "key": api_key,
+        "maxResults": COMMENTS_PAGE_SIZE,
+        "textFormat": "plainText"
+    }
+
+
+def thread_replies(thread: dict, include_replies: bool) -> list[dict] | None:
+    """Réponses d'un fil déjà connues ([] si elles ne sont pas demandées), None s'il faut les paginer."""
+    if not include_replies:
+        return []
+    embedded = thread.get("replies", {}).get("comments", [])
+    if thread["snippet"].get("totalReplyCount", 0) > len(embedded):
+        # L'API n'inclut que quelques réponses par fil : la suite est sur l'endpoint comments
+        return None
+    parent_id = thread["snippet"]["topLevelComment"]["id"]
+    return [parse_comment(reply, parent_id) for reply in embedded]
+
+
+def comment_record(comment: dict) -> dict:
+    return {"id": comment["id"], "text": comment["text"], "published_at": comment["published_at"]}
+
+
+def cached_comments(cache: DiskCache | None, video_id: str, include_replies: bool,
+                    max_comments: int) -> list[dict] | None:
+    """Commentaires en cache suffisants pour la demande, sinon None."""
+    if cache is None:
+        return None
+    cached = cache.get("comments", f"{video_id}:{int(include_replies)}:records")
+    # Une récolte plus large (ou exhaustive) sert aussi les demandes plus petites
+    if cached is not None and (cached["complete"] or len(cached["comments"]) >= max_comments):
+        metrics.add(cache_hit=True)
+        return cached["comments"][:max_comments]
+    return None
+
+
+def remember_comments(cache: DiskCache | None, video_id: str, include_replies: bool, max_comments: int,
+                      comments: list[dict]):
+    """Met en cache une récolte complète (moins de commentaires que demandé = tous récupérés)."""
+    if cache is not None:
+        cache.set("comments", f"{video_id}:{int(include_replies)}:records",
+                  {"comments": comments, "complete": len(comments) < max_comments}, CACHE_TTLS["comments"])
+
+
+def is_new_comment(comment: dict, since: str, seen: set[str]) -> bool | None:
+    """Tri des commentaires parcourus du plus récent au plus ancien : nouveau (True), à écarter
+    (False), ou None au premier fil déjà connu, où la pagination s'arrête."""
+    if comment["parent_id"] is None and (comment["published_at"] <= since or comment["id"] in seen):
+        return None
+    return comment["published_at"] > since and comment["id"] not in seen
+
+
+def collect_comments_steps(video_id: str, api_key: str, max_comments: int, include_replies: bool,
+                           order: str = "relevance",
+                           keep: Callable[[dict], bool | None] | None = None) -> Steps:
+    """Étapes de récolte paginée des commentaires (et optionnellement de leurs réponses).
+
+    Renvoie (commentaires, complet). `keep` trie chaque commentaire parcouru :
+    gardé (True), écarté (False) ou fin de la récolte (None). En cas d'erreur
+    de l'API, les commentaires déjà reçus sont renvoyés avec `complet` à False.
+    """
+    max_comments = min(max_comments, MAX_COMMENTS_LIMIT)
+    records = []
+    visited = 0
+
+    def visit(comment: dict) -> bool:
+        """Trie un commentaire ; faux quand la récolte est terminée."""
+        nonlocal visited
+        kept = keep(comment) if keep is not None else True
+        if kept is None:
+            return False
+        if kept:
+            records.append(comment_record(comment))
+        visited += 1
+        return visited < max_comments
+
+    if max_comments <= 0:
+        return records, True
+    try:
+        params = comment_threads_params(video_id, api_key, include_replies, order)
+        while params is not None:
+            data = yield Fetch("commentThreads", params)
+            params = next_page_params(params, data)
+            for thread in data.get("items", []):
+                if not visit(parse_comment(thread["snippet"]["topLevelComment"])):
+                    return records, True
+                replies = thread_replies(thread, include_replies)
+                if replies is None:
+                    parent_id = thread["snippet"]["topLevelComment"]["id"]
+                    if not (yield from _replies_steps(parent_id, api_key, visit)):
+                        return records, True
+                elif not all(visit(reply) for reply in replies):
+                    return records, True
+    except Exception as e:
+        warn(f"⚠️ Commentaires non disponibles: {e}")
+        return records, False
+    return records, True
+
+
+def _replies_steps(parent_id: str, api_key: str, visit: Callable[[dict], bool]) -> Steps:
+    """Parcourt toutes les réponses d'un fil ; faux si `visit` a mis fin à la récolte."""
+    params = replies_params(parent_id, api_key)
+    while params is not None:
+        data = yield Fetch("comments", params)
+        params = next_page_params(params, data)
+        for item in data.get("items", []):
+            if not visit(parse_comment(item, parent_id)):
+                return False
+    return True
+
+
+def comments_steps(video_id: str, api_key: str, max_comments: int, include_replies: bool,
+                   cache: DiskCache | None) -> Steps:
+    """Étapes de `get_comments`."""
+    with metrics.measure("comments"):
+        cached = yield Offload(cached_comments, cache, video_id, include_replies, max_comments)
+        if cached is not None:
+            return cached, True
+        comments, complete = yield from collect_comments_steps(video_id, api_key, max_comments, include_replies)
+        if complete:
+            yield Offload(remember_comments, cache, video_id, include_replies, max_comments, comments)
+    return comments, complete
+
+
+def new_comments_steps(video_id: str, api_key: str, since: str, max_comments: int, include_replies: bool,
+                       seen: set[str] | None) -> Steps:
+    """Étapes de `get_new_comments`."""
+    seen = seen or set()
+    with metrics.measure("comments"):
+        return (yield from collect_comments_steps(video_id, api_key, max_comments, include_replies, order="time",
+                                                  keep=lambda comment: is_new_comment(comment, since, seen)))
+
+
+def get_comments(video_id: str, api_key: str, max_comments: int = 100,
+                 include_replies: bool = False, cache: DiskCache | None = None) -> tuple[list[dict], bool]:
+    """Récupère les commentaires de la vidéo via l'API YouTube ({"id", "text", "published_at"}).
+
+    Renvoie (commentaires, complet) : en cas d'erreur de l'API, les commentaires
+    déjà reçus sont renvoyés avec `complet` à False.
+    """
+    return run_steps(comments_steps(video_id, api_key, max_comments, include_replies, cache))
+
+
+def get_new_comments(video_id: str, api_key: str, since: str, max_comments: int = 100,
+                     include_replies: bool = False, seen: set[str] | None = None) -> tuple[list[dict], bool]:
+    """Récupère les commentaires publiés après `since` (horodatage ISO 8601 UTC).
+
+    Les fils sont parcourus du plus récent au plus ancien et la pagination
+    s'arrête au premier commentaire déjà vu : seules les nouveautés coûtent du
+    quota. Les identifiants de `seen` (déjà analysés) sont écartés. Renvoie
+    (commentaires, complet) comme `get_comments`.
+    """
+    return run_steps(new_comments_steps(video_id, api_key, since, max_comments, include_replies, seen))
+
+
+def truncate_text(text: str, max_tokens: int = 4000) -> str:
+    """Tronque le texte pour respecter la limite de tokens du modèle par défaut."""
+    truncated = truncate_to_tokens(text, max_tokens, DEFAULT_MODEL)
+    if len(truncated) < len(text):
+        return truncated + "..."
+    return text
+
+
+def smart_chunk_text(text: str, max_tokens: int = 4000, model: str = DEFAULT_MODEL) -> list[str]:
+    """Découpe intelligemment le texte en chunks respectant la limite de tokens du modèle destinataire."""
+    if count_tokens(text, model) <= max_tokens:
+        return [text]
+    
+    sentences = re.split(r'(?<=[.!?])\s+', text)
+    return list(split_to_tokens(sentences, max_tokens, model))
+
+
+# ============================================================================
+# FONCTIONS D'ANALYSE IA (GROQ)
+# ============================================================================
+
+# Budget (tokens) du texte envoyé à la passe finale des 10 points
+TRANSCRIPT_PROMPT_TOKENS = 5000
+
+# Budget (tokens) des passages sélectionnés quand une transcription longue n'est pas résumée par parties
+TRANSCRIPT_RETRIEVAL_TOKENS = 3500
+
+# Budgets (tokens) des commentaires envoyés à l'analyse d'audience et aux tendances
+COMMENTS_PROMPT_TOKENS = 3000
+TRENDS_PROMPT_TOKENS = 4500
+
+# Champs de l'analyse d'audience (schéma "comments", repris par la mise à jour incrémentale)
+COMMENTS_ANALYSIS_FIELDS = """- "sentiment": L'audience est-elle positive, négative ou mitigée?
+- "score": Note de sentiment de 0 (très négatif) à 10 (très positif)
+- "appreciated": Qu'est-ce que les gens aiment le plus?
+- "criticisms": Quelles sont les réserves ou critiques?
+- "questions": Y a-t-il des interrogations récurrentes?
+- "insights": Des réactions inattendues ou originales?"""
+
+# Note de sentiment des analyses texte produites avant le mode JSON
+SENTIMENT_SCORE_PATTERN = re.compile(r"Note\s*:\s*(\d+(?:[.,]\d+)?)\s*/\s*10", re.IGNORECASE)
+
+COMMENTS_ERROR_PREFIX = "Erreur lors de l'analyse des commentaires"
+COMMENTS_UNUSABLE = "Aucun commentaire exploitable pour cette vidéo (uniquement du spam ou des doublons)."
+
+# Map-reduce des transcriptions longues
+MAP_CHUNK_TOKENS = 4000
+MAP_SUMMARY_MAX_TOKENS = 600
+MAP_CONCURRENCY = 4
+
+
+def map_prompt(chunk: str, position: int, total: int, video_title: str) -> str:
+    """Prompt de l'étape map (partie `position`/`total` de la transcription)."""
+    return f"""Tu analyses la partie {position}/{total} de la transcription de la vidéo "{video_title}".
+Liste les faits, chiffres, affirmations et idées les plus surprenants ou méconnus de cette partie.
+
+RÈGLES:
+- Une puce par idée, phrases courtes et factuelles
+- Conserve les chiffres, noms et exemples précis
+- Base-toi UNIQUEMENT sur cette partie de la transcription
+
+PARTIE {position}/{total}:
+{chunk}"""
+
+
+def map_steps(transcript: str, video_title: str, groq_client: Groq, chunk_tokens: int, concurrency: int,
+              reduce_tokens: int, llm_cache: LLMCache | None) -> Steps:
+    """Étapes de `map_transcript_chunks` : parties résumées simultanément puis concaténées."""
+    chunks, summary_tokens = yield Offload(map_plan, transcript, chunk_tokens, reduce_tokens)
+    summaries = yield Gather([_summary_steps(chunk, position, len(chunks), video_title, groq_client,
+                                             summary_tokens, llm_cache)
+                              for position, chunk in enumerate(chunks, start=1)], concurrency)
+    return join_summaries(summaries)
+
+
+def _summary_steps(chunk: str, position: int, total: int, video_title: str, groq_client: Groq,
+                   max_tokens: int, llm_cache: LLMCache | None) -> Steps:
+    """Étape map : condense une partie de la transcription en faits saillants (None en cas d'échec)."""
+    try:
+        return (yield Completion(groq_client, map_prompt(chunk, position, total, video_title), max_tokens,
+                                 0.3, llm_cache, "map"))
+    except Exception as e:
+        warn(f"⚠️ Résumé de la partie {position}/{total} impossible: {e}")
+        return None
+
+
+def map_transcript_chunks(transcript: str, video_title: str, groq_client: Groq,
+                          chunk_tokens: int = MAP_CHUNK_TOKENS, concurrency: int = MAP_CONCURRENCY,
+                          reduce_tokens: int = TRANSCRIPT_PROMPT_TOKENS,
+                          llm_cache: LLMCache | None = None) -> str:
+    """Résume en parallèle chaque partie de la transcription et concatène les résumés."""
+    return run_steps(map_steps(transcript, video_title, groq_client, chunk_tokens, concurrency, reduce_tokens,
+                               llm_cache))
+
+
+def map_plan(transcript: str, chunk_tokens: int, reduce_tokens: int) -> tuple[list[str], int]:
+    """Parties de la transcription et budget de chaque résumé (sa part du budget de la passe reduce)."""
+    # Découpage compté pour le modèle qui résumera les parties
+    chunks = smart_chunk_text(transcript, max_tokens=chunk_tokens, model=route_model("map", chunk_tokens))
+    return chunks, max(150, min(MAP_SUMMARY_MAX_TOKENS, reduce_tokens // len(chunks)))
+
+
+def join_summaries(summaries: list[str | None]) -> str:
+    """Concatène les résumés obtenus (None pour une partie en échec)."""
+    if not any(summaries):
+        raise RuntimeError("aucune partie de la transcription n'a pu être résumée")
+    return "\n\n".join(
+        f"[Partie {position}/{len(summaries)}]\n{summary}"
+        for position, summary in enumerate(summaries, start=1) if summary
+    )
+
+
+def points_steps(transcript: dict, video_title: str, groq_client: Groq, llm_cache: LLMCache | None,
+                 map_reduce: bool, chunk_tokens: int, map_concurrency: int,
+                 on_update: Callable[[AnalysisResult], None] | None) -> Steps:
+    """Étapes de `analyze_transcript_10_points`."""
+    try:
+        index, text, source, summarize = yield Offload(points_source, transcript, video_title, map_reduce)
+        if summarize:
+            text = yield from map_steps(text, video_title, groq_client, chunk_tokens, map_concurrency,
+                                        TRANSCRIPT_PROMPT_TOKENS, llm_cache)
+        prompt = yield Offload(points_prompt, source, video_title, text)
+        result = yield Completion(groq_client, prompt, 2000, 0.7, llm_cache, "points", schema="points")
+    except Exception as e:
+        return f"Erreur lors de l'analyse: {e}"
+    return _published((yield Offload(locate_points, result, index)), on_update)
+
+
+def analyze_transcript_10_points(transcript: dict, video_title: str, groq_client: Groq,
+                                 llm_cache: LLMCache | None = None, map_reduce: bool = True,
+                                 chunk_tokens: int = MAP_CHUNK_TOKENS,
+                                 map_concurrency: int = MAP_CONCURRENCY,
+                                 on_update: Callable[[AnalysisResult], None] | None = None) -> AnalysisResult:
+    """Génère 10 points clés méconnus à partir de la transcription horodatée.
+
+    Renvoie {"points": [{"text", "start"}, ...]} (JSON validé, "start" étant
+    la position en secondes du passage d'origine quand il est retrouvé), ou un
+    texte en cas d'erreur ou de réponse non structurée. `on_update` reçoit le
+    résultat dès qu'il est prêt.
+    """
+    return run_steps(points_steps(transcript, video_title, groq_client, llm_cache, map_reduce, chunk_tokens,
+                                  map_concurrency, on_update))
+
+
+def points_source(transcript: dict, video_title: str, map_reduce: bool) -> tuple[TranscriptIndex, str, str, bool]:
+    """Indexe la transcription et choisit le texte des 10 points : (index, texte, description, à résumer).
+
+    Une transcription longue est à résumer par parties (map-reduce) ; sans
+    map-reduce, seuls ses passages les plus denses sont retenus plutôt que son début.
+    """
+    # NumPy chargé à la demande
+    from transcript_index import TranscriptIndex
+
+    text = transcript_text(transcript)
+    with metrics.measure("transcript_index"):
+        index = TranscriptIndex(transcript, model=DEFAULT_MODEL)
+    if count_tokens(text, DEFAULT_MODEL) <= TRANSCRIPT_PROMPT_TOKENS:
+        return index, text, "cette transcription", False
+    if map_reduce:
+        return index, text, "ces notes couvrant l'intégralité de la transcription", True
+    return index, index.select(TRANSCRIPT_RETRIEVAL_TOKENS, video_title), \
+        "ces passages de la transcription (datés [m:ss])", False
+
+
+def points_prompt(source: str, video_title: str, text: str) -> str:
+    """Prompt des 10 points ; `source` décrit le texte fourni (transcription, notes, passages)."""
+    truncated = truncate_text(text, max_tokens=TRANSCRIPT_PROMPT_TOKENS)
+    return f"""Tu es un expert en analyse de contenu. Analyse {source} de la vidéo "{video_title}" et extrais EXACTEMENT 10 points importants que peu de gens connaissent - des "pépites" d'information précieuses.
+
+RÈGLES STRICTES:
+- Exactement 10 points
+- Chaque point doit être une information surprenante, méconnue ou contre-intuitive
+- Sois concis mais informatif (2-3 phrases max par point)
+- Utilise un langage accessible
+- Base-toi UNIQUEMENT sur le contenu de la transcription
+
+TRANSCRIPTION:
+{truncated}"""
+
+
+def locate_points(result: AnalysisResult, index: TranscriptIndex) -> AnalysisResult:
+    """Date chaque point par le passage de la vidéo qui lui correspond le mieux."""
+    if isinstance(result, dict):
+        for point in result["points"]:
+            point["start"] = index.locate(point["text"])
+    return result
+
+
+def comment_lines(comments: list[str]) -> tuple[list[dict], str]:
+    """Écarte spam et copier-coller puis met en forme autant de commentaires distincts que le budget le permet."""
+    # NumPy chargé à la demande
+    from dedup import deduplicate_comments
+
+    with metrics.measure("dedup"):
+        entries, spam = deduplicate_comments(comments)
+        metrics.add(unique=len(entries), spam=spam)
+    lines = "\n".join(pack(
+        (f"- ({entry['count']}×) {entry['text'][:200]}" if entry["count"] > 1 else f"- {entry['text'][:200]}"
+         for entry in entries),
+        COMMENTS_PROMPT_TOKENS, DEFAULT_MODEL
+    ))
+    return entries, lines
+
+
+def _published(result: AnalysisResult, on_update: Callable[[AnalysisResult], None] | None) -> AnalysisResult:
+    """Publie le résultat d'une étape (affichage anticipé) puis le renvoie."""
+    if on_update is not None:
+        on_update(result)
+    return result
+
+
+def parse_sentiment_score(analysis: AnalysisResult) -> float | None:
+    """Note de sentiment (sur 10) : champ "score", ou "Note: X/10" dans une analyse texte historique."""
+    if isinstance(analysis, dict):
+        return analysis.get("score")
+    match = SENTIMENT_SCORE_PATTERN.search(analysis)
+    if match is None:
+        return None
+    return min(10.0, max(0.0, float(match.group(1).replace(",", "."))))
+
+
+def comments_prompt(video_title: str, entries: list[dict], comments: list[str], lines: str) -> str:
+    """Prompt de l'analyse d'audience (`lines` : commentaires distincts mis en forme par `comment_lines`)."""
+    return f"""Tu es un expert en analyse de sentiment et d'opinion. Analyse ces commentaires de la vidéo "{video_title}" et produis un résumé structuré de ce que l'audience exprime.
+
+COMMENTAIRES ({len(entries)} distincts sur {len(comments)}, "(N×)" indique un commentaire posté N fois):
+{lines}
+
+ANALYSE DEMANDÉE:
+{COMMENTS_ANALYSIS_FIELDS}
+
+Sois concis et factuel. Base-toi uniquement sur les commentaires fournis."""
+
+
+def comments_update_prompt(previous_analysis: AnalysisResult, video_title: str, entries: list[dict],
+                           new_comments: list[str], lines: str) -> str:
+    """Prompt de mise à jour d'une analyse d'audience avec les seuls nouveaux commentaires."""
+    return f"""Tu es un expert en analyse de sentiment et d'opinion. Voici l'analyse précédente des commentaires de la vidéo "{video_title}", puis les commentaires publiés depuis. Mets à jour l'analyse pour refléter l'ensemble de l'audience.
+
+ANALYSE PRÉCÉDENTE:
+{truncate_text(dump_result(previous_analysis), max_tokens=COMMENTS_PROMPT_TOKENS)}
+
+NOUVEAUX COMMENTAIRES ({len(entries)} distincts sur {len(new_comments)}, "(N×)" indique un commentaire posté N fois):
+{lines}
+
+CONSIGNES:
+- Produis l'analyse complète mise à jour, avec les mêmes champs:
+{COMMENTS_ANALYSIS_FIELDS}
+- Intègre les nouveaux éléments et signale brièvement ce qui a changé (sentiment, nouvelles critiques ou questions)
+- Ne retire un point précédent que s'il est contredit par les nouveaux commentaires
+
+Sois concis et factuel."""
+
+
+def analyze_comments_steps(comments: list[str], video_title: str, groq_client: Groq, llm_cache: LLMCache | None,
+                           on_update: Callable[[AnalysisResult], None] | None) -> Steps:
+    """Étapes de `analyze_comments`."""
+    if not comments:
+        return "Aucun commentaire disponible pour cette vidéo."
+
+    # Spam et copier-coller sont écartés avant de construire le prompt
+    entries, truncated = yield Offload(comment_lines, comments)
+    if not entries:
+        return COMMENTS_UNUSABLE
+
+    try:
+        prompt = yield Offload(comments_prompt, video_title, entries, comments, truncated)
+        result = yield Completion(groq_client, prompt, 1500, 0.7, llm_cache, "comments", schema="comments")
+    except Exception as e:
+        return f"{COMMENTS_ERROR_PREFIX}: {e}"
+    return _published(result, on_update)
+
+
+def analyze_comments(comments: list[str], video_title: str, groq_client: Groq,
+                     llm_cache: LLMCache | None = None,
+                     on_update: Callable[[AnalysisResult], None] | None = None) -> AnalysisResult:
+    """Analyse les commentaires et génère un résumé structuré de l'opinion de l'audience."""
+    return run_steps(analyze_comments_steps(comments, video_title, groq_client, llm_cache, on_update))
+
+
+def update_comments_steps(previous_analysis: AnalysisResult, new_comments: list[str], video_title: str,
+                          groq_client: Groq, llm_cache: LLMCache | None,
+                          on_update: Callable[[AnalysisResult], None] | None) -> Steps:
+    """Étapes de `update_comments_analysis`."""
+    entries, truncated = yield Offload(comment_lines, new_comments)
+    if not entries:
+        return previous_analysis
+
+    try:
+        prompt = yield Offload(comments_update_prompt, previous_analysis, video_title, entries, new_comments,
+                               truncated)
+        result = yield Completion(groq_client, prompt, 1500, 0.7, llm_cache, "comments", schema="comments")
+    except Exception as e:
+        return f"{COMMENTS_ERROR_PREFIX}: {e}"
+    return _published(result, on_update)
+
+
+def update_comments_analysis(previous_analysis: AnalysisResult, new_comments: list[str], video_title: str,
+                             groq_client: Groq, llm_cache: LLMCache | None = None,
+                             on_update: Callable[[AnalysisResult], None] | None = None) -> AnalysisResult:
+    """Met à jour une analyse précédente avec les seuls commentaires publiés depuis.
+
+    Le prompt ne contient que le résumé précédent et le delta, au lieu de
+    renvoyer tout l'échantillon à chaque exécution.
+    """
+    return run_steps(update_comments_steps(previous_analysis, new_comments, video_title, groq_client, llm_cache,
+                                           on_update))
+
+
+@metrics.timed("clustering")
+def cluster_trend_comments(all_comments: dict[str, list[str]]) -> list[dict] | None:
+    """Regroupe localement tous les commentaires en thèmes (None si le volume est trop faible)."""
+    # NumPy n'est chargé que lorsqu'un regroupement est réellement calculé
+    from clustering import MIN_COMMENTS_FOR_CLUSTERING, cluster_comments
+
+    if sum(len(comments) for comments in all_comments.values()) < MIN_COMMENTS_FOR_CLUSTERING:
+        return None
+    return cluster_comments(all_comments)
+
+
+def trends_prompt(all_comments: dict[str, list[str]], clusters: list[dict] | None = None) -> str:
+    """Prompt des tendances : thèmes regroupés s'ils sont fournis, sinon un échantillon par vidéo."""
+    if clusters:
+        from clustering import format_clusters
+
+        total = sum(len(comments) for comments in all_comments.values())
+        source_label = f"THÈMES ISSUS DU REGROUPEMENT DES {total} COMMENTAIRES DE {len(all_comments)} VIDÉOS"
+        combined_text = format_clusters(clusters, len(all_comments))
+    else:
+        source_label = "COMMENTAIRES DE PLUSIEURS VIDÉOS"
+        combined_text = ""
+        for video_title, comments in all_comments.items():
+            sample_comments = comments[:25]
+            combined_text += f"\n\n=== Commentaires de '{video_title}' ===\n"
+            combined_text += "\n".join([f"- {c[:200]}" for c in sample_comments])
+    
+    truncated = truncate_text(combined_text, max_tokens=TRENDS_PROMPT_TOKENS)
+    return f"""Tu es un expert en analyse de tendances sociales. Analyse les commentaires de PLUSIEURS vidéos YouTube et identifie les POINTS COMMUNS - ce que les différentes communautés expriment de similaire.
+
+{source_label}:
+{truncated}
+
+ANALYSE DEMANDÉE: une section par thème ci-dessous, dans cet ordre et avec ces titres. "items" résume les constats, "quotes" cite textuellement des commentaires (avec la vidéo d'origine si pertinent).
+
+1. "Tendances communes": Quels thèmes, opinions ou préoccupations reviennent dans TOUTES ou la plupart des vidéos? (2-3 citations)
+2. "Sentiments partagés": Y a-t-il des émotions ou réactions similaires? (1-2 citations représentatives)
+3. "Questions récurrentes": Des interrogations que l'on retrouve partout? (questions exactes posées par les commentateurs)
+4. "Points de désaccord": Des sujets où les communautés divergent? (exemples de commentaires opposés)
+5. "Verbatims marquants": 3-5 commentaires particulièrement représentatifs ou percutants qui résument bien l'opinion générale
+6. "Insight global": Quelle conclusion peut-on tirer sur ce que les audiences veulent/pensent?
+
+IMPORTANT: 
+- Concentre-toi UNIQUEMENT sur ce qui est COMMUN entre les différentes vidéos
+- Les citations doivent être des commentaires fournis, recopiés textuellement
+- Si des thèmes regroupés sont fournis, tiens compte de leur taille et du nombre de vidéos concernées"""
+
+
+def trends_steps(all_comments: dict[str, list[str]], groq_client: Groq, llm_cache: LLMCache | None,
+                 clusters: list[dict] | None) -> Steps:
+    """Étapes de `analyze_trends`."""
+    if len(all_comments) < 2:
+        return "Il faut au moins 2 vidéos pour identifier des tendances communes."
+
+    try:
+        prompt = yield Offload(trends_prompt, all_comments, clusters)
+        return (yield Completion(groq_client, prompt, 2000, 0.7, llm_cache, "trends", schema="trends"))
+    except Exception as e:
+        return f"Erreur lors de l'analyse des tendances: {e}"
+
+
+def analyze_trends(all_comments: dict[str, list[str]], groq_client: Groq,
+                   llm_cache: LLMCache | None = None,
+                   clusters: list[dict] | None = None) -> AnalysisResult:
+    """Identifie les tendances communes entre les commentaires de plusieurs vidéos.
+
+    Renvoie {"sections": [{"title", "items", "quotes"}, ...]} (JSON validé), ou
+    un texte en cas d'erreur ou de réponse non structurée.
+
+    Si `clusters` est fourni (voir `cluster_trend_comments`), seuls les résumés
+    des thèmes sont envoyés au LLM, ce qui couvre l'ensemble des commentaires ;
+    sinon un échantillon de chaque vidéo est utilisé.
+    """
+    return run_steps(trends_steps(all_comments, groq_client, llm_cache, clusters))
+
+
+# ============================================================================
+# PIPELINE PAR VIDÉO
+# ============================================================================
+
+def _stage_updates(job: dict, stage: str) -> Callable[[AnalysisResult], None] | None:
+    """Callback publiant le résultat d'une étape dès qu'il est prêt dans la file de mises à jour du job."""
+    updates = job.get("updates")
+    if updates is None:
+        return None
+    return lambda text: updates.put((job["index"], stage, text))
+
+
+def is_failed(analysis: AnalysisResult) -> bool:
+    """Vrai si l'analyse des commentaires a échoué (erreur de l'appel LLM)."""
+    return isinstance(analysis, str) and analysis.startswith(COMMENTS_ERROR_PREFIX)
+
+
+def is_recordable(analysis: AnalysisResult) -> bool:
+    """Vrai pour une analyse de commentaires réelle (ni erreur ni absence de commentaires exploitables)."""
+    if isinstance(analysis, dict):
+        return True
+    return analysis != COMMENTS_UNUSABLE and not is_failed(analysis)
+
+
+def video_comments_steps(job: dict, result: dict) -> Steps:
+    """Étapes de `analyze_video_comments`."""
+    video_id = result["video_id"]
+    store = job.get("store")
+    since = job.get("comments_since")
+    previous = (yield Offload(store.latest_comment_analysis, video_id)) if store is not None and since else None
+
+    if since:
+        # Synchronisation incrémentale : uniquement les commentaires postés depuis la dernière fois
+        seen = (yield Offload(store.seen_comment_ids, video_id)) if store is not None else None
+        records, complete = yield from new_comments_steps(video_id, job["youtube_api_key"], since,
+                                                          job["max_comments"], job["include_replies"], seen)
+    else:
+        records, complete = yield from comments_steps(video_id, job["youtube_api_key"], job["max_comments"],
+                                                      job["include_replies"], job.get("cache"))
+    comments = [record["text"] for record in records]
+    result["comments"] = comments
+    if not comments:
+        result["comments_synced"] = complete
+        if previous is not None:
+            result["sentiment_history"] = yield Offload(store.sentiment_history, video_id)
+        return
+
+    on_update = _stage_updates(job, "comments")
+    if previous is not None:
+        analysis = yield from update_comments_steps(load_result(previous["summary"]), comments, result["title"],
+                                                    job["groq_client"], job.get("llm_cache"), on_update)
+    else:
+        analysis = yield from analyze_comments_steps(comments, result["title"], job["groq_client"],
+                                                     job.get("llm_cache"), on_update)
+    yield Offload(record_comments_analysis, store, result, records, analysis)
+    result["comments_synced"] = complete and not is_failed(analysis)
+
+
+def analyze_video_comments(job: dict, result: dict):
+    """Récupère et analyse les commentaires d'une vidéo (étape de `process_video`).
+
+    Avec un `store` dans le job, l'analyse devient incrémentale : en
+    synchronisation incrémentale (`comments_since`), seuls les commentaires
+    jamais vus sont récupérés et le LLM met à jour le résumé précédent avec ce
+    delta. Chaque résumé est enregistré avec sa note de sentiment.
+    `comments_synced` n'est vrai que si les commentaires ont été entièrement
+    récupérés et analysés sans erreur (voir `sources.record_synced`).
+    """
+    run_steps(video_comments_steps(job, result))
+
+
+def record_comments_analysis(store: Store | None, result: dict, records: list[dict], analysis: AnalysisResult):
+    """Range l'analyse dans le résultat et l'enregistre (avec sa note) si c'est une analyse réelle."""
+    result["comments_analysis"] = analysis
+    result["sentiment"] = parse_sentiment_score(analysis)
+    if store is not None and is_recordable(analysis):
+        video_id = result["video_id"]
+        store.record_comment_analysis(video_id, [record["id"] for record in records], dump_result(analysis),
+                                      result["sentiment"], utc_timestamp())
+        result["sentiment_history"] = store.sentiment_history(video_id)
+
+
+def new_video_result(job: dict) -> dict:
+    """Résultat initial (vide) d'une vidéo, complété par `process_video`."""
+    video_id = job["video_id"]
+    return {
+        "index": job["index"],
+        "url": job["url"],
+        "video_id": video_id,
+        "info": None,
+        "title": f"Vidéo {video_id}",
+        "transcript_available": False,
+        "transcript_language": None,
+        "points": None,
+        "comments": [],
+        "comments_analysis": None,
+        "comments_since": job.get("comments_since"),
+        "comments_synced": False,
+        "sentiment": None,
+        "sentiment_history": [],
+        "warnings": [],
+        "metrics": [],
+    }
+
+
+def video_steps(job: dict) -> Steps:
+    """Étapes de `process_video` : métadonnées, transcription et 10 points, puis commentaires."""
+    video_id = job["video_id"]
+    result = new_video_result(job)
+
+    collector = job.get("metrics")
+    with collect_warnings() as messages, metrics.use(collector, video_id), use_routes(job.get("routes")):
+        if "info" in job:
+            video_info = job["info"]
+        else:
+            infos = yield from videos_info_steps([video_id], job["youtube_api_key"], job.get("cache"),
+                                                 stage="video_info")
+            video_info = infos.get(video_id)
+        if video_info:
+            result["info"] = video_info
+            result["title"] = video_info["title"]
+
+        transcript = yield TranscriptFetch(video_id, (video_info or {}).get("channel_id"), job.get("cache"),
+                                           job.get("transcripts"), collector)
+        if transcript:
+            result["transcript_available"] = True
+            result["transcript_language"] = transcript["language"]
+            result["points"] = yield from points_steps(
+                transcript, result["title"], job["groq_client"], job.get("llm_cache"),
+                map_reduce=job.get("map_reduce", True),
+                chunk_tokens=MAP_CHUNK_TOKENS,
+                map_concurrency=job.get("map_concurrency", MAP_CONCURRENCY),
+                on_update=_stage_updates(job, "points")
+            )
+
+        if job["analyze_comments"]:
+            yield from video_comments_steps(job, result)
+
+    result["warnings"] = messages
+    if collector is not None:
+        result["metrics"] = collector.for_video(video_id)
+    return result
+
+
+def process_video(job: dict) -> dict:
+    """Récupère et analyse une vidéo (exécuté dans un worker, sans appel Streamlit)."""
+    return run_steps(video_steps(job))
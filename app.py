@@ -4,10 +4,23 @@ Extrait transcriptions, commentaires, génère des résumés et identifie les te
 """
 
 import streamlit as st
-import requests
+import html
+import os
 import re
-from youtube_transcript_api import YouTubeTranscriptApi
-from groq import Groq
+import time
+import uuid
+
+from analyzer import MAP_CONCURRENCY, MAX_COMMENTS_LIMIT, parse_urls
+import metrics
+import render
+from cache import DiskCache
+from jobs import JobManager, is_active
+from llm import LLMCache, create_groq_client, model_stats, route_model
+from youtube_api import get_client as youtube_client
+from pipeline import set_warning_sink
+from scheduler import get_scheduler
+from sources import MAX_SOURCE_VIDEOS
+from store import Store
 
 # ============================================================================
 # CONFIGURATION DE LA PAGE
@@ -24,739 +37,349 @@ st.set_page_config(
 # CSS PERSONNALISÉ - DESIGN CLAIR ET LISIBLE
 # ============================================================================
 
-st.markdown("""
-<style>
-    /* Import Google Fonts */
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&family=JetBrains+Mono:wght@400;500&display=swap');
-    
-    /* Variables CSS - THÈME CLAIR */
-    :root {
-        --bg-main: #f8fafc;
-        --bg-card: #ffffff;
-        --bg-card-hover: #f1f5f9;
-        --accent-green: #10b981;
-        --accent-green-light: #d1fae5;
-        --accent-green-dark: #047857;
-        --accent-yellow: #f59e0b;
-        --accent-yellow-light: #fef3c7;
-        --accent-yellow-dark: #b45309;
-        --accent-blue: #3b82f6;
-        --accent-blue-light: #dbeafe;
-        --accent-blue-dark: #1d4ed8;
-        --accent-purple: #8b5cf6;
-        --accent-purple-light: #ede9fe;
-        --accent-purple-dark: #6d28d9;
-        --text-primary: #1e293b;
-        --text-secondary: #64748b;
-        --border-color: #e2e8f0;
-        --shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06);
-    }
-    
-    /* Global Styles */
-    .stApp {
-        background: var(--bg-main);
-        font-family: 'Inter', sans-serif;
-    }
-    
-    /* Hide Streamlit branding */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    header {visibility: hidden;}
-    
-    /* Main Header */
-    .main-header {
-        text-align: center;
-        padding: 2rem 0 3rem 0;
-        background: linear-gradient(135deg, #10b981 0%, #3b82f6 50%, #8b5cf6 100%);
-        border-radius: 0 0 30px 30px;
-        margin-bottom: 2rem;
-        box-shadow: var(--shadow);
-    }
-    
-    .main-title {
-        font-size: 3rem;
-        font-weight: 700;
-        color: #ffffff;
-        margin-bottom: 0.5rem;
-        letter-spacing: -1px;
-        text-shadow: 0 2px 4px rgba(0,0,0,0.1);
-    }
-    
-    .main-subtitle {
-        color: rgba(255,255,255,0.9);
-        font-size: 1.2rem;
-        font-weight: 400;
-    }
-    
-    /* Sidebar Styling */
-    section[data-testid="stSidebar"] {
-        background: #ffffff;
-        border-right: 1px solid var(--border-color);
-    }
-    
-    section[data-testid="stSidebar"] .stTextInput > div > div {
-        background: var(--bg-main);
-        border: 2px solid var(--border-color);
-        border-radius: 10px;
-        color: var(--text-primary);
-    }
-    
-    section[data-testid="stSidebar"] .stTextInput > div > div:focus-within {
-        border-color: var(--accent-green);
-        box-shadow: 0 0 0 3px var(--accent-green-light);
-    }
-    
-    /* Card Styles */
-    .result-card {
-        background: var(--bg-card);
-        border: 1px solid var(--border-color);
-        border-radius: 16px;
-        padding: 1.5rem;
-        margin-bottom: 1.5rem;
-        box-shadow: var(--shadow);
-        transition: all 0.3s ease;
-    }
-    
-    .result-card:hover {
-        box-shadow: 0 10px 25px -5px rgba(0, 0, 0, 0.1);
-        transform: translateY(-2px);
-    }
-    
-    .card-green {
-        border-left: 5px solid var(--accent-green);
-        background: linear-gradient(135deg, #ffffff 0%, #ecfdf5 100%);
-    }
-    
-    .card-yellow {
-        border-left: 5px solid var(--accent-yellow);
-        background: linear-gradient(135deg, #ffffff 0%, #fffbeb 100%);
-    }
-    
-    .card-blue {
-        border-left: 5px solid var(--accent-blue);
-        background: linear-gradient(135deg, #ffffff 0%, #eff6ff 100%);
-    }
-    
-    .card-purple {
-        border-left: 5px solid var(--accent-purple);
-        background: linear-gradient(135deg, #ffffff 0%, #f5f3ff 100%);
-    }
-    
-    /* Card Headers */
-    .card-header {
-        display: flex;
-        align-items: center;
-        gap: 12px;
-        margin-bottom: 1rem;
-        padding-bottom: 1rem;
-        border-bottom: 2px solid var(--border-color);
-    }
-    
-    .card-icon {
-        font-size: 1.8rem;
-    }
-    
-    .card-title {
-        font-size: 1.3rem;
-        font-weight: 700;
-        color: var(--text-primary);
-        margin: 0;
-    }
-    
-    .card-subtitle {
-        font-size: 0.85rem;
-        color: var(--text-secondary);
-        margin: 0;
-    }
-    
-    /* Badge Styles */
-    .badge {
-        display: inline-flex;
-        align-items: center;
-        gap: 6px;
-        padding: 6px 14px;
-        border-radius: 20px;
-        font-size: 0.75rem;
-        font-weight: 600;
-        text-transform: uppercase;
-        letter-spacing: 0.5px;
-    }
-    
-    .badge-green {
-        background: var(--accent-green-light);
-        color: var(--accent-green-dark);
-    }
-    
-    .badge-yellow {
-        background: var(--accent-yellow-light);
-        color: var(--accent-yellow-dark);
-    }
-    
-    .badge-blue {
-        background: var(--accent-blue-light);
-        color: var(--accent-blue-dark);
-    }
-    
-    .badge-purple {
-        background: var(--accent-purple-light);
-        color: var(--accent-purple-dark);
-    }
-    
-    /* Point List Styles */
-    .point-item {
-        display: flex;
-        gap: 14px;
-        padding: 14px 18px;
-        background: #f8fafc;
-        border-radius: 12px;
-        margin-bottom: 12px;
-        border: 1px solid var(--border-color);
-        transition: all 0.2s ease;
-    }
-    
-    .point-item:hover {
-        background: #f1f5f9;
-        border-color: var(--accent-green);
-    }
-    
-    .point-number {
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        width: 32px;
-        height: 32px;
-        background: var(--accent-green);
-        color: #ffffff;
-        border-radius: 10px;
-        font-weight: 700;
-        font-size: 0.9rem;
-        flex-shrink: 0;
-    }
-    
-    .point-text {
-        color: var(--text-primary);
-        line-height: 1.7;
-        font-size: 0.95rem;
-    }
-    
-    /* Comment Analysis Styles */
-    .comment-insight {
-        padding: 14px 18px;
-        background: var(--accent-yellow-light);
-        border-left: 4px solid var(--accent-yellow);
-        border-radius: 0 12px 12px 0;
-        margin-bottom: 12px;
-        color: var(--text-primary);
-        font-size: 0.95rem;
-        line-height: 1.7;
-    }
-    
-    /* Trend Styles */
-    .trend-item {
-        padding: 18px;
-        background: var(--accent-purple-light);
-        border: 2px solid var(--accent-purple);
-        border-radius: 12px;
-        margin-bottom: 14px;
-    }
-    
-    .trend-title {
-        color: var(--accent-purple-dark);
-        font-weight: 700;
-        margin-bottom: 10px;
-        font-size: 1.05rem;
-    }
-    
-    .trend-description {
-        color: var(--text-primary);
-        font-size: 0.95rem;
-        line-height: 1.7;
-    }
-    
-    /* Video Title Styles */
-    .video-title {
-        font-size: 1.2rem;
-        font-weight: 700;
-        color: var(--accent-blue-dark);
-        margin-bottom: 0.5rem;
-        display: flex;
-        align-items: center;
-        gap: 10px;
-    }
-    
-    .video-title::before {
-        content: "▶";
-        font-size: 0.9rem;
-        color: var(--accent-blue);
-    }
-    
-    /* Button Styles */
-    .stButton > button {
-        background: linear-gradient(135deg, var(--accent-green) 0%, #059669 100%);
-        color: #ffffff;
-        font-weight: 600;
-        border: none;
-        border-radius: 12px;
-        padding: 0.85rem 2rem;
-        font-size: 1.05rem;
-        transition: all 0.3s ease;
-        width: 100%;
-        box-shadow: 0 4px 14px rgba(16, 185, 129, 0.4);
-    }
-    
-    .stButton > button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 6px 20px rgba(16, 185, 129, 0.5);
-    }
-    
-    /* TextArea Styles */
-    .stTextArea > div > div > textarea {
-        background: #ffffff;
-        border: 2px solid var(--border-color);
-        border-radius: 12px;
-        color: var(--text-primary);
-        font-family: 'JetBrains Mono', monospace;
-        font-size: 0.9rem;
-    }
-    
-    .stTextArea > div > div > textarea:focus {
-        border-color: var(--accent-blue);
-        box-shadow: 0 0 0 3px var(--accent-blue-light);
-    }
-    
-    /* Divider */
-    hr {
-        border: none;
-        height: 2px;
-        background: linear-gradient(90deg, transparent, var(--border-color), transparent);
-        margin: 2rem 0;
-    }
-    
-    /* Stats Grid */
-    .stats-grid {
-        display: grid;
-        grid-template-columns: repeat(3, 1fr);
-        gap: 1rem;
-        margin-bottom: 1.5rem;
-    }
-    
-    .stat-item {
-        background: #ffffff;
-        border: 2px solid var(--border-color);
-        border-radius: 14px;
-        padding: 1.2rem;
-        text-align: center;
-        box-shadow: var(--shadow);
-    }
-    
-    .stat-value {
-        font-size: 1.6rem;
-        font-weight: 700;
-        color: var(--accent-green);
-    }
-    
-    .stat-label {
-        font-size: 0.8rem;
-        color: var(--text-secondary);
-        text-transform: uppercase;
-        letter-spacing: 0.5px;
-        font-weight: 600;
-    }
-    
-    /* Info Box */
-    .info-box {
-        background: var(--accent-blue-light);
-        border: 2px solid var(--accent-blue);
-        border-radius: 12px;
-        padding: 1rem;
-        color: var(--text-primary);
-        font-size: 0.9rem;
-        margin-bottom: 1rem;
-    }
-    
-    .info-box strong {
-        color: var(--accent-blue-dark);
-    }
-    
-    .info-box a {
-        color: var(--accent-blue-dark);
-        font-weight: 600;
-    }
-    
-    /* Warning Box */
-    .warning-box {
-        background: var(--accent-yellow-light);
-        border: 2px solid var(--accent-yellow);
-        border-radius: 12px;
-        padding: 1rem;
-        color: var(--text-primary);
-        font-size: 0.9rem;
-    }
-    
-    /* Success Box */
-    .success-box {
-        background: var(--accent-green-light);
-        border: 2px solid var(--accent-green);
-        border-radius: 12px;
-        padding: 1rem;
-        color: var(--text-primary);
-        font-size: 0.9rem;
-        font-weight: 500;
-    }
-</style>
-""", unsafe_allow_html=True)
+CSS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "style.css")
 
-# ============================================================================
-# FONCTIONS UTILITAIRES
-# ============================================================================
 
-def extract_video_id(url: str) -> str | None:
-    """Extrait l'ID de la vidéo YouTube depuis différents formats d'URL."""
-    patterns = [
-        r'(?:youtube\.com\/watch\?v=|youtu\.be\/|youtube\.com\/embed\/)([a-zA-Z0-9_-]{11})',
-        r'youtube\.com\/shorts\/([a-zA-Z0-9_-]{11})',
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
-    return None
-
-
-def parse_urls(text: str) -> list[str]:
-    """Parse les URLs depuis le texte (séparées par virgules ou retours à la ligne)."""
-    separators = re.split(r'[,\n]+', text)
-    urls = [url.strip() for url in separators if url.strip()]
-    return urls
-
-
-def get_video_info(video_id: str, api_key: str) -> dict | None:
-    """Récupère les informations de la vidéo via l'API YouTube."""
-    url = f"https://www.googleapis.com/youtube/v3/videos"
-    params = {
-        "part": "snippet,statistics",
-        "id": video_id,
-        "key": api_key
-    }
-    try:
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        if data.get("items"):
-            item = data["items"][0]
-            return {
-                "title": item["snippet"]["title"],
-                "channel": item["snippet"]["channelTitle"],
-                "description": item["snippet"]["description"][:500],
-                "views": item["statistics"].get("viewCount", "N/A"),
-                "likes": item["statistics"].get("likeCount", "N/A"),
-                "comments_count": item["statistics"].get("commentCount", "N/A")
-            }
-    except Exception as e:
-        st.warning(f"⚠️ Impossible de récupérer les infos vidéo: {e}")
-    return None
-
-
-def get_transcript(video_id: str) -> str | None:
-    """Récupère la transcription de la vidéo."""
-    try:
-        # Nouvelle API youtube-transcript-api v1.0+
-        ytt_api = YouTubeTranscriptApi()
-        
-        # Essaie d'abord en français, puis autres langues
-        languages_to_try = ['fr', 'en', 'es', 'de', 'it', 'pt']
-        
-        try:
-            transcript = ytt_api.fetch(video_id, languages=languages_to_try)
-        except Exception:
-            # Si échec avec langues spécifiques, essaie sans préférence
-            transcript = ytt_api.fetch(video_id)
-        
-        if transcript:
-            return " ".join([entry.text for entry in transcript])
-    except Exception as e:
-        st.warning(f"⚠️ Transcription non disponible: {e}")
-    return None
-
-
-def get_comments(video_id: str, api_key: str, max_comments: int = 100) -> list[str]:
-    """Récupère les commentaires de la vidéo via l'API YouTube."""
-    url = "https://www.googleapis.com/youtube/v3/commentThreads"
-    params = {
-        "part": "snippet",
-        "videoId": video_id,
-        "key": api_key,
-        "maxResults": min(max_comments, 100),
-        "order": "relevance",
-        "textFormat": "plainText"
-    }
-    comments = []
-    try:
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        for item in data.get("items", []):
-            comment_text = item["snippet"]["topLevelComment"]["snippet"]["textDisplay"]
-            comments.append(comment_text)
-    except Exception as e:
-        st.warning(f"⚠️ Commentaires non disponibles: {e}")
-    return comments
-
-
-def truncate_text(text: str, max_tokens: int = 4000) -> str:
-    """Tronque le texte pour respecter la limite de tokens (estimation: 1 token ≈ 4 chars)."""
-    max_chars = max_tokens * 4
-    if len(text) > max_chars:
-        return text[:max_chars] + "..."
-    return text
-
-
-def smart_chunk_text(text: str, max_tokens: int = 4000) -> list[str]:
-    """Découpe intelligemment le texte en chunks respectant la limite de tokens."""
-    max_chars = max_tokens * 4
-    if len(text) <= max_chars:
-        return [text]
-    
-    sentences = re.split(r'(?<=[.!?])\s+', text)
-    chunks = []
-    current_chunk = ""
-    
-    for sentence in sentences:
-        if len(current_chunk) + len(sentence) < max_chars:
-            current_chunk += sentence + " "
-        else:
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-            current_chunk = sentence + " "
-    
-    if current_chunk:
-        chunks.append(current_chunk.strip())
-    
-    return chunks
+@st.cache_resource
+def load_css() -> str:
+    """Lit et minifie style.css une seule fois par processus."""
+    with open(CSS_PATH, encoding="utf-8") as f:
+        css = f.read()
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.DOTALL)
+    css = re.sub(r"\s+", " ", css)
+    return re.sub(r"\s*([{};])\s*", r"\1", css).strip()
 
 
-# ============================================================================
-# FONCTIONS D'ANALYSE IA (GROQ)
-# ============================================================================
+st.markdown(f"<style>{load_css()}</style>", unsafe_allow_html=True)
 
-def analyze_transcript_10_points(transcript: str, video_title: str, groq_client: Groq) -> str:
-    """Génère 10 points clés méconnus à partir de la transcription."""
-    truncated = truncate_text(transcript, max_tokens=5000)
-    
-    prompt = f"""Tu es un expert en analyse de contenu. Analyse cette transcription de la vidéo "{video_title}" et extrais EXACTEMENT 10 points importants que peu de gens connaissent - des "pépites" d'information précieuses.
-
-RÈGLES STRICTES:
-- Exactement 10 points, numérotés de 1 à 10
-- Chaque point doit être une information surprenante, méconnue ou contre-intuitive
-- Sois concis mais informatif (2-3 phrases max par point)
-- Utilise un langage accessible
-- Base-toi UNIQUEMENT sur le contenu de la transcription
-
-TRANSCRIPTION:
-{truncated}
-
-FORMAT DE RÉPONSE (respecte exactement ce format):
-1. [Premier point]
-2. [Deuxième point]
-...
-10. [Dixième point]"""
-
-    try:
-        response = groq_client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=2000,
-            temperature=0.7
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        return f"Erreur lors de l'analyse: {e}"
+# Intervalle de relève de l'avancement d'une analyse en arrière-plan
+JOB_POLL_INTERVAL = 0.25
 
+JOB_STATUS_LABELS = {
+    "queued": "⏳",
+    "running": "🔄",
+    "done": "✅",
+    "failed": "❌",
+    "interrupted": "⚠️",
+}
 
-def analyze_comments(comments: list[str], video_title: str, groq_client: Groq) -> str:
-    """Analyse les commentaires et génère un résumé de l'opinion de l'audience."""
-    if not comments:
-        return "Aucun commentaire disponible pour cette vidéo."
-    
-    comments_text = "\n".join([f"- {c[:200]}" for c in comments[:50]])
-    truncated = truncate_text(comments_text, max_tokens=3000)
-    
-    prompt = f"""Tu es un expert en analyse de sentiment et d'opinion. Analyse ces commentaires de la vidéo "{video_title}" et produis un résumé structuré de ce que l'audience exprime.
-
-COMMENTAIRES:
-{truncated}
-
-ANALYSE DEMANDÉE:
-1. **Sentiment général**: L'audience est-elle positive, négative ou mitigée?
-2. **Points appréciés**: Qu'est-ce que les gens aiment le plus?
-3. **Critiques principales**: Quelles sont les réserves ou critiques?
-4. **Questions fréquentes**: Y a-t-il des interrogations récurrentes?
-5. **Insights surprenants**: Des réactions inattendues ou originales?
-
-Sois concis et factuel. Base-toi uniquement sur les commentaires fournis."""
-
-    try:
-        response = groq_client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=1500,
-            temperature=0.7
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        return f"Erreur lors de l'analyse des commentaires: {e}"
+# ============================================================================
+# FONCTIONS UTILITAIRES
+# ============================================================================
 
+@st.cache_resource
+def get_disk_cache() -> DiskCache:
+    """Cache disque partagé par toutes les sessions du processus."""
+    return DiskCache()
 
-def analyze_trends(all_comments: dict[str, list[str]], groq_client: Groq) -> str:
-    """Identifie les tendances communes entre les commentaires de plusieurs vidéos."""
-    if len(all_comments) < 2:
-        return "Il faut au moins 2 vidéos pour identifier des tendances communes."
-    
-    combined_text = ""
-    for video_title, comments in all_comments.items():
-        sample_comments = comments[:25]
-        combined_text += f"\n\n=== Commentaires de '{video_title}' ===\n"
-        combined_text += "\n".join([f"- {c[:200]}" for c in sample_comments])
-    
-    truncated = truncate_text(combined_text, max_tokens=4500)
-    
-    prompt = f"""Tu es un expert en analyse de tendances sociales. Analyse les commentaires de PLUSIEURS vidéos YouTube et identifie les POINTS COMMUNS - ce que les différentes communautés expriment de similaire.
 
-COMMENTAIRES DE PLUSIEURS VIDÉOS:
-{truncated}
+@st.cache_resource
+def get_store() -> Store:
+    """Base de suivi des chaînes/playlists et des synchronisations, partagée par les sessions."""
+    return Store()
 
-ANALYSE DEMANDÉE (IMPORTANT - inclus des citations exactes de commentaires pour illustrer):
 
-1. **Tendances communes**: Quels thèmes, opinions ou préoccupations reviennent dans TOUTES ou la plupart des vidéos?
-   → Cite 2-3 commentaires textuellement entre guillemets pour illustrer
+@st.cache_resource
+def get_job_manager() -> JobManager:
+    """Workers d'analyse partagés par toutes les sessions (les lots survivent aux reconnexions)."""
+    return JobManager(get_store())
 
-2. **Sentiments partagés**: Y a-t-il des émotions ou réactions similaires?
-   → Cite 1-2 commentaires représentatifs entre guillemets
 
-3. **Questions récurrentes**: Des interrogations que l'on retrouve partout?
-   → Cite les questions exactes posées par les commentateurs
+@st.cache_resource
+def get_llm_cache() -> LLMCache:
+    """Cache des réponses LLM (LRU en mémoire + persistance dans le cache disque)."""
+    return LLMCache(backing=get_disk_cache())
 
-4. **Points de désaccord**: Des sujets où les communautés divergent?
-   → Cite des exemples de commentaires opposés
 
-5. **Verbatims marquants**: Cite 3-5 commentaires particulièrement représentatifs ou percutants qui résument bien l'opinion générale (entre guillemets, avec le contexte)
+@st.cache_resource(show_spinner=False)
+def get_groq_client(api_key: str):
+    """Client Groq réutilisé entre les reruns (import de groq au premier usage)."""
+    return create_groq_client(api_key)
 
-6. **Insight global**: Quelle conclusion peut-on tirer sur ce que les audiences veulent/pensent?
 
-IMPORTANT: 
-- Concentre-toi UNIQUEMENT sur ce qui est COMMUN entre les différentes vidéos
-- CITE TEXTUELLEMENT des commentaires entre guillemets "..." pour appuyer chaque point
-- Indique de quelle vidéo vient chaque citation si pertinent"""
+def session_owner() -> str:
+    """Propriétaire des analyses de la session, gardé dans l'URL (?owner=...) pour survivre à une reconnexion.
 
-    try:
-        response = groq_client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=2000,
-            temperature=0.7
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        return f"Erreur lors de l'analyse des tendances: {e}"
+    Seul ce propriétaire peut rouvrir une analyse (`JobManager.get`) : partager
+    le lien complet, ?owner=... compris, donne accès à ses résultats.
+    """
+    owner = st.session_state.get("owner") or st.query_params.get("owner") or uuid.uuid4().hex
+    st.session_state["owner"] = owner
+    st.query_params["owner"] = owner
+    return owner
 
 
 # ============================================================================
 # FONCTIONS D'AFFICHAGE
 # ============================================================================
 
-def display_10_points(analysis: str, video_title: str):
-    """Affiche les 10 points dans des cartes stylisées."""
+def create_video_slots(index: int, total: int, url: str, video_id: str, video_info: dict | None) -> dict:
+    """Affiche l'en-tête d'une vidéo et réserve les emplacements de ses résultats."""
+    title = video_info["title"] if video_info else f"Vidéo {video_id}"
+    st.markdown("---")
     st.markdown(f"""
-    <div class="result-card card-green">
-        <div class="card-header">
-            <span class="card-icon">💎</span>
-            <div>
-                <p class="card-title">10 Pépites Méconnues</p>
-                <p class="card-subtitle">{video_title}</p>
-            </div>
-            <span class="badge badge-green" style="margin-left: auto;">TRANSCRIPTION</span>
-        </div>
+    <div class="video-title">{html.escape(title)}</div>
     """, unsafe_allow_html=True)
-    
-    lines = analysis.strip().split('\n')
-    for line in lines:
-        line = line.strip()
-        if line and re.match(r'^\d+\.', line):
-            match = re.match(r'^(\d+)\.\s*(.+)', line)
-            if match:
-                num, text = match.groups()
-                st.markdown(f"""
-                <div class="point-item">
-                    <span class="point-number">{num}</span>
-                    <span class="point-text">{text}</span>
-                </div>
-                """, unsafe_allow_html=True)
-    
-    st.markdown("</div>", unsafe_allow_html=True)
 
+    if video_info:
+        st.markdown(f"""
+        <div style="color: var(--text-secondary); font-size: 0.85rem; margin-bottom: 1rem;">
+            📺 {html.escape(video_info['channel'])} • 👁️ {int(video_info['views']):,} vues • 💬 {video_info['comments_count']} commentaires • 🎞️ Vidéo {index + 1}/{total}
+        </div>
+        """, unsafe_allow_html=True)
 
-def display_comments_analysis(analysis: str, video_title: str):
-    """Affiche l'analyse des commentaires."""
-    st.markdown(f"""
-    <div class="result-card card-yellow">
-        <div class="card-header">
-            <span class="card-icon">💬</span>
-            <div>
-                <p class="card-title">Analyse des Commentaires</p>
-                <p class="card-subtitle">{video_title}</p>
-            </div>
-            <span class="badge badge-yellow" style="margin-left: auto;">AUDIENCE</span>
+    slots = {
+        "title": title,
+        "video_id": video_id,
+        "warnings": st.empty(),
+        "points": st.empty(),
+        "comments": st.empty(),
+        "sentiment": st.empty(),
+        "metrics": st.empty(),
+    }
+    slots["points"].caption(f"⏳ En attente d'analyse: {url}")
+    return slots
+
+
+def display_stage_update(slots: dict, stage: str, analysis):
+    """Affiche le résultat d'une étape terminée avant la fin de sa vidéo."""
+    if stage == "points":
+        card = render.points_card(analysis, slots["title"], slots["video_id"])
+    else:
+        card = render.comments_card(analysis, slots["title"])
+    slots[stage].markdown(card, unsafe_allow_html=True)
+
+
+def display_video_metrics(samples: list[dict], slot):
+    """Affiche le panneau repliable des temps, octets et tokens d'une vidéo."""
+    if not samples:
+        return
+    rows = [
+        {
+            "étape": sample["stage"],
+            "durée (ms)": round(1000 * sample["seconds"], 1),
+            "attente (ms)": round(1000 * sample.get("queue_seconds", 0), 1),
+            "octets": sample.get("bytes", 0),
+            "tokens prompt": sample.get("prompt_tokens", 0),
+            "tokens réponse": sample.get("completion_tokens", 0),
+            "cache": "✅" if sample.get("cache_hit") else "",
+        }
+        for sample in samples
+    ]
+    total = sum(sample["seconds"] for sample in samples)
+    with slot.container():
+        with st.expander(f"⏱️ Temps et tokens ({total:.1f} s cumulées)"):
+            st.dataframe(rows, use_container_width=True)
+
+
+def display_sentiment_history(history: list[dict], slot):
+    """Affiche l'évolution de la note de sentiment au fil des analyses incrémentales."""
+    points = [entry for entry in history if entry["sentiment"] is not None]
+    if len(points) < 2:
+        return
+    with slot.container():
+        with st.expander(f"📈 Évolution du sentiment ({len(points)} analyses)"):
+            st.line_chart(
+                {
+                    "Analyse": [entry["analyzed_at"].replace("T", " ")[:16] for entry in points],
+                    "Sentiment (/10)": [entry["sentiment"] for entry in points],
+                },
+                x="Analyse",
+                y="Sentiment (/10)",
+            )
+            st.caption(" • ".join(f"{entry['analyzed_at'][:10]}: +{entry['new_comments']} commentaires"
+                                  for entry in points[-5:]))
+
+
+def display_video_result(result: dict, slots: dict, analyze_comments_option: bool):
+    """Remplit les emplacements d'une vidéo avec son résultat final."""
+    if result["warnings"]:
+        with slots["warnings"].container():
+            for message in result["warnings"]:
+                st.warning(message)
+
+    if result["points"] is not None:
+        display_stage_update(slots, "points", result["points"])
+    else:
+        slots["points"].markdown("""
+        <div class="warning-box">
+            ⚠️ Transcription non disponible pour cette vidéo. L'analyse des 10 points n'est pas possible.
         </div>
-    """, unsafe_allow_html=True)
-    
-    lines = analysis.split('\n')
-    for line in lines:
-        line = line.strip()
-        if line:
-            if line.startswith('**') or line.startswith('##'):
-                clean_line = re.sub(r'[\*#]+', '', line).strip()
-                st.markdown(f"<p style='color: var(--accent-yellow); font-weight: 600; margin-top: 1rem;'>{clean_line}</p>", unsafe_allow_html=True)
-            elif line.startswith('-') or line.startswith('•'):
-                st.markdown(f"<div class='comment-insight'>{line[1:].strip()}</div>", unsafe_allow_html=True)
-            else:
-                st.markdown(f"<p style='color: var(--text-primary); line-height: 1.6;'>{line}</p>", unsafe_allow_html=True)
-    
-    st.markdown("</div>", unsafe_allow_html=True)
+        """, unsafe_allow_html=True)
+
+    if analyze_comments_option:
+        if result["comments_analysis"] is not None:
+            display_stage_update(slots, "comments", result["comments_analysis"])
+        elif result.get("comments_since"):
+            slots["comments"].markdown(f"""
+            <div class="warning-box">
+                💬 Aucun nouveau commentaire depuis le {result["comments_since"][:10]}.
+            </div>
+            """, unsafe_allow_html=True)
+        else:
+            slots["comments"].markdown("""
+            <div class="warning-box">
+                ⚠️ Aucun commentaire disponible pour cette vidéo.
+            </div>
+            """, unsafe_allow_html=True)
+        display_sentiment_history(result.get("sentiment_history", []), slots["sentiment"])
+
+    display_video_metrics(result.get("metrics", []), slots["metrics"])
 
 
-def display_trends(analysis: str):
-    """Affiche l'analyse des tendances."""
+# ============================================================================
+# SUIVI DES ANALYSES EN ARRIÈRE-PLAN
+# ============================================================================
+
+def display_job_messages(job: dict, slot):
+    """Réaffiche les messages (sources, vidéos ignorées, avertissements) d'une analyse."""
+    with slot.container():
+        for message in job["messages"]:
+            getattr(st, message["level"])(message["text"])
+
+
+def format_job_label(job: dict) -> str:
+    status = JOB_STATUS_LABELS.get(job["status"], job["status"])
+    created = time.strftime("%d/%m %H:%M", time.localtime(job["created_at"]))
+    return f"{status} {created} • {len(job['params']['urls'])} URL(s) • {job['completed']} vidéo(s)"
+
+
+def display_job(job_id: str, youtube_api_key: str | None = None):
+    """Affiche une analyse et relève son avancement jusqu'à la fin.
+
+    Les résultats terminés sont relus depuis la base ; les étapes terminées des
+    vidéos en cours viennent de la mémoire du gestionnaire. Un rerun interrompt
+    seulement l'affichage : l'analyse continue et sera réaffichée.
+    """
+    manager = get_job_manager()
+    owner = session_owner()
+    job = manager.get(job_id, owner)
+    if job is None:
+        st.warning(f"⚠️ Analyse introuvable: {job_id}")
+        return
+
+    messages_slot = st.empty()
+    if job["videos"] is None and is_active(job):
+        with st.spinner("🔗 Synchronisation des chaînes et récupération des informations vidéo..."):
+            while job["videos"] is None and is_active(job):
+                time.sleep(JOB_POLL_INTERVAL)
+                job = manager.get(job_id, owner)
+    display_job_messages(job, messages_slot)
+    if job["status"] == "failed":
+        st.error(f"❌ L'analyse a échoué: {job['error']}")
+        return
+    if not job["videos"]:
+        return
+
+    params = job["params"]
+    videos = job["videos"]
+
+    # Affichage des stats
     st.markdown(f"""
-    <div class="result-card card-purple">
-        <div class="card-header">
-            <span class="card-icon">📊</span>
-            <div>
-                <p class="card-title">Tendances Multi-Vidéos</p>
-                <p class="card-subtitle">Points communs entre les communautés</p>
-            </div>
-            <span class="badge badge-purple" style="margin-left: auto;">TENDANCES</span>
+    <div class="stats-grid">
+        <div class="stat-item">
+            <div class="stat-value">{len(videos)}</div>
+            <div class="stat-label">Vidéos</div>
+        </div>
+        <div class="stat-item">
+            <div class="stat-value">{len(videos) * 10}</div>
+            <div class="stat-label">Points à extraire</div>
+        </div>
+        <div class="stat-item">
+            <div class="stat-value">{html.escape(route_model("points", 0))}</div>
+            <div class="stat-label">Modèle IA</div>
         </div>
+    </div>
+    """, unsafe_allow_html=True)
+
+    progress = st.progress(0.0, text=f"🔄 Analyse de {len(videos)} vidéo(s)...")
+    video_slots = [
+        create_video_slots(video["index"], len(videos), video["url"], video["video_id"], video["info"])
+        for video in videos
+    ]
+    trends_slot = st.empty()
+
+    # Relève périodique : résultats finaux depuis la base, résultats d'étape depuis la mémoire
+    results = {}
+    last_seq = 0
+    shown_partial = {}
+    while True:
+        # Statut lu avant les résultats : une analyse vue terminée a déjà tout enregistré
+        job = manager.get(job_id, owner)
+        for last_seq, result in manager.results(job_id, last_seq):
+            results[result["index"]] = result
+            display_video_result(result, video_slots[result["index"]], params["analyze_comments"])
+        for (index, stage), analysis in manager.partial(job_id).items():
+            if index in results or shown_partial.get((index, stage)) == analysis:
+                continue
+            shown_partial[(index, stage)] = analysis
+            display_stage_update(video_slots[index], stage, analysis)
+        progress.progress(len(results) / len(videos),
+                          text=f"🔄 {len(results)}/{len(videos)} vidéo(s) analysée(s)")
+        if not is_active(job):
+            break
+        time.sleep(JOB_POLL_INTERVAL)
+
+    progress.empty()
+    display_job_messages(job, messages_slot)
+    if job["status"] == "failed":
+        st.error(f"❌ L'analyse a échoué: {job['error']}")
+        return
+    if job["status"] == "interrupted":
+        st.warning("⚠️ Analyse interrompue par un redémarrage du serveur: résultats partiels")
+        return
+
+    # Analyse des tendances (si plusieurs vidéos)
+    trends = job["trends"]
+    if trends:
+        trends_slot.markdown(f"---\n\n{render.trends_card(trends['analysis'])}", unsafe_allow_html=True)
+        clusters = trends["clusters"]
+        if clusters:
+            with st.expander(f"🧩 Thèmes regroupés ({len(clusters)})"):
+                st.dataframe([
+                    {
+                        "Commentaires": cluster["size"],
+                        "Part": f"{cluster['share']:.0%}",
+                        "Vidéos": len(cluster["videos"]),
+                        "Mots-clés": "Non classés" if cluster.get("unclustered") else ", ".join(cluster["keywords"]),
+                    }
+                    for cluster in clusters
+                ], use_container_width=True)
+    elif params["show_trends"] and len(videos) >= 2:
+        trends_slot.markdown("""
+        <div class="warning-box">
+            ⚠️ Impossible d'analyser les tendances: pas assez de vidéos avec des commentaires disponibles.
+        </div>
+        """, unsafe_allow_html=True)
+
+    # Instrumentation agrégée par étape, exportable
+    run_metrics = metrics.Metrics.from_samples(job["metrics"] or [])
+    with st.expander("⏱️ Instrumentation de l'exécution"):
+        st.dataframe(run_metrics.summary(), use_container_width=True)
+        st.caption("Latences par modèle (routage par tâche, replis sur erreur)")
+        st.dataframe(model_stats.stats(), use_container_width=True)
+        st.caption("Limites de débit Groq (débits effectifs après adaptation aux 429)")
+        st.dataframe(get_scheduler().stats(), use_container_width=True)
+        export_col1, export_col2 = st.columns(2)
+        with export_col1:
+            st.download_button("📥 Export Prometheus", run_metrics.to_prometheus(),
+                               file_name="youtube_analyzer_metrics.prom", mime="text/plain")
+        with export_col2:
+            st.download_button("📥 Export JSON", run_metrics.to_json(),
+                               file_name="youtube_analyzer_metrics.json", mime="application/json")
+
+    # Statistiques réseau de l'API YouTube (latences, retries par endpoint)
+    with st.expander("📡 Statistiques API YouTube"):
+        client = youtube_client()
+        st.caption(f"Quota consommé aujourd'hui avec cette clé: {client.quota_used(youtube_api_key)} unités")
+        st.dataframe(client.stats(), use_container_width=True)
+
+    # Message de fin
+    st.markdown("""
+    <div class="success-box" style="margin-top: 2rem; text-align: center;">
+        ✅ Analyse terminée avec succès!
+    </div>
     """, unsafe_allow_html=True)
-    
-    lines = analysis.split('\n')
-    current_section = ""
-    
-    for line in lines:
-        line = line.strip()
-        if line:
-            if line.startswith('**') or line.startswith('##'):
-                clean_line = re.sub(r'[\*#]+', '', line).strip()
-                st.markdown(f"""
-                <div class="trend-item">
-                    <p class="trend-title">🔮 {clean_line}</p>
-                """, unsafe_allow_html=True)
-                current_section = "open"
-            elif current_section == "open" and (line.startswith('-') or line.startswith('•') or not line.startswith('**')):
-                st.markdown(f"<p class='trend-description'>{line.lstrip('-•').strip()}</p>", unsafe_allow_html=True)
-            elif line and not line.startswith('**'):
-                st.markdown(f"<p style='color: var(--text-primary); line-height: 1.6; margin: 0.5rem 0;'>{line}</p>", unsafe_allow_html=True)
-    
-    st.markdown("</div>", unsafe_allow_html=True)
 
 
 # ============================================================================
@@ -764,6 +387,8 @@ def display_trends(analysis: str):
 # ============================================================================
 
 def main():
+    set_warning_sink(st.warning)
+
     # Header
     st.markdown("""
     <div class="main-header">
@@ -802,15 +427,51 @@ def main():
             help="Clé API Groq pour le modèle LLaMA"
         )
         
+        st.markdown("---")
+        st.markdown("### 🗄️ Cache local")
+        use_cache = st.checkbox(
+            "Utiliser le cache",
+            value=True,
+            help="Transcriptions conservées indéfiniment, statistiques et commentaires quelques minutes"
+        )
+        disk_cache = get_disk_cache()
+        cache_stats = disk_cache.stats()
+        hits = sum(ns["hits"] for ns in cache_stats["namespaces"].values())
+        misses = sum(ns["misses"] for ns in cache_stats["namespaces"].values())
+        st.caption(
+            f"{cache_stats['size_bytes'] / 1024 / 1024:.1f} Mo utilisés • {hits} hits • {misses} misses"
+        )
+        refresh_llm = st.checkbox(
+            "Forcer de nouvelles réponses IA",
+            value=False,
+            help="Ignore les réponses Groq déjà mémorisées pour des prompts identiques et les remplace"
+        )
+        if st.button("🗑️ Vider le cache"):
+            disk_cache.clear()
+            st.success("Cache vidé")
+        
+        st.markdown("---")
+        st.markdown("### 📂 Analyses récentes")
+        recent_jobs = {job["job_id"]: job for job in get_job_manager().recent_jobs(session_owner())}
+        st.selectbox(
+            "Reprendre une analyse",
+            list(recent_jobs),
+            index=None,
+            key="resume_job",
+            on_change=lambda: st.session_state.update(job_id=st.session_state["resume_job"]),
+            format_func=lambda job_id: format_job_label(recent_jobs[job_id]),
+            help="Les analyses continuent en arrière-plan même si l'onglet est fermé"
+        )
+        
         st.markdown("---")
         st.markdown("### ℹ️ À propos")
-        st.markdown("""
+        st.markdown(f"""
         <div style="color: var(--text-secondary); font-size: 0.85rem; line-height: 1.6;">
         <strong>Fonctionnalités:</strong><br>
         • 💎 10 points méconnus par vidéo<br>
         • 💬 Analyse des commentaires<br>
         • 📊 Tendances multi-vidéos<br>
-        • ⚡ Modèle LLaMA 3.3 70B<br>
+        • ⚡ Modèle {html.escape(route_model("points", 0))}<br>
         </div>
         """, unsafe_allow_html=True)
     
@@ -820,9 +481,9 @@ def main():
     with col1:
         st.markdown("### 🔗 URLs des vidéos YouTube")
         urls_input = st.text_area(
-            "Collez vos URLs (une par ligne ou séparées par des virgules)",
+            "Collez vos URLs de vidéos, chaînes ou playlists (une par ligne ou séparées par des virgules)",
             height=120,
-            placeholder="https://www.youtube.com/watch?v=xxx\nhttps://youtu.be/yyy\nhttps://www.youtube.com/watch?v=zzz",
+            placeholder="https://www.youtube.com/watch?v=xxx\nhttps://youtu.be/yyy\nhttps://www.youtube.com/@chaine",
             help="Vous pouvez analyser plusieurs vidéos en même temps"
         )
     
@@ -830,7 +491,36 @@ def main():
         st.markdown("### ⚙️ Options")
         analyze_comments_option = st.checkbox("Analyser les commentaires", value=True)
         show_trends = st.checkbox("Afficher les tendances", value=True, help="Nécessite plusieurs vidéos")
-        max_comments = st.slider("Nombre max de commentaires", 20, 100, 50)
+        cluster_trends = st.checkbox(
+            "Regrouper tous les commentaires",
+            value=True,
+            disabled=not show_trends,
+            help="Regroupe localement tous les commentaires en thèmes avant l'analyse des tendances"
+        )
+        max_comments = st.number_input(
+            "Nombre max de commentaires",
+            min_value=20,
+            max_value=MAX_COMMENTS_LIMIT,
+            value=50,
+            step=50,
+            help="Les commentaires sont récupérés page par page (100 par requête)"
+        )
+        include_replies = st.checkbox("Inclure les réponses", value=False)
+        incremental = st.checkbox(
+            "Nouveautés uniquement",
+            value=False,
+            help="Ne traite que les vidéos nouvelles et met à jour l'analyse précédente avec les seuls "
+                 "commentaires postés depuis"
+        )
+        max_per_source = st.number_input("Vidéos par chaîne/playlist", min_value=1, max_value=MAX_SOURCE_VIDEOS,
+                                         value=25, help="Vidéos les plus récentes retenues par chaîne ou playlist")
+        map_reduce = st.checkbox(
+            "Couvrir les transcriptions longues",
+            value=True,
+            help="Résume chaque partie en parallèle puis extrait les 10 points de l'ensemble (map-reduce) ; "
+                 "sinon seuls les passages les plus denses sont envoyés"
+        )
+        map_concurrency = st.slider("Résumés IA en parallèle", 1, 8, MAP_CONCURRENCY, disabled=not map_reduce)
     
     # Bouton d'analyse
     if st.button("🚀 Analyser les vidéos", use_container_width=True):
@@ -847,116 +537,33 @@ def main():
             st.error("❌ Veuillez entrer au moins une URL YouTube")
             return
         
-        # Initialisation du client Groq
-        groq_client = Groq(api_key=groq_api_key)
-        
-        # Parse des URLs
-        urls = parse_urls(urls_input)
-        video_ids = []
-        
-        for url in urls:
-            vid_id = extract_video_id(url)
-            if vid_id:
-                video_ids.append((url, vid_id))
-            else:
-                st.warning(f"⚠️ URL invalide ignorée: {url}")
-        
-        if not video_ids:
-            st.error("❌ Aucune URL YouTube valide trouvée")
-            return
-        
-        # Affichage des stats
-        st.markdown(f"""
-        <div class="stats-grid">
-            <div class="stat-item">
-                <div class="stat-value">{len(video_ids)}</div>
-                <div class="stat-label">Vidéos</div>
-            </div>
-            <div class="stat-item">
-                <div class="stat-value">{len(video_ids) * 10}</div>
-                <div class="stat-label">Points à extraire</div>
-            </div>
-            <div class="stat-item">
-                <div class="stat-value">LLaMA 3.3</div>
-                <div class="stat-label">Modèle IA</div>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Stockage des résultats pour les tendances
-        all_comments_data = {}
-        
-        # Analyse de chaque vidéo
-        for idx, (url, video_id) in enumerate(video_ids):
-            st.markdown(f"---")
-            
-            with st.spinner(f"🔄 Analyse de la vidéo {idx + 1}/{len(video_ids)}..."):
-                # Récupération des infos vidéo
-                video_info = get_video_info(video_id, youtube_api_key)
-                video_title = video_info["title"] if video_info else f"Vidéo {video_id}"
-                
-                # Affichage du titre
-                st.markdown(f"""
-                <div class="video-title">{video_title}</div>
-                """, unsafe_allow_html=True)
-                
-                if video_info:
-                    st.markdown(f"""
-                    <div style="color: var(--text-secondary); font-size: 0.85rem; margin-bottom: 1rem;">
-                        📺 {video_info['channel']} • 👁️ {int(video_info['views']):,} vues • 💬 {video_info['comments_count']} commentaires
-                    </div>
-                    """, unsafe_allow_html=True)
-                
-                # Récupération et analyse de la transcription
-                transcript = get_transcript(video_id)
-                
-                if transcript:
-                    with st.spinner("💎 Extraction des 10 pépites..."):
-                        analysis_10_points = analyze_transcript_10_points(transcript, video_title, groq_client)
-                        display_10_points(analysis_10_points, video_title)
-                else:
-                    st.markdown("""
-                    <div class="warning-box">
-                        ⚠️ Transcription non disponible pour cette vidéo. L'analyse des 10 points n'est pas possible.
-                    </div>
-                    """, unsafe_allow_html=True)
-                
-                # Analyse des commentaires
-                if analyze_comments_option:
-                    comments = get_comments(video_id, youtube_api_key, max_comments)
-                    
-                    if comments:
-                        all_comments_data[video_title] = comments
-                        
-                        with st.spinner("💬 Analyse des commentaires..."):
-                            comments_analysis = analyze_comments(comments, video_title, groq_client)
-                            display_comments_analysis(comments_analysis, video_title)
-                    else:
-                        st.markdown("""
-                        <div class="warning-box">
-                            ⚠️ Aucun commentaire disponible pour cette vidéo.
-                        </div>
-                        """, unsafe_allow_html=True)
-        
-        # Analyse des tendances (si plusieurs vidéos)
-        if show_trends and len(all_comments_data) >= 2:
-            st.markdown("---")
-            with st.spinner("📊 Analyse des tendances multi-vidéos..."):
-                trends_analysis = analyze_trends(all_comments_data, groq_client)
-                display_trends(trends_analysis)
-        elif show_trends and len(video_ids) >= 2 and len(all_comments_data) < 2:
-            st.markdown("""
-            <div class="warning-box">
-                ⚠️ Impossible d'analyser les tendances: pas assez de vidéos avec des commentaires disponibles.
-            </div>
-            """, unsafe_allow_html=True)
-        
-        # Message de fin
-        st.markdown("""
-        <div class="success-box" style="margin-top: 2rem; text-align: center;">
-            ✅ Analyse terminée avec succès!
-        </div>
-        """, unsafe_allow_html=True)
+        # Le lot est exécuté en arrière-plan : il survit à une fermeture d'onglet ou à un rerun
+        job_id = get_job_manager().submit(
+            parse_urls(urls_input),
+            {
+                "analyze_comments": analyze_comments_option,
+                "show_trends": show_trends,
+                "cluster_trends": cluster_trends,
+                "max_comments": int(max_comments),
+                "include_replies": include_replies,
+                "incremental": incremental,
+                "max_per_source": int(max_per_source),
+                "map_reduce": map_reduce,
+                "map_concurrency": map_concurrency,
+            },
+            youtube_api_key,
+            get_groq_client(groq_api_key),
+            cache=disk_cache if use_cache else None,
+            llm_cache=get_llm_cache().refreshing() if refresh_llm else get_llm_cache(),
+            owner=session_owner(),
+        )
+        st.session_state["job_id"] = job_id
+        st.query_params["job"] = job_id
+
+    # Suivi de l'analyse en cours ou retrouvée via l'URL (?job=...)
+    job_id = st.session_state.get("job_id") or st.query_params.get("job")
+    if job_id:
+        display_job(job_id, youtube_api_key)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,220 @@
+"""
+Variante asynchrone de la récupération et des analyses (asyncio)
+Une seule boucle d'événements pilote toutes les requêtes d'un lot : API YouTube
+Data via httpx (AsyncYouTubeClient), Groq via AsyncGroq et transcriptions dans
+le pool du TranscriptService. Les étapes sont celles d'analyzer.py : seule leur
+exécution (`run_steps`) est propre à ce module. Utilisée par `cli.py --async`,
+mode expérimental : le pool de threads reste plus rapide sur les mesures actuelles
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator, Callable
+from typing import TYPE_CHECKING, Any
+
+from analyzer import (
+    MAP_CHUNK_TOKENS,
+    MAP_CONCURRENCY,
+    TRANSCRIPT_PROMPT_TOKENS,
+    AnalysisResult,
+    Completion,
+    Fetch,
+    Gather,
+    Offload,
+    Steps,
+    TranscriptFetch,
+    analyze_comments_steps,
+    comments_steps,
+    map_steps,
+    new_comments_steps,
+    next_page_params,
+    points_steps,
+    trends_steps,
+    update_comments_steps,
+    video_comments_steps,
+    video_steps,
+    videos_info_steps,
+)
+from cache import DiskCache
+from llm import LLMCache, async_chat_completion
+from structured import async_structured_completion
+
+if TYPE_CHECKING:
+    from youtube_api import AsyncYouTubeClient
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Vidéos en cours simultanément dans la boucle. Les appels réseau restent bornés
+# par hôte : YouTube Data par AsyncYouTubeClient (max_in_flight), transcriptions
+# par le pool du TranscriptService, Groq par l'ordonnanceur (concurrence, RPM/TPM).
+# Groq reste le goulot : au-delà de quelques lots d'avance, les vidéos admises
+# attendent un emplacement et leur préparation (indexation, comptage des tokens)
+# dispute le CPU à la boucle qui traite les réponses (100 vidéos simulées :
+# 84 s avec 256 vidéos en cours, 64 s avec 16, 57 s pour le pool de threads)
+ASYNC_MAX_VIDEOS = 16
+
+
+# ============================================================================
+# EXÉCUTION DES ÉTAPES
+# ============================================================================
+
+async def run_steps(steps: Steps, youtube: AsyncYouTubeClient | None = None) -> Any:
+    """Exécute des étapes d'analyzer.py dans la boucle courante et renvoie leur résultat.
+
+    `youtube` sert les requêtes à l'API YouTube Data ; calculs et accès SQLite
+    (`Offload`) partent dans un thread pour ne pas bloquer la boucle.
+    """
+    prefetched = {}
+    try:
+        request = next(steps)
+        while True:
+            try:
+                value = await _perform(request, youtube, prefetched)
+            except Exception as e:
+                request = steps.throw(e)
+            else:
+                request = steps.send(value)
+    except StopIteration as done:
+        return done.value
+    finally:
+        for pending in prefetched.values():
+            pending.cancel()
+
+
+async def _perform(request, youtube: AsyncYouTubeClient | None, prefetched: dict) -> Any:
+    if isinstance(request, Offload):
+        return await asyncio.to_thread(request.function, *request.args)
+    if isinstance(request, Fetch):
+        pending = prefetched.pop(request.key(), None)
+        data = await (pending if pending is not None else youtube.get(request.endpoint, request.params))
+        next_params = next_page_params(request.params, data)
+        if next_params is not None:
+            # Télécharge la page suivante pendant que les étapes traitent celle-ci
+            next_page = Fetch(request.endpoint, next_params)
+            prefetched[next_page.key()] = asyncio.create_task(youtube.get(request.endpoint, next_params))
+        return data
+    if isinstance(request, Completion):
+        if request.schema is not None:
+            return await async_structured_completion(request.groq_client, request.prompt, request.schema,
+                                                     max_tokens=request.max_tokens,
+                                                     temperature=request.temperature, cache=request.cache,
+                                                     task=request.task)
+        return await async_chat_completion(request.groq_client, request.prompt, max_tokens=request.max_tokens,
+                                           temperature=request.temperature, cache=request.cache,
+                                           task=request.task)
+    if isinstance(request, TranscriptFetch):
+        return await request.service.async_get(request.video_id, request.channel_id, request.collector)
+    if isinstance(request, Gather):
+        semaphore = asyncio.Semaphore(request.concurrency)
+
+        async def bounded(steps: Steps) -> Any:
+            async with semaphore:
+                return await run_steps(steps, youtube)
+
+        return list(await asyncio.gather(*(bounded(steps) for steps in request.steps)))
+    raise TypeError(f"requête d'étape inconnue: {request!r}")
+
+
+# ============================================================================
+# RÉCUPÉRATION ET ANALYSES
+# ============================================================================
+
+async def get_videos_info(client: AsyncYouTubeClient, video_ids: list[str], api_key: str,
+                          cache: DiskCache | None = None) -> dict[str, dict]:
+    """Variante asynchrone de `analyzer.get_videos_info` (lots de 50 IDs demandés simultanément)."""
+    return await run_steps(videos_info_steps(video_ids, api_key, cache), client)
+
+
+async def get_comments(client: AsyncYouTubeClient, video_id: str, api_key: str, max_comments: int = 100,
+                       include_replies: bool = False, cache: DiskCache | None = None) -> tuple[list[dict], bool]:
+    """Variante asynchrone de `analyzer.get_comments`."""
+    return await run_steps(comments_steps(video_id, api_key, max_comments, include_replies, cache), client)
+
+
+async def get_new_comments(client: AsyncYouTubeClient, video_id: str, api_key: str, since: str,
+                           max_comments: int = 100, include_replies: bool = False,
+                           seen: set[str] | None = None) -> tuple[list[dict], bool]:
+    """Variante asynchrone de `analyzer.get_new_comments`."""
+    return await run_steps(new_comments_steps(video_id, api_key, since, max_comments, include_replies, seen),
+                           client)
+
+
+async def map_transcript_chunks(transcript: str, video_title: str, groq_client,
+                                chunk_tokens: int = MAP_CHUNK_TOKENS, concurrency: int = MAP_CONCURRENCY,
+                                reduce_tokens: int = TRANSCRIPT_PROMPT_TOKENS,
+                                llm_cache: LLMCache | None = None) -> str:
+    """Variante asynchrone de `analyzer.map_transcript_chunks`."""
+    return await run_steps(map_steps(transcript, video_title, groq_client, chunk_tokens, concurrency,
+                                     reduce_tokens, llm_cache))
+
+
+async def analyze_transcript_10_points(transcript: dict, video_title: str, groq_client,
+                                       llm_cache: LLMCache | None = None, map_reduce: bool = True,
+                                       chunk_tokens: int = MAP_CHUNK_TOKENS,
+                                       map_concurrency: int = MAP_CONCURRENCY,
+                                       on_update: Callable[[AnalysisResult], None] | None = None
+                                       ) -> AnalysisResult:
+    """Variante asynchrone de `analyzer.analyze_transcript_10_points`."""
+    return await run_steps(points_steps(transcript, video_title, groq_client, llm_cache, map_reduce,
+                                        chunk_tokens, map_concurrency, on_update))
+
+
+async def analyze_comments(comments: list[str], video_title: str, groq_client,
+                           llm_cache: LLMCache | None = None,
+                           on_update: Callable[[AnalysisResult], None] | None = None) -> AnalysisResult:
+    """Variante asynchrone de `analyzer.analyze_comments`."""
+    return await run_steps(analyze_comments_steps(comments, video_title, groq_client, llm_cache, on_update))
+
+
+async def update_comments_analysis(previous_analysis: AnalysisResult, new_comments: list[str], video_title: str,
+                                   groq_client, llm_cache: LLMCache | None = None,
+                                   on_update: Callable[[AnalysisResult], None] | None = None) -> AnalysisResult:
+    """Variante asynchrone de `analyzer.update_comments_analysis`."""
+    return await run_steps(update_comments_steps(previous_analysis, new_comments, video_title, groq_client,
+                                                 llm_cache, on_update))
+
+
+async def analyze_trends(all_comments: dict[str, list[str]], groq_client, llm_cache: LLMCache | None = None,
+                         clusters: list[dict] | None = None) -> AnalysisResult:
+    """Variante asynchrone de `analyzer.analyze_trends`."""
+    return await run_steps(trends_steps(all_comments, groq_client, llm_cache, clusters))
+
+
+# ============================================================================
+# PIPELINE PAR VIDÉO
+# ============================================================================
+
+async def analyze_video_comments(job: dict, result: dict):
+    """Variante asynchrone de `analyzer.analyze_video_comments` (mêmes règles incrémentales)."""
+    await run_steps(video_comments_steps(job, result), job["youtube"])
+
+
+async def process_video(job: dict) -> dict:
+    """Récupère et analyse une vidéo dans la boucle d'événements.
+
+    Le job est celui de `analyzer.process_video`, avec un client AsyncGroq
+    (`groq_client`), un AsyncYouTubeClient (`youtube`) et le TranscriptService
+    du lot (`transcripts`). Les résultats d'étape sont publiés dans sa file
+    `updates` comme en synchrone.
+    """
+    return await run_steps(video_steps(job), job["youtube"])
+
+
+async def stream_videos(jobs: list[dict], max_in_flight: int = ASYNC_MAX_VIDEOS) -> AsyncIterator[dict]:
+    """Traite les vidéos dans la boucle courante et produit chaque résultat dès qu'il est prêt."""
+    semaphore = asyncio.Semaphore(max(1, max_in_flight))
+
+    async def run(job: dict) -> dict:
+        async with semaphore:
+            return await process_video(job)
+
+    tasks = [asyncio.create_task(run(job)) for job in jobs]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            yield await next_result
+    finally:
+        for task in tasks:
+            task.cancel()
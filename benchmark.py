@@ -0,0 +1,387 @@
+"""
+Benchmark du pipeline d'analyse complet, sans clés API
+Un serveur local imite l'API YouTube Data, les transcriptions et l'API Groq
+(latences configurables), puis le flux headless de cli.py est exécuté sur des
+lots synthétiques de vidéos. Rapporte p50/p95 par étape, temps total et pic mémoire.
+
+Usage:
+    python benchmark.py --sizes 1 10 100 --groq-latency 0.5
+    python benchmark.py --sizes 100 --async
+    python benchmark.py --sizes 1000 --json resultats_bench.json
+"""
+
+import argparse
+import inspect
+import json
+import os
+import random
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import analyzer
+import async_analyzer
+import cli
+import youtube_api
+
+# Étapes chronométrées (fonctions homonymes des modules analyzer et async_analyzer)
+STAGES = [
+    "get_videos_info",
+    "get_transcript",
+    "get_comments",
+    "analyze_transcript_10_points",
+    "analyze_comments",
+    "analyze_trends",
+]
+
+WORDS = ("analyse vidéo données modèle tendance audience question réponse exemple chiffre "
+         "résultat méthode contenu commentaire idée point important surprenant").split()
+
+
+# ============================================================================
+# SERVEUR LOCAL (YOUTUBE DATA API, TRANSCRIPTIONS, GROQ)
+# ============================================================================
+
+def _sentence(rng: random.Random, length: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(length)).capitalize() + "."
+
+
+class FakeBackends:
+    """Réponses synthétiques déterministes et latences simulées par backend."""
+
+    def __init__(self, youtube_latency: float, transcript_latency: float, groq_latency: float,
+                 transcript_sentences: int, comments_per_video: int):
+        self.latencies = {"youtube": youtube_latency, "transcript": transcript_latency, "groq": groq_latency}
+        self.transcript_sentences = transcript_sentences
+        self.comments_per_video = comments_per_video
+
+    def wait(self, backend: str):
+        latency = self.latencies[backend]
+        if latency:
+            time.sleep(latency * random.uniform(0.8, 1.2))
+
+    def videos(self, ids: list[str]) -> dict:
+        return {"items": [
+            {
+                "id": video_id,
+                "snippet": {"title": f"Vidéo de test {video_id}", "channelTitle": "Chaîne de test",
+                            "description": "Description synthétique"},
+                "statistics": {"viewCount": "12345", "likeCount": "678", "commentCount": str(self.comments_per_video)},
+            }
+            for video_id in ids
+        ]}
+
+    def comment_threads(self, video_id: str, page_token: str | None) -> dict:
+        page = int(page_token or 0)
+        rng = random.Random(f"{video_id}:{page}")
+        start = page * 100
+        count = max(0, min(100, self.comments_per_video - start))
+        items = [
+            {
+                "id": f"{video_id}-t{start + i}",
+                "snippet": {
+                    "totalReplyCount": 0,
+                    "topLevelComment": {
+                        "id": f"{video_id}-c{start + i}",
+                        "snippet": {"textDisplay": _sentence(rng, rng.randint(5, 30)),
+                                    "authorDisplayName": f"user{i}", "likeCount": rng.randint(0, 50),
+                                    "publishedAt": "2024-01-01T00:00:00Z"},
+                    },
+                },
+            }
+            for i in range(count)
+        ]
+        data = {"items": items}
+        if start + count < self.comments_per_video:
+            data["nextPageToken"] = str(page + 1)
+        return data
+
+    def transcript(self, video_id: str) -> list[dict]:
+        rng = random.Random(video_id)
+        return [
+            {"text": _sentence(rng, rng.randint(8, 20)), "start": 4.0 * i, "duration": 4.0}
+            for i in range(self.transcript_sentences)
+        ]
+
+    def completion(self, request: dict) -> dict:
+        prompt = request["messages"][-1]["content"]
+        content = "\n".join(f"{i}. Point synthétique numéro {i}." for i in range(1, 11))
+        if "10 points" not in prompt:
+            content = "**Sentiment général**: positif\n- Les spectateurs apprécient le contenu."
+        if request.get("response_format", {}).get("type") == "json_object":
+            # Mode JSON : document conforme au schéma décrit dans le prompt
+            if '{"points": [' in prompt:
+                document = {"points": [{"text": f"Point synthétique numéro {i}."} for i in range(1, 11)]}
+            elif '{"sections": [' in prompt:
+                document = {"sections": [{"title": "Tendances communes", "items": ["Contenu apprécié."],
+                                          "quotes": ["super vidéo"]}]}
+            else:
+                document = {"sentiment": "positif", "score": 7, "appreciated": ["Le contenu."],
+                            "criticisms": [], "questions": [], "insights": []}
+            content = json.dumps(document, ensure_ascii=False)
+        return {
+            "id": "bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4},
+        }
+
+
+def make_handler(backends: FakeBackends):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, data, status: int = 200):
+            body = json.dumps(data).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            if url.path.startswith("/youtube/v3/"):
+                backends.wait("youtube")
+                endpoint = url.path.rsplit("/", 1)[1]
+                if endpoint == "videos":
+                    return self._send_json(backends.videos(query["id"].split(",")))
+                if endpoint == "commentThreads":
+                    return self._send_json(backends.comment_threads(query["videoId"], query.get("pageToken")))
+                return self._send_json({"items": []})
+            if url.path.startswith("/transcript/"):
+                backends.wait("transcript")
+                return self._send_json(backends.transcript(url.path.rsplit("/", 1)[1]))
+            self._send_json({"error": "not found"}, 404)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length))
+            if self.path.endswith("/chat/completions"):
+                backends.wait("groq")
+                return self._send_json(backends.completion(request))
+            self._send_json({"error": "not found"}, 404)
+
+    return Handler
+
+
+class FixtureTranscriptApi:
+    """Remplaçant de YouTubeTranscriptApi qui lit les transcriptions sur le serveur local."""
+
+    base_url = ""
+
+    def fetch(self, video_id: str, languages=None):
+        from types import SimpleNamespace
+
+        session = youtube_api.get_client().session
+        response = session.get(f"{self.base_url}/transcript/{video_id}", timeout=10)
+        response.raise_for_status()
+        return [SimpleNamespace(**segment) for segment in response.json()]
+
+    def list(self, video_id: str):
+        from types import SimpleNamespace
+
+        # Une seule piste française, téléchargée à la demande comme avec la vraie bibliothèque
+        return [SimpleNamespace(language_code="fr", is_generated=False, fetch=lambda: self.fetch(video_id))]
+
+
+# ============================================================================
+# INSTRUMENTATION
+# ============================================================================
+
+class StageTimer:
+    """Enregistre la durée de chaque appel aux étapes du pipeline."""
+
+    def __init__(self):
+        self.durations: dict[str, list[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def _record(self, name: str, start: float):
+        with self._lock:
+            self.durations[name].append(time.perf_counter() - start)
+
+    def wrap(self, name: str, func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def timed_async(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self._record(name, start)
+            return timed_async
+
+        @wraps(func)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._record(name, start)
+        return timed
+
+    def install(self):
+        """Remplace les étapes dans analyzer, async_analyzer et cli par des versions chronométrées."""
+        originals = {}
+        for module in (analyzer, async_analyzer):
+            for name in STAGES:
+                if hasattr(module, name):
+                    originals[(module, name)] = getattr(module, name)
+                    setattr(module, name, self.wrap(name, originals[(module, name)]))
+        for name in STAGES:
+            if hasattr(cli, name):
+                setattr(cli, name, getattr(analyzer, name))
+        return originals
+
+    @staticmethod
+    def uninstall(originals: dict):
+        for (module, name), func in originals.items():
+            setattr(module, name, func)
+            if module is analyzer and hasattr(cli, name):
+                setattr(cli, name, func)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+# ============================================================================
+# EXÉCUTION
+# ============================================================================
+
+def run_batch(size: int, base_url: str, args: argparse.Namespace) -> dict:
+    """Exécute le flux headless complet sur `size` vidéos synthétiques."""
+    youtube_api.set_client(youtube_api.YouTubeClient(
+        base_url=f"{base_url}/youtube/v3", requests_per_second=args.youtube_rps
+    ))
+    urls = [f"https://www.youtube.com/watch?v=bench{index:06d}" for index in range(size)]
+    url_file = os.path.join(args.workdir, f"urls_{size}.txt")
+    with open(url_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(urls))
+
+    cli_args = [url_file, "-o", os.devnull, "--youtube-key", "AIza-bench", "--groq-key", "gsk_bench",
+                "--max-comments", str(args.comments), "--no-cache",
+                "--groq-rpm", str(args.groq_rpm), "--groq-tpm", str(args.groq_tpm)]
+    if args.workers:
+        cli_args += ["--workers", str(args.workers)]
+    if args.trends:
+        cli_args.append("--trends")
+    if args.async_io:
+        cli_args.append("--async")
+
+    timer = StageTimer()
+    originals = timer.install()
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        exit_code = cli.run(cli.parse_args(cli_args))
+    finally:
+        wall = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        StageTimer.uninstall(originals)
+
+    return {
+        "videos": size,
+        "exit_code": exit_code,
+        "wall_seconds": round(wall, 3),
+        "videos_per_second": round(size / wall, 2) if wall else None,
+        "peak_traced_mb": round(peak / 1024 / 1024, 2),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "stages": {
+            name: {
+                "calls": len(durations),
+                "p50_ms": round(1000 * percentile(durations, 50), 1),
+                "p95_ms": round(1000 * percentile(durations, 95), 1),
+            }
+            for name, durations in timer.durations.items()
+        },
+        "youtube_api": youtube_api.get_client().stats(),
+    }
+
+
+def print_report(report: dict):
+    print(f"\n=== {report['videos']} vidéo(s) — {report['wall_seconds']:.2f} s "
+          f"({report['videos_per_second']} vidéos/s) — pic mémoire Python {report['peak_traced_mb']} Mo "
+          f"— RSS max {report['max_rss_mb']} Mo ===")
+    print(f"{'étape':<32}{'appels':>8}{'p50 (ms)':>12}{'p95 (ms)':>12}")
+    for name in STAGES:
+        stage = report["stages"].get(name)
+        if stage:
+            print(f"{name:<32}{stage['calls']:>8}{stage['p50_ms']:>12.1f}{stage['p95_ms']:>12.1f}")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark du pipeline avec des backends simulés")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100], help="tailles de lots (1 à 1000)")
+    parser.add_argument("--workers", type=int, help="vidéos traitées en parallèle (défaut: celui de cli.py)")
+    parser.add_argument("--async", dest="async_io", action="store_true",
+                        help="exécuter le lot dans la boucle asyncio (cli.py --async)")
+    parser.add_argument("--comments", type=int, default=100, help="commentaires par vidéo")
+    parser.add_argument("--transcript-sentences", type=int, default=300, help="phrases par transcription")
+    parser.add_argument("--youtube-latency", type=float, default=0.05, help="latence simulée YouTube (s)")
+    parser.add_argument("--transcript-latency", type=float, default=0.2, help="latence simulée transcription (s)")
+    parser.add_argument("--groq-latency", type=float, default=0.3, help="latence simulée Groq (s)")
+    parser.add_argument("--youtube-rps", type=float, default=youtube_api.MAX_REQUESTS_PER_SECOND,
+                        help="débit max du client YouTube (0 = illimité)")
+    parser.add_argument("--groq-rpm", type=int, default=1_000_000,
+                        help="requêtes/minute accordées par l'ordonnanceur Groq (backend simulé : sans limite)")
+    parser.add_argument("--groq-tpm", type=int, default=1_000_000_000, help="tokens/minute accordés par l'ordonnanceur")
+    parser.add_argument("--trends", action="store_true", help="inclure l'analyse des tendances")
+    parser.add_argument("--json", help="écrire le rapport complet dans ce fichier JSON")
+    parser.add_argument("--workdir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".bench"))
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    os.makedirs(args.workdir, exist_ok=True)
+
+    backends = FakeBackends(args.youtube_latency, args.transcript_latency, args.groq_latency,
+                            args.transcript_sentences, args.comments)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(backends))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    # Le client Groq lit GROQ_BASE_URL ; les transcriptions passent par le serveur local
+    os.environ["GROQ_BASE_URL"] = base_url
+    import youtube_transcript_api
+    FixtureTranscriptApi.base_url = base_url
+    youtube_transcript_api.YouTubeTranscriptApi = FixtureTranscriptApi
+
+    reports = []
+    try:
+        for size in args.sizes:
+            report = run_batch(size, base_url, args)
+            reports.append(report)
+            print_report(report)
+    finally:
+        server.shutdown()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "runs": reports}, f, indent=2, ensure_ascii=False)
+    return 0 if all(report["exit_code"] == 0 for report in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+Cache local persistant (SQLite) pour les transcriptions, métadonnées et commentaires
+TTL par source, éviction LRU par taille et compteurs de hits/misses
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Any
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "youtube_analyzer.sqlite")
+
+# Taille maximale du cache sur disque avant éviction des entrées les moins récemment lues
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Durée de vie par source, en secondes (None = immuable)
+CACHE_TTLS = {
+    "transcript": None,
+    # Langue de transcription retenue par vidéo et par chaîne
+    "transcript_language": 30 * 24 * 3600,
+    "video_info": 15 * 60,
+    "comments": 60 * 60,
+}
+
+
+class DiskCache:
+    """Cache clé/valeur JSON stocké dans SQLite, partagé entre threads."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._hits: dict[str, int] = defaultdict(int)
+        self._misses: dict[str, int] = defaultdict(int)
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_access ON entries(last_access)")
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, namespace: str, key: str) -> Any | None:
+        """Renvoie la valeur en cache, ou None si absente ou expirée."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, size, expires_at FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+            if row is None:
+                self._misses[namespace] += 1
+                return None
+            value, size, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+                self._size -= size
+                self._misses[namespace] += 1
+                return None
+            self._conn.execute(
+                "UPDATE entries SET last_access = ? WHERE namespace = ? AND key = ?",
+                (now, namespace, key)
+            )
+            self._hits[namespace] += 1
+        return json.loads(value)
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float | None = None):
+        """Enregistre une valeur sérialisable en JSON, avec une durée de vie optionnelle."""
+        payload = json.dumps(value, ensure_ascii=False)
+        size = len(payload.encode("utf-8"))
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        with self._lock:
+            previous = self._conn.execute(
+                "SELECT size FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, size, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (namespace, key, payload, size, expires_at, now)
+            )
+            self._size += size - (previous[0] if previous else 0)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Supprime les entrées expirées puis les moins récemment lues jusqu'à 90% de la taille max."""
+        now = time.time()
+        freed = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)
+        ).fetchone()[0]
+        self._conn.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        self._size -= freed
+
+        target = int(self.max_bytes * 0.9)
+        while self._size > target:
+            rows = self._conn.execute(
+                "SELECT namespace, key, size FROM entries ORDER BY last_access LIMIT 100"
+            ).fetchall()
+            if not rows:
+                self._size = 0
+                break
+            for namespace, key, size in rows:
+                self._conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+                self._size -= size
+                if self._size <= target:
+                    break
+
+    def clear(self, namespace: str | None = None):
+        """Vide le cache (entièrement ou pour un seul namespace)."""
+        with self._lock:
+            if namespace is None:
+                self._conn.execute("DELETE FROM entries")
+            else:
+                self._conn.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+            self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def stats(self) -> dict:
+        """Renvoie les compteurs de hits/misses par namespace et la taille occupée."""
+        with self._lock:
+            namespaces = sorted(set(self._hits) | set(self._misses))
+            return {
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "namespaces": {
+                    ns: {"hits": self._hits[ns], "misses": self._misses[ns]} for ns in namespaces
+                },
+            }
@@ -0,0 +1,284 @@
+"""
+YouTube Video Analyzer - Exécution headless (sans Streamlit)
+Lit des URLs depuis un fichier ou stdin et écrit les résultats en JSONL
+
+Exemple:
+    export YOUTUBE_API_KEY=AIza... GROQ_API_KEY=gsk_...
+    python cli.py urls.txt -o resultats.jsonl --workers 16
+    python cli.py urls.txt -o resultats.jsonl --async
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from contextlib import aclosing
+
+from analyzer import (
+    MAP_CONCURRENCY,
+    MAX_COMMENTS_LIMIT,
+    analyze_trends,
+    cluster_trend_comments,
+    get_videos_info,
+    parse_urls,
+    process_video,
+)
+import async_analyzer
+from sources import MAX_SOURCE_VIDEOS, expand_urls, record_synced, select_changed
+from store import DEFAULT_STORE_PATH, Store, utc_timestamp
+from cache import DiskCache
+import metrics
+import youtube_api
+from llm import LLMCache, create_async_groq_client, create_groq_client, use_routes, with_routes
+from pipeline import MAX_VIDEO_WORKERS, run_concurrently
+from scheduler import DEFAULT_RATE_LIMITS, LLMScheduler, set_scheduler
+from transcripts import TranscriptService
+
+logger = logging.getLogger("youtube_analyzer")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Analyse headless de vidéos YouTube (sortie JSONL)")
+    parser.add_argument("input", nargs="?", default="-",
+                        help="fichier d'URLs de vidéos, chaînes ou playlists (une par ligne ou séparées par "
+                             "des virgules), '-' pour stdin")
+    parser.add_argument("-o", "--output", default="-", help="fichier JSONL de sortie, '-' pour stdout")
+    parser.add_argument("--youtube-key", default=os.environ.get("YOUTUBE_API_KEY"),
+                        help="clé API YouTube Data v3 (défaut: $YOUTUBE_API_KEY)")
+    parser.add_argument("--groq-key", default=os.environ.get("GROQ_API_KEY"),
+                        help="clé API Groq (défaut: $GROQ_API_KEY)")
+    parser.add_argument("--workers", type=int,
+                        help=f"vidéos traitées en parallèle (défaut: {MAX_VIDEO_WORKERS}, "
+                             f"{async_analyzer.ASYNC_MAX_VIDEOS} avec --async)")
+    parser.add_argument("--async", dest="async_io", action="store_true",
+                        help="expérimental : piloter les appels réseau (YouTube, Groq) depuis une boucle "
+                             "asyncio plutôt qu'un pool de threads. Pas plus rapide à ce jour (100 vidéos "
+                             "simulées : 64 s contre 57 s avec le pool de threads, voir benchmark.py --async)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="ne traiter que les vidéos nouvelles et les commentaires postés depuis la dernière "
+                             "exécution (l'analyse précédente est mise à jour avec ce delta)")
+    parser.add_argument("--max-per-source", type=int, default=50,
+                        help=f"vidéos récentes retenues par chaîne ou playlist (max {MAX_SOURCE_VIDEOS})")
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH, help="base de suivi des synchronisations")
+    parser.add_argument("--no-comments", action="store_true", help="ne pas analyser les commentaires")
+    parser.add_argument("--max-comments", type=int, default=50, help="nombre max de commentaires par vidéo")
+    parser.add_argument("--include-replies", action="store_true", help="récupérer aussi les réponses")
+    parser.add_argument("--include-raw-comments", action="store_true",
+                        help="inclure le texte brut des commentaires dans la sortie")
+    parser.add_argument("--no-map-reduce", action="store_true",
+                        help="n'envoyer que les passages les plus denses des transcriptions longues "
+                             "au lieu de les résumer par parties")
+    parser.add_argument("--map-concurrency", type=int, default=MAP_CONCURRENCY,
+                        help="résumés de parties en parallèle par vidéo")
+    parser.add_argument("--trends", action="store_true", help="ajouter une analyse des tendances multi-vidéos")
+    parser.add_argument("--no-clustering", action="store_true",
+                        help="envoyer un échantillon de commentaires au lieu des thèmes regroupés localement")
+    parser.add_argument("--route", action="append", default=[], metavar="TÂCHE=MODÈLE",
+                        help="modèle à utiliser pour une tâche (map, points, comments, trends), répétable")
+    parser.add_argument("--groq-rpm", type=int,
+                        help="requêtes/minute autorisées par Groq (défaut: limites de l'offre gratuite par modèle)")
+    parser.add_argument("--groq-tpm", type=int, help="tokens/minute autorisés par Groq")
+    parser.add_argument("--no-cache", action="store_true", help="désactiver le cache disque")
+    parser.add_argument("--metrics", help="écrire les mesures par étape (.prom pour Prometheus, sinon JSON)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="afficher la progression sur stderr")
+    return parser.parse_args(argv)
+
+
+def read_urls(source: str) -> list[str]:
+    """Lit les URLs depuis un fichier ou depuis stdin."""
+    if source == "-":
+        return parse_urls(sys.stdin.read())
+    with open(source, encoding="utf-8") as f:
+        return parse_urls(f.read())
+
+
+def video_record(result: dict, include_raw_comments: bool) -> dict:
+    """Convertit un résultat du pipeline en enregistrement JSONL."""
+    record = {
+        "type": "video",
+        "url": result["url"],
+        "video_id": result["video_id"],
+        "title": result["title"],
+        "info": result["info"],
+        "transcript_available": result["transcript_available"],
+        "transcript_language": result["transcript_language"],
+        "points": result["points"],
+        "comments_count": len(result["comments"]),
+        "comments_since": result.get("comments_since"),
+        "comments_analysis": result["comments_analysis"],
+        "sentiment": result["sentiment"],
+        "sentiment_history": result["sentiment_history"],
+        "warnings": result["warnings"],
+        "metrics": result["metrics"],
+    }
+    if include_raw_comments:
+        record["comments"] = result["comments"]
+    return record
+
+
+def run(args: argparse.Namespace) -> int:
+    if not args.youtube_key or not args.groq_key:
+        logger.error("Clés API manquantes: utilisez --youtube-key/--groq-key ou YOUTUBE_API_KEY/GROQ_API_KEY")
+        return 2
+
+    # Routes propres à cette exécution (la table globale MODEL_ROUTES n'est pas modifiée)
+    overrides = {}
+    for route in args.route:
+        task, _, model = route.partition("=")
+        if not model:
+            logger.error("Route invalide (attendu TÂCHE=MODÈLE): %s", route)
+            return 2
+        overrides[task] = model
+    try:
+        routes = with_routes(overrides)
+    except ValueError as e:
+        logger.error("Route invalide: %s", e)
+        return 2
+
+    store = Store(args.store)
+    synced_at = utc_timestamp()
+    video_ids, sources, invalid = expand_urls(read_urls(args.input), args.youtube_key, store,
+                                              min(args.max_per_source, MAX_SOURCE_VIDEOS))
+    for url in invalid:
+        logger.warning("URL invalide ignorée: %s", url)
+    for source in sources:
+        logger.info("%s: %d nouvelle(s) vidéo(s)", source["title"], source["new_videos"])
+    if not video_ids:
+        logger.error("Aucune URL YouTube valide trouvée")
+        return 1
+
+    if args.groq_rpm or args.groq_tpm:
+        # Limites de l'abonnement Groq, appliquées à tous les modèles
+        set_scheduler(LLMScheduler(rate_limits={}, default_limits={
+            "rpm": args.groq_rpm or DEFAULT_RATE_LIMITS["rpm"],
+            "tpm": args.groq_tpm or DEFAULT_RATE_LIMITS["tpm"],
+        }))
+
+    cache = None if args.no_cache else DiskCache()
+    llm_cache = LLMCache(backing=cache)
+    run_metrics = metrics.Metrics()
+    with metrics.use(run_metrics):
+        videos_info = get_videos_info([vid for _, vid in video_ids], args.youtube_key, cache)
+
+    if args.incremental:
+        selected, skipped = select_changed(video_ids, videos_info, store)
+        logger.info("%d vidéo(s) sans nouveauté ignorée(s)", skipped)
+    else:
+        selected = [{"url": url, "video_id": video_id, "comments_since": None} for url, video_id in video_ids]
+
+    # Transcriptions du lot téléchargées dès maintenant, pendant les autres étapes
+    transcripts = TranscriptService(cache)
+    transcripts.prefetch([(entry["video_id"], (videos_info.get(entry["video_id"]) or {}).get("channel_id"))
+                          for entry in selected], run_metrics)
+
+    jobs = [
+        {
+            "index": idx,
+            "url": entry["url"],
+            "video_id": entry["video_id"],
+            "info": videos_info.get(entry["video_id"]),
+            "youtube_api_key": args.youtube_key,
+            "analyze_comments": not args.no_comments,
+            "max_comments": min(args.max_comments, MAX_COMMENTS_LIMIT),
+            "include_replies": args.include_replies,
+            "cache": cache,
+            "llm_cache": llm_cache,
+            "map_reduce": not args.no_map_reduce,
+            "map_concurrency": args.map_concurrency,
+            "metrics": run_metrics,
+            "comments_since": entry["comments_since"],
+            "store": store,
+            "transcripts": transcripts,
+            "routes": routes,
+        }
+        for idx, entry in enumerate(selected)
+    ]
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    all_comments_data = {}
+
+    def write_result(done: int, result: dict):
+        output.write(json.dumps(video_record(result, args.include_raw_comments), ensure_ascii=False) + "\n")
+        output.flush()
+        record_synced(store, result, synced_at)
+        if args.trends and result["comments"]:
+            all_comments_data[result["index"]] = (result["title"], result["comments"])
+        logger.info("%d/%d %s", done, len(jobs), result["video_id"])
+
+    def trends_input() -> dict | None:
+        if not args.trends or len(all_comments_data) < 2:
+            return None
+        return dict(all_comments_data[idx] for idx in sorted(all_comments_data))
+
+    def write_trends(ordered: dict, trends, clusters: list[dict] | None):
+        output.write(json.dumps({"type": "trends", "videos": list(ordered), "analysis": trends,
+                                 "clusters": clusters}, ensure_ascii=False) + "\n")
+
+    async def run_async():
+        # Clients asynchrones créés dans la boucle qui les utilise
+        shared = youtube_api.get_client()
+        youtube = youtube_api.AsyncYouTubeClient(base_url=shared.base_url,
+                                                 requests_per_second=shared.requests_per_second)
+        groq_client = create_async_groq_client(args.groq_key)
+        try:
+            for job in jobs:
+                job.update(youtube=youtube, groq_client=groq_client)
+            workers = args.workers or async_analyzer.ASYNC_MAX_VIDEOS
+            async with aclosing(async_analyzer.stream_videos(jobs, workers)) as results:
+                done = 0
+                async for result in results:
+                    done += 1
+                    # Écriture et suivi SQLite hors de la boucle d'événements
+                    await asyncio.to_thread(write_result, done, result)
+
+            ordered = trends_input()
+            if ordered is not None:
+                with metrics.use(run_metrics), use_routes(routes):
+                    # Regroupement local (CPU) hors de la boucle
+                    clusters = None if args.no_clustering else await asyncio.to_thread(
+                        cluster_trend_comments, ordered)
+                    trends = await async_analyzer.analyze_trends(ordered, groq_client, llm_cache, clusters=clusters)
+                write_trends(ordered, trends, clusters)
+        finally:
+            await youtube.aclose()
+            await groq_client.close()
+
+    try:
+        if args.async_io:
+            asyncio.run(run_async())
+        else:
+            groq_client = create_groq_client(args.groq_key)
+            for job in jobs:
+                job["groq_client"] = groq_client
+            for done, result in enumerate(run_concurrently(process_video, jobs, args.workers or MAX_VIDEO_WORKERS),
+                                          start=1):
+                write_result(done, result)
+
+            ordered = trends_input()
+            if ordered is not None:
+                with metrics.use(run_metrics), use_routes(routes):
+                    clusters = None if args.no_clustering else cluster_trend_comments(ordered)
+                    trends = analyze_trends(ordered, groq_client, llm_cache, clusters=clusters)
+                write_trends(ordered, trends, clusters)
+    finally:
+        transcripts.close()
+        if output is not sys.stdout:
+            output.close()
+
+    if args.metrics:
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            f.write(run_metrics.to_prometheus() if args.metrics.endswith(".prom") else run_metrics.to_json())
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format="%(levelname)s %(message)s", stream=sys.stderr)
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+"""
+Regroupement local des commentaires avant l'analyse des tendances
+TF-IDF creux (format CSR) et k-means sphérique vectorisés par lots avec NumPy
+"""
+
+import math
+import re
+from collections import Counter
+
+import numpy as np
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+MAX_FEATURES = 5000
+MIN_DOCUMENT_FREQUENCY = 2
+MAX_CLUSTERS = 12
+KMEANS_ITERATIONS = 15
+BATCH_SIZE = 4096
+REPRESENTATIVES_PER_CLUSTER = 3
+KEYWORDS_PER_CLUSTER = 6
+
+# En dessous de ce volume, un simple échantillon suffit au LLM
+MIN_COMMENTS_FOR_CLUSTERING = 40
+
+STOPWORDS = set("""
+les des une est que qui dans pour pas sur avec plus mais par tout tous toute toutes son ses sont
+aux ces cette cet comme fait faire bien très aussi elle ils elles nous vous leur leurs même été être
+avoir avait ont suis ai as était quand alors donc car encore ça cela ceci celui celle moi toi lui
+rien trop peu peut vraiment juste merci vidéo video
+the and for are but not you your with this that have has was were what when where which who will
+would there their they them from just about all can out get like more one its it's also than then
+""".split())
+
+_TOKEN_PATTERN = re.compile(r"[^\W\d_]{3,}", re.UNICODE)
+
+
+def tokenize(text: str) -> list[str]:
+    """Découpe un commentaire en termes (minuscules, sans mots vides)."""
+    return [token for token in _TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def tfidf_matrix(documents: list[str]) -> tuple[np.ndarray, np.ndarray, np.ndarray, list[str]]:
+    """Construit la matrice TF-IDF normalisée (L2) au format CSR: (data, indices, indptr, vocabulaire)."""
+    tokenized = [tokenize(doc) for doc in documents]
+    document_frequency = Counter(term for tokens in tokenized for term in set(tokens))
+    terms = [term for term, df in document_frequency.most_common(MAX_FEATURES) if df >= MIN_DOCUMENT_FREQUENCY]
+    vocabulary = {term: index for index, term in enumerate(terms)}
+
+    n_documents = len(documents)
+    idf = np.array([math.log((1 + n_documents) / (1 + document_frequency[term])) + 1 for term in terms],
+                   dtype=np.float32)
+
+    indptr = np.zeros(n_documents + 1, dtype=np.int64)
+    indices_parts = []
+    counts_parts = []
+    for row, tokens in enumerate(tokenized):
+        counts = Counter(vocabulary[token] for token in tokens if token in vocabulary)
+        indices_parts.append(np.fromiter(counts.keys(), dtype=np.int32, count=len(counts)))
+        counts_parts.append(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+        indptr[row + 1] = indptr[row] + len(counts)
+
+    indices = np.concatenate(indices_parts) if indices_parts else np.zeros(0, dtype=np.int32)
+    data = np.concatenate(counts_parts) if counts_parts else np.zeros(0, dtype=np.float32)
+    data = (1 + np.log(data, where=data > 0, out=np.zeros_like(data))) * idf[indices]
+
+    # Normalisation L2 de chaque ligne
+    row_ids = np.repeat(np.arange(n_documents), np.diff(indptr))
+    norms = np.sqrt(np.bincount(row_ids, weights=data.astype(np.float64) ** 2, minlength=n_documents))
+    data /= np.maximum(norms[row_ids], 1e-12).astype(np.float32)
+    return data, indices, indptr, terms
+
+
+def _similarities(data: np.ndarray, indices: np.ndarray, indptr: np.ndarray, rows: slice,
+                  centroids_t: np.ndarray) -> np.ndarray:
+    """Similarités cosinus entre un lot de lignes CSR et les centroïdes (lignes × k)."""
+    start, end = indptr[rows.start], indptr[rows.stop]
+    n_rows = rows.stop - rows.start
+    similarities = np.zeros((n_rows, centroids_t.shape[1]), dtype=np.float32)
+    if end == start:
+        return similarities
+    contributions = data[start:end, None] * centroids_t[indices[start:end]]
+    local_rows = np.repeat(np.arange(n_rows), np.diff(indptr[rows.start:rows.stop + 1]))
+    np.add.at(similarities, local_rows, contributions)
+    return similarities
+
+
+def kmeans(data: np.ndarray, indices: np.ndarray, indptr: np.ndarray, n_features: int, k: int,
+           iterations: int = KMEANS_ITERATIONS, seed: int = 0) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """K-means sphérique sur une matrice CSR normalisée.
+
+    Renvoie (labels, similarité au centroïde, centroïdes). Les lignes vides
+    (aucun terme du vocabulaire) reçoivent le label -1.
+    """
+    n_rows = len(indptr) - 1
+    row_lengths = np.diff(indptr)
+    candidates = np.flatnonzero(row_lengths > 0)
+    labels = np.full(n_rows, -1, dtype=np.int64)
+    best = np.zeros(n_rows, dtype=np.float32)
+    if len(candidates) == 0:
+        return labels, best, np.zeros((0, n_features), dtype=np.float32)
+    k = min(k, len(candidates))
+
+    rng = np.random.default_rng(seed)
+    centroids = np.zeros((k, n_features), dtype=np.float32)
+    for cluster, row in enumerate(rng.choice(candidates, size=k, replace=False)):
+        centroids[cluster, indices[indptr[row]:indptr[row + 1]]] = data[indptr[row]:indptr[row + 1]]
+
+    row_ids = np.repeat(np.arange(n_rows), row_lengths)
+    for _ in range(iterations):
+        centroids_t = np.ascontiguousarray(centroids.T)
+        for batch_start in range(0, n_rows, BATCH_SIZE):
+            rows = slice(batch_start, min(n_rows, batch_start + BATCH_SIZE))
+            similarities = _similarities(data, indices, indptr, rows, centroids_t)
+            labels[rows] = similarities.argmax(axis=1)
+            best[rows] = similarities.max(axis=1)
+        labels[row_lengths == 0] = -1
+
+        # Mise à jour : somme des lignes de chaque cluster puis renormalisation
+        assigned = labels[row_ids] >= 0
+        new_centroids = np.zeros_like(centroids)
+        np.add.at(new_centroids, (labels[row_ids][assigned], indices[assigned]), data[assigned])
+        norms = np.linalg.norm(new_centroids, axis=1, keepdims=True)
+        empty = norms[:, 0] == 0
+        new_centroids[~empty] /= norms[~empty]
+        new_centroids[empty] = centroids[empty]
+        if np.allclose(new_centroids, centroids, atol=1e-5):
+            centroids = new_centroids
+            break
+        centroids = new_centroids
+    return labels, best, centroids
+
+
+def choose_k(n_comments: int) -> int:
+    """Nombre de clusters selon le volume de commentaires."""
+    return max(2, min(MAX_CLUSTERS, int(math.sqrt(n_comments / 2))))
+
+
+def cluster_comments(all_comments: dict[str, list[str]], n_clusters: int | None = None) -> list[dict]:
+    """Regroupe les commentaires de toutes les vidéos en thèmes.
+
+    Renvoie une liste de clusters triée par taille, chacun avec sa part des
+    commentaires, sa répartition par vidéo, ses mots-clés et ses verbatims
+    les plus représentatifs.
+    """
+    texts = []
+    sources = []
+    for video_title, comments in all_comments.items():
+        texts.extend(comments)
+        sources.extend([video_title] * len(comments))
+    if not texts:
+        return []
+
+    data, indices, indptr, terms = tfidf_matrix(texts)
+    k = n_clusters or choose_k(len(texts))
+    labels, similarity, centroids = kmeans(data, indices, indptr, len(terms), k)
+
+    clusters = []
+    for cluster in range(len(centroids)):
+        members = np.flatnonzero(labels == cluster)
+        if len(members) == 0:
+            continue
+        ranked = members[np.argsort(-similarity[members])]
+        representatives = []
+        seen = set()
+        for row in ranked:
+            # Évite les verbatims quasi identiques (ponctuation, mots vides)
+            normalized = " ".join(tokenize(texts[row]))
+            if normalized in seen:
+                continue
+            seen.add(normalized)
+            representatives.append({"text": texts[row][:300], "video": sources[row]})
+            if len(representatives) >= REPRESENTATIVES_PER_CLUSTER:
+                break
+        top_terms = np.argsort(-centroids[cluster])[:KEYWORDS_PER_CLUSTER]
+        clusters.append({
+            "size": int(len(members)),
+            "share": len(members) / len(texts),
+            "videos": dict(Counter(sources[row] for row in members).most_common()),
+            "keywords": [terms[term] for term in top_terms if centroids[cluster, term] > 0],
+            "representatives": representatives,
+        })
+
+    unclustered = int(np.sum(labels < 0))
+    if unclustered:
+        clusters.append({
+            "size": unclustered,
+            "share": unclustered / len(texts),
+            "videos": dict(Counter(sources[row] for row in np.flatnonzero(labels < 0)).most_common()),
+            "keywords": [],
+            "representatives": [],
+            "unclustered": True,
+        })
+    return sorted(clusters, key=lambda c: (c.get("unclustered", False), -c["size"]))
+
+
+def format_clusters(clusters: list[dict], n_videos: int) -> str:
+    """Résumé compact des clusters destiné au prompt du LLM."""
+    blocks = []
+    for number, cluster in enumerate((c for c in clusters if not c.get("unclustered")), start=1):
+        lines = [
+            f"=== Thème {number} — {cluster['size']} commentaires ({cluster['share']:.0%}), "
+            f"présent dans {len(cluster['videos'])}/{n_videos} vidéos ==="
+        ]
+        if cluster["keywords"]:
+            lines.append("Mots-clés: " + ", ".join(cluster["keywords"]))
+        lines.append("Répartition: " + ", ".join(f"'{title}': {count}" for title, count in cluster["videos"].items()))
+        lines.append("Verbatims représentatifs:")
+        lines.extend(f'- "{rep["text"]}" (vidéo: {rep["video"]})' for rep in cluster["representatives"])
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
@@ -0,0 +1,166 @@
+"""
+Déduplication des commentaires avant construction des prompts
+Signatures MinHash sur des n-grammes de caractères, regroupement par LSH
+(bandes de signatures) et union-find : temps quasi linéaire en nombre de commentaires
+"""
+
+import re
+import unicodedata
+
+import numpy as np
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 32
+LSH_BANDS = 8  # 8 bandes de 4 lignes : candidats à partir d'environ 60 % de similarité
+SIMILARITY_THRESHOLD = 0.7  # similarité de Jaccard estimée pour fusionner deux commentaires
+MAX_SIGNATURE_BYTES = 400  # au-delà, le début du commentaire suffit à repérer un copier-coller
+HASH_BATCH_SIZE = 65536  # n-grammes hachés par lot (borne la mémoire des matrices de permutation)
+
+SPAM_PATTERNS = [
+    re.compile(r"^\W*(first|premier|première|premiere|1er|1st|second|deuxième)\W*$"),
+    re.compile(r"\b(abonne[z]?[- ]?(toi|vous)|check|visit|subscribe to) (a |à )?(ma|my|mon) (chaine|channel)\b"),
+    re.compile(r"\b(whatsapp|telegram)\b.*\+?\d{6,}"),
+]
+
+# Un lien n'est du spam que seul ou accompagné d'un appel promotionnel
+# (un commentaire qui cite sa source reste exploitable)
+LINK_PATTERN = re.compile(r"https?://\S+|www\.\S+|\S+\.com/\S*")
+PROMO_PATTERN = re.compile(r"\b(check|visit|subscribe|abonne[zr]?|promo|code|discount|réduction|gratuit|free|"
+                           r"gagne[rz]?|win|clique[zr]?|click|join|rejoin[st]|rejoignez)\b")
+
+_WHITESPACE = re.compile(r"\s+")
+_REPEATED_CHARS = re.compile(r"(.)\1{3,}")
+_LETTER = re.compile(r"[^\W\d_]")
+
+
+def normalize(text: str) -> str:
+    """Minuscules, caractères répétés et espaces multiples réduits."""
+    text = _REPEATED_CHARS.sub(r"\1\1\1", text.lower())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def _has_content(text: str) -> bool:
+    """Vrai si le texte contient une lettre, un chiffre ou un symbole (emoji compris), pas seulement de la ponctuation."""
+    return any(unicodedata.category(char)[0] in "LNS" for char in text[:64])
+
+
+def is_spam(normalized: str) -> bool:
+    """Commentaires sans contenu exploitable : vides, « first! », liens seuls ou promotionnels, autopromotion.
+
+    Les réactions courtes (« ok », « 👍🔥 ») sont conservées : elles sont comptées comme les autres.
+    """
+    if not _has_content(normalized) or any(pattern.search(normalized) for pattern in SPAM_PATTERNS):
+        return True
+    without_links = LINK_PATTERN.sub(" ", normalized)
+    if without_links == normalized:
+        return False
+    return len(_LETTER.findall(without_links, 0, 64)) < 3 or PROMO_PATTERN.search(without_links) is not None
+
+
+def _shingle_hashes(texts: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """Hachages des n-grammes d'octets de tous les textes, calculés d'un bloc.
+
+    Renvoie (hachages, décalages) : les n-grammes du texte i occupent
+    hachages[décalages[i]:décalages[i + 1]]. Un texte plus court qu'un n-gramme
+    est haché en entier.
+    """
+    encoded = [text.encode("utf-8")[:MAX_SIGNATURE_BYTES].ljust(SHINGLE_SIZE) for text in texts]
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    buffer = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+
+    # Hachage polynomial de chaque fenêtre de SHINGLE_SIZE octets
+    windows = len(buffer) - SHINGLE_SIZE + 1
+    hashes = np.zeros(windows, dtype=np.uint64)
+    for j in range(SHINGLE_SIZE):
+        hashes = hashes * np.uint64(257) + buffer[j:j + windows]
+
+    # Ne garde que les fenêtres entièrement contenues dans un texte
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    counts = lengths - SHINGLE_SIZE + 1
+    valid = np.repeat(starts, counts) + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+    return hashes[valid], np.concatenate(([0], np.cumsum(counts)))
+
+
+def minhash_signatures(texts: list[str], seed: int = 1) -> np.ndarray:
+    """Signatures MinHash (n_textes × NUM_PERMUTATIONS), calculées par lots de n-grammes."""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 1 << 63, NUM_PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 1 << 63, NUM_PERMUTATIONS, dtype=np.uint64)
+
+    flat, offsets = _shingle_hashes(texts)
+    signatures = np.empty((len(texts), NUM_PERMUTATIONS), dtype=np.uint32)
+    row = 0
+    while row < len(texts):
+        # Lot de lignes complètes dont les n-grammes tiennent dans HASH_BATCH_SIZE
+        end = max(row + 1, int(np.searchsorted(offsets, offsets[row] + HASH_BATCH_SIZE, side="right")) - 1)
+        end = min(end, len(texts))
+        chunk = flat[offsets[row]:offsets[end]]
+        # Hachage universel multiply-shift : 32 bits de poids fort de (a·h + b) mod 2^64
+        permuted = ((chunk[:, None] * a + b) >> np.uint64(32)).astype(np.uint32)
+        signatures[row:end] = np.minimum.reduceat(permuted, offsets[row:end] - offsets[row], axis=0)
+        row = end
+    return signatures
+
+
+def _find(parents: list[int], i: int) -> int:
+    while parents[i] != i:
+        parents[i] = parents[parents[i]]
+        i = parents[i]
+    return i
+
+
+def deduplicate_comments(comments: list[str]) -> tuple[list[dict], int]:
+    """Supprime le spam et fusionne les quasi-doublons.
+
+    Renvoie (entrées, nombre de spams écartés). Chaque entrée contient le texte
+    de la première occurrence (ordre d'origine conservé) et le nombre de
+    commentaires qu'elle représente.
+    """
+    # Les doublons exacts (après normalisation) sont regroupés sans calcul de signature
+    groups: dict[str, dict] = {}
+    spam = 0
+    for comment in comments:
+        norm = normalize(comment)
+        if norm in groups:
+            groups[norm]["count"] += 1
+        elif is_spam(norm):
+            spam += 1
+        else:
+            groups[norm] = {"text": comment, "count": 1}
+    if not groups:
+        return [], spam
+
+    unique = list(groups.values())
+    signatures = minhash_signatures(list(groups))
+    parents = list(range(len(unique)))
+    rows_per_band = NUM_PERMUTATIONS // LSH_BANDS
+    band_dtype = np.dtype((np.void, rows_per_band * signatures.itemsize))
+    for band in range(LSH_BANDS):
+        band_view = np.ascontiguousarray(signatures[:, band * rows_per_band:(band + 1) * rows_per_band])
+        _, first_index, bucket = np.unique(band_view.view(band_dtype).ravel(), return_index=True,
+                                           return_inverse=True)
+        # Chaque commentaire est comparé au premier de son seau, sur la signature complète
+        # pour éviter les fusions en chaîne
+        firsts = first_index[bucket.ravel()]
+        candidates = np.flatnonzero(firsts != np.arange(len(unique)))
+        if len(candidates) == 0:
+            continue
+        similarity = (signatures[candidates] == signatures[firsts[candidates]]).mean(axis=1)
+        for i, first in zip(candidates[similarity >= SIMILARITY_THRESHOLD].tolist(),
+                            firsts[candidates[similarity >= SIMILARITY_THRESHOLD]].tolist()):
+            root_first, root_i = _find(parents, first), _find(parents, i)
+            if root_first != root_i:
+                parents[max(root_first, root_i)] = min(root_first, root_i)
+
+    entries: dict[int, dict] = {}
+    for i, group in enumerate(unique):
+        root = _find(parents, i)
+        if root in entries:
+            entries[root]["count"] += group["count"]
+        else:
+            entries[root] = dict(group)
+    return list(entries.values()), spam
@@ -0,0 +1,255 @@
+"""
+Analyses en arrière-plan
+Les lots soumis par l'interface sont exécutés par des workers partagés entre
+les sessions ; résultats et avancement sont persistés dans store.py pour
+survivre à une fermeture d'onglet ou à une reconnexion
+"""
+
+import logging
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from analyzer import (
+    MAP_CONCURRENCY,
+    AnalysisResult,
+    analyze_trends,
+    cluster_trend_comments,
+    get_videos_info,
+    process_video,
+)
+from pipeline import collect_warnings, stream_concurrently
+from sources import MAX_SOURCE_VIDEOS, expand_urls, record_synced, select_changed
+from store import ACTIVE_JOB_STATUSES, Store, utc_timestamp
+from transcripts import TranscriptService
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Nombre de lots exécutés simultanément (les vidéos d'un lot sont déjà traitées en parallèle)
+MAX_CONCURRENT_JOBS = 2
+
+# Durée de conservation des analyses terminées
+JOB_RETENTION_SECONDS = 30 * 24 * 3600
+
+DEFAULT_JOB_OPTIONS = {
+    "analyze_comments": True,
+    "show_trends": True,
+    "cluster_trends": True,
+    "max_comments": 50,
+    "include_replies": False,
+    "incremental": False,
+    "max_per_source": 25,
+    "map_reduce": True,
+    "map_concurrency": MAP_CONCURRENCY,
+}
+
+
+def is_active(job: dict) -> bool:
+    return job["status"] in ACTIVE_JOB_STATUSES
+
+
+# Bases dont les analyses laissées en cours par un processus précédent ont
+# déjà été marquées interrompues : une seule fois par processus, pour ne pas
+# interrompre les lots d'un JobManager encore vivant (cache_resource vidé, etc.)
+_recovered_stores: set[str] = set()
+_recovery_lock = threading.Lock()
+
+
+def interrupt_previous_jobs(store: Store) -> int:
+    """Marque interrompues les analyses restées en cours au démarrage du processus (une fois par base)."""
+    with _recovery_lock:
+        if store.path in _recovered_stores:
+            return 0
+        _recovered_stores.add(store.path)
+        return store.interrupt_active_jobs()
+
+
+class JobManager:
+    """File d'analyses exécutées par un pool de workers partagé.
+
+    Seuls les paramètres sans secret sont persistés : les clés API et les
+    clients restent en mémoire le temps de l'exécution. Les résultats d'étape
+    publiés avant la fin d'une vidéo (points prêts avant les commentaires) ne
+    sont conservés qu'en mémoire, les résultats finaux en base.
+    """
+
+    def __init__(self, store: Store, max_workers: int = MAX_CONCURRENT_JOBS):
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._partial: dict[str, dict[tuple[int, str], AnalysisResult]] = {}
+        self._lock = threading.Lock()
+        interrupted = interrupt_previous_jobs(store)
+        if interrupted:
+            logger.warning("%d analyse(s) interrompue(s) par un redémarrage", interrupted)
+        store.purge_jobs(time.time() - JOB_RETENTION_SECONDS)
+
+    def submit(self, urls: list[str], options: dict, youtube_api_key: str, groq_client,
+               cache=None, llm_cache=None, owner: str | None = None) -> str:
+        """Enregistre un lot d'URLs et le met en file ; renvoie l'identifiant de l'analyse.
+
+        `owner` identifie la session qui a soumis le lot (voir `recent_jobs`).
+        """
+        job_id = uuid.uuid4().hex[:12]
+        params = {"urls": urls, **DEFAULT_JOB_OPTIONS, **options}
+        self.store.create_job(job_id, params, owner)
+        with self._lock:
+            self._partial[job_id] = {}
+        self._executor.submit(self._run, job_id, params, youtube_api_key, groq_client, cache, llm_cache)
+        return job_id
+
+    def get(self, job_id: str, owner: str | None) -> dict | None:
+        """Analyse `job_id` si elle appartient à `owner`, sinon None (comme une analyse inconnue).
+
+        L'identifiant seul (lien ?job=...) ne suffit pas : résultats et
+        avertissements ne sont rendus qu'à la session qui a soumis le lot.
+        `results` et `partial` supposent ce contrôle déjà fait par l'appelant.
+        """
+        job = self.store.get_job(job_id)
+        if job is None or owner is None or job["owner"] != owner:
+            return None
+        return job
+
+    def recent_jobs(self, owner: str, limit: int = 10) -> list[dict]:
+        """Dernières analyses de `owner` : les autres sessions partagent les workers, pas la liste."""
+        return self.store.recent_jobs(owner, limit)
+
+    def results(self, job_id: str, after_seq: int = 0) -> list[tuple[int, dict]]:
+        return self.store.job_results(job_id, after_seq)
+
+    def partial(self, job_id: str) -> dict[tuple[int, str], AnalysisResult]:
+        """Résultats d'étape déjà publiés {(index vidéo, étape): analyse} des vidéos en cours."""
+        with self._lock:
+            return dict(self._partial.get(job_id, {}))
+
+    def _set_partial(self, job_id: str, index: int, stage: str, analysis: AnalysisResult | None):
+        with self._lock:
+            partial = self._partial.setdefault(job_id, {})
+            if analysis is None:
+                partial.pop((index, stage), None)
+            else:
+                partial[(index, stage)] = analysis
+
+    def _run(self, job_id: str, params: dict, youtube_api_key: str, groq_client, cache, llm_cache):
+        self.store.update_job(job_id, status="running")
+        try:
+            with collect_warnings() as messages:
+                self._run_batch(job_id, params, youtube_api_key, groq_client, cache, llm_cache, messages)
+        except Exception as e:
+            logger.exception("Analyse %s en échec", job_id)
+            self.store.update_job(job_id, status="failed", error=str(e))
+        finally:
+            with self._lock:
+                self._partial.pop(job_id, None)
+
+    def _run_batch(self, job_id: str, params: dict, youtube_api_key: str, groq_client, cache, llm_cache,
+                   messages: list[str]):
+        """Déroule un lot : sources, métadonnées, vidéos en parallèle puis tendances."""
+        store = self.store
+        log = []
+
+        def publish(level: str, text: str):
+            log.append({"level": level, "text": text})
+
+        def flush_warnings():
+            # Avertissements collectés (warn) depuis le dernier appel
+            for message in messages:
+                publish("warning", message)
+            messages.clear()
+
+        # Les chaînes et playlists sont synchronisées puis développées en vidéos
+        synced_at = utc_timestamp()
+        video_ids, sources, invalid = expand_urls(params["urls"], youtube_api_key, store,
+                                                  min(params["max_per_source"], MAX_SOURCE_VIDEOS))
+        flush_warnings()
+        for url in invalid:
+            publish("warning", f"⚠️ URL invalide ignorée: {url}")
+        for source in sources:
+            publish("info", f"📺 {source['title']}: {source['new_videos']} nouvelle(s) vidéo(s), "
+                            f"{len(source['video_ids'])} retenue(s)")
+        if not video_ids:
+            publish("error", "❌ Aucune URL YouTube valide trouvée")
+            store.update_job(job_id, status="done", videos=[], messages=log)
+            return
+
+        run_metrics = metrics.Metrics()
+        with metrics.use(run_metrics):
+            videos_info = get_videos_info([vid for _, vid in video_ids], youtube_api_key, cache)
+
+        if params["incremental"]:
+            selected, skipped = select_changed(video_ids, videos_info, store)
+            if skipped:
+                publish("info", f"⏭️ {skipped} vidéo(s) sans nouveauté depuis la dernière analyse")
+            if not selected:
+                publish("success", "✅ Aucune nouveauté depuis la dernière analyse")
+                store.update_job(job_id, status="done", videos=[], messages=log)
+                return
+        else:
+            selected = [{"url": url, "video_id": video_id, "comments_since": None} for url, video_id in video_ids]
+
+        # Transcriptions du lot téléchargées dès maintenant, pendant les autres étapes
+        transcripts = TranscriptService(cache)
+        transcripts.prefetch([(entry["video_id"], (videos_info.get(entry["video_id"]) or {}).get("channel_id"))
+                              for entry in selected], run_metrics)
+
+        updates = queue.Queue()
+        jobs = [
+            {
+                "index": idx,
+                "url": entry["url"],
+                "video_id": entry["video_id"],
+                "info": videos_info.get(entry["video_id"]),
+                "youtube_api_key": youtube_api_key,
+                "groq_client": groq_client,
+                "analyze_comments": params["analyze_comments"],
+                "max_comments": params["max_comments"],
+                "include_replies": params["include_replies"],
+                "cache": cache,
+                "llm_cache": llm_cache,
+                "map_reduce": params["map_reduce"],
+                "map_concurrency": params["map_concurrency"],
+                "updates": updates,
+                "metrics": run_metrics,
+                "comments_since": entry["comments_since"],
+                "store": store,
+                "transcripts": transcripts,
+            }
+            for idx, entry in enumerate(selected)
+        ]
+        videos = [
+            {"index": job["index"], "url": job["url"], "video_id": job["video_id"], "info": job["info"]}
+            for job in jobs
+        ]
+        flush_warnings()
+        store.update_job(job_id, videos=videos, messages=log)
+
+        all_comments_data = {}
+        with transcripts:
+            for kind, payload in stream_concurrently(process_video, jobs, updates):
+                if kind == "update":
+                    self._set_partial(job_id, *payload)
+                    continue
+                store.add_job_result(job_id, payload["index"], payload)
+                record_synced(store, payload, synced_at)
+                for stage in ("points", "comments"):
+                    self._set_partial(job_id, payload["index"], stage, None)
+                if payload["comments"]:
+                    all_comments_data[payload["index"]] = (payload["title"], payload["comments"])
+
+        # Tendances multi-vidéos, dans l'ordre des URLs
+        trends = None
+        if params["show_trends"] and len(all_comments_data) >= 2:
+            ordered = dict(all_comments_data[idx] for idx in sorted(all_comments_data))
+            with metrics.use(run_metrics):
+                clusters = cluster_trend_comments(ordered) if params["cluster_trends"] else None
+                analysis = analyze_trends(ordered, groq_client, llm_cache, clusters=clusters)
+            trends = {"analysis": analysis, "clusters": clusters}
+        flush_warnings()
+
+        store.update_job(job_id, status="done", messages=log, trends=trends, metrics=run_metrics.samples)
@@ -0,0 +1,433 @@
+"""
+Appels au LLM Groq et mémoïsation de leurs réponses
+Cache adressé par contenu : hash de (modèle, prompt, max_tokens, température, mode JSON)
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from collections.abc import Callable
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import metrics
+import tokens
+from cache import DiskCache
+from pipeline import warn
+from scheduler import LLM_MAX_RETRIES, get_scheduler, is_transient, rate_limit_delay, task_priority
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+DEFAULT_MODEL = "llama-3.3-70b-versatile"
+FAST_MODEL = "llama-3.1-8b-instant"
+
+# Routage par tâche : première route dont `max_input_tokens` (taille du prompt) convient
+MODEL_ROUTES = {
+    "map": [{"model": FAST_MODEL}],
+    "comments": [{"model": FAST_MODEL, "max_input_tokens": 6000}, {"model": DEFAULT_MODEL}],
+    "points": [{"model": DEFAULT_MODEL}],
+    "trends": [{"model": DEFAULT_MODEL}],
+}
+
+# Table de routage d'une exécution (cli.py --route), propagée aux threads liés et aux tâches asyncio
+_routes: ContextVar[dict[str, list[dict]] | None] = ContextVar("llm_routes", default=None)
+
+# Modèle de secours en cas d'erreur transitoire (429, 5xx, délai dépassé) du modèle choisi.
+# Dans un seul sens : une route vers le petit modèle n'est jamais promue vers le grand, plus coûteux
+FALLBACK_MODELS = {
+    DEFAULT_MODEL: FAST_MODEL,
+}
+
+# Nombre de réponses gardées en mémoire (LRU) devant le cache disque
+LLM_CACHE_MAX_ENTRIES = 512
+
+# Durée de vie des réponses sur disque, en secondes (None = illimitée)
+LLM_CACHE_TTL = 30 * 24 * 3600
+
+
+class LLMCache:
+    """Cache LRU en mémoire des réponses LLM, adossé à un cache disque optionnel."""
+
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES, backing: DiskCache | None = None,
+                 ttl: float | None = LLM_CACHE_TTL):
+        self.max_entries = max_entries
+        self.backing = backing
+        self.ttl = ttl
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.refresh = False
+
+    def refreshing(self) -> "LLMCache":
+        """Vue du même cache qui ignore les réponses mémorisées mais enregistre les nouvelles."""
+        view = copy.copy(self)
+        view.refresh = True
+        return view
+
+    @staticmethod
+    def make_key(model: str, prompt: str, max_tokens: int, temperature: float, json_mode: bool = False) -> str:
+        """Calcule l'empreinte SHA-256 d'une requête de complétion."""
+        request = [model, prompt, max_tokens, temperature] + (["json"] if json_mode else [])
+        payload = json.dumps(request, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """Renvoie la réponse mémorisée (mémoire puis disque), ou None."""
+        if self.refresh:
+            return None
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        value = self.backing.get("llm", key) if self.backing is not None else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, value)
+        return value
+
+    def set(self, key: str, value: str):
+        """Mémorise une réponse en mémoire et sur disque."""
+        with self._lock:
+            self._remember(key, value)
+        if self.backing is not None:
+            self.backing.set("llm", key, value, self.ttl)
+
+    def _remember(self, key: str, value: str):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+# ============================================================================
+# COMPLÉTIONS
+# ============================================================================
+
+def create_groq_client(api_key: str):
+    """Crée un client Groq (bibliothèque importée au premier appel seulement).
+
+    Les retries internes du SDK sont désactivés : l'ordonnanceur gère les 429.
+    """
+    from groq import Groq
+
+    return Groq(api_key=api_key, max_retries=0)
+
+
+def create_async_groq_client(api_key: str):
+    """Crée un client AsyncGroq (boucle asyncio, voir async_analyzer.py), sans retries internes."""
+    from groq import AsyncGroq
+
+    return AsyncGroq(api_key=api_key, max_retries=0)
+
+
+def _record_usage(usage, model: str, prompt: str) -> int | None:
+    """Reporte les tokens du champ `usage` de Groq dans la mesure en cours et recale l'estimateur.
+
+    Renvoie le total de tokens consommés, ou None si l'usage est absent.
+    """
+    if usage is None:
+        return None
+    metrics.add(prompt_tokens=usage.prompt_tokens or 0, completion_tokens=usage.completion_tokens or 0)
+    tokens.observe_usage(model, prompt, usage.prompt_tokens)
+    return (usage.prompt_tokens or 0) + (usage.completion_tokens or 0)
+
+
+def with_routes(overrides: dict[str, str]) -> dict[str, list[dict]]:
+    """Table de routage où chaque tâche de `overrides` ({tâche: modèle}) utilise toujours ce modèle."""
+    unknown = sorted(set(overrides) - set(MODEL_ROUTES))
+    if unknown:
+        raise ValueError(f"Tâche(s) inconnue(s): {', '.join(unknown)} (attendu: {', '.join(MODEL_ROUTES)})")
+    return {**MODEL_ROUTES, **{task: [{"model": model}] for task, model in overrides.items()}}
+
+
+@contextmanager
+def use_routes(routes: dict[str, list[dict]] | None):
+    """Active une table de routage pour le contexte d'exécution courant (None : `MODEL_ROUTES`)."""
+    token = _routes.set(routes)
+    try:
+        yield routes
+    finally:
+        _routes.reset(token)
+
+
+def route_model(task: str, prompt_tokens: int, routes: dict[str, list[dict]] | None = None) -> str:
+    """Choisit le modèle d'une tâche selon la table de routage (active ou `MODEL_ROUTES`) et la taille du prompt."""
+    if routes is None:
+        routes = _routes.get() or MODEL_ROUTES
+    for route in routes.get(task, []):
+        max_input = route.get("max_input_tokens")
+        if max_input is None or prompt_tokens <= max_input:
+            return route["model"]
+    return DEFAULT_MODEL
+
+
+class ModelStats:
+    """Latences, erreurs et replis par modèle, agrégés sur la durée du processus."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {
+            "calls": 0, "errors": 0, "fallbacks": 0, "latency_total": 0.0, "latency_max": 0.0
+        })
+
+    def record(self, model: str, latency: float | None = None, error: bool = False, fallback: bool = False):
+        with self._lock:
+            stats = self._stats[model]
+            if latency is not None:
+                stats["calls"] += 1
+                stats["latency_total"] += latency
+                stats["latency_max"] = max(stats["latency_max"], latency)
+            if error:
+                stats["errors"] += 1
+            if fallback:
+                stats["fallbacks"] += 1
+
+    def stats(self) -> list[dict]:
+        """Renvoie les statistiques par modèle (appels réussis, erreurs, replis, latences en ms)."""
+        with self._lock:
+            return [
+                {
+                    "model": model,
+                    "calls": s["calls"],
+                    "errors": s["errors"],
+                    "fallbacks": s["fallbacks"],
+                    "latency_avg_ms": round(1000 * s["latency_total"] / s["calls"]) if s["calls"] else None,
+                    "latency_max_ms": round(1000 * s["latency_max"]),
+                }
+                for model, s in sorted(self._stats.items())
+            ]
+
+
+model_stats = ModelStats()
+
+
+class _Completion:
+    """Un appel à un modèle, hors entrées/sorties : prompt ajusté, cache, retries et comptabilité.
+
+    Partagé par `_chat_completion` et `_async_chat_completion`, qui ne font
+    qu'attendre un emplacement de l'ordonnanceur puis la réponse de Groq.
+    """
+
+    def __init__(self, prompt: str, max_tokens: int, temperature: float, model: str, cache: LLMCache | None,
+                 priority: int, retry_rate_limits: bool, json_mode: bool,
+                 accept: Callable[[str], bool] | None = None):
+        self.prompt = prompt
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.model = model
+        self.cache = cache
+        self.priority = priority
+        self.json_mode = json_mode
+        self.accept = accept
+        # Avec un modèle de secours disponible, un 429 bascule dessus au lieu d'attendre
+        self.max_retries = LLM_MAX_RETRIES if retry_rate_limits else 0
+        self.reserved_tokens = 0
+        self.key = None
+        self.started = 0.0
+
+    def prepare(self) -> str | None:
+        """Ajuste le prompt au contexte du modèle et renvoie la réponse déjà en cache (None sinon)."""
+        self.prompt, prompt_tokens = _fit_prompt(self.prompt, self.model, self.max_tokens)
+        # Réservation TPM : prompt estimé + réponse maximale, ajustée à l'usage réel en fin d'appel
+        self.reserved_tokens = prompt_tokens + self.max_tokens
+        self.key, cached = _cached_completion(self.cache, self.model, self.prompt, self.max_tokens,
+                                              self.temperature, self.json_mode, self.accept)
+        return cached
+
+    def admitted(self, queued_at: float):
+        """Emplacement obtenu : mesure l'attente dans la file de l'ordonnanceur."""
+        metrics.add(queue_seconds=time.perf_counter() - queued_at)
+        self.started = time.perf_counter()
+
+    def request(self) -> dict:
+        """Arguments de `chat.completions.create`."""
+        options = {"response_format": {"type": "json_object"}} if self.json_mode else {}
+        return {
+            "model": self.model,
+            "messages": [{"role": "user", "content": self.prompt}],
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            **options,
+        }
+
+    def failed(self, error: Exception, attempt: int) -> bool:
+        """Comptabilise un échec ; vrai s'il faut réessayer (429 avec des tentatives restantes)."""
+        model_stats.record(self.model, error=True)
+        delay = rate_limit_delay(error, attempt)
+        if delay is not None:
+            # 429 : pause du modèle pour tous les appels
+            get_scheduler().rate_limited_for(self.model, delay)
+        if delay is None or attempt == self.max_retries:
+            return False
+        metrics.add(retries=1)
+        return True
+
+    def received(self, response, ticket) -> str:
+        """Comptabilise une réponse (tokens réels, latence) et renvoie son texte."""
+        ticket.used_tokens = _record_usage(getattr(response, "usage", None), self.model, self.prompt)
+        model_stats.record(self.model, latency=time.perf_counter() - self.started)
+        get_scheduler().succeeded(self.model)
+        return response.choices[0].message.content
+
+    def store(self, content: str):
+        """Mesure la réponse et la mémorise dans le cache, si elle est acceptée."""
+        metrics.add(bytes=len((content or "").encode("utf-8")))
+        if self.cache is not None and content and (self.accept is None or self.accept(content)):
+            self.cache.set(self.key, content)
+
+
+def _attempts(prompt: str, max_tokens: int, temperature: float, model: str, cache: LLMCache | None,
+              task: str, json_mode: bool, accept: Callable[[str], bool] | None) -> list[_Completion]:
+    """Appels à tenter dans l'ordre : le modèle choisi, puis son modèle de secours éventuel."""
+    candidates = [model] + ([FALLBACK_MODELS[model]] if model in FALLBACK_MODELS else [])
+    return [_Completion(prompt, max_tokens, temperature, candidate, cache, task_priority(task),
+                        retry_rate_limits=position == len(candidates) - 1, json_mode=json_mode, accept=accept)
+            for position, candidate in enumerate(candidates)]
+
+
+def _falls_back(error: Exception, attempts: list[_Completion], position: int) -> bool:
+    """Vrai si l'échec de `attempts[position]` passe la main au modèle de secours suivant."""
+    if position == len(attempts) - 1 or not is_transient(error):
+        return False
+    model_stats.record(attempts[position].model, fallback=True)
+    metrics.add(model=attempts[position + 1].model, fallback=True)
+    return True
+
+
+def chat_completion(groq_client, prompt: str, max_tokens: int, temperature: float = 0.7,
+                    model: str | None = None, cache: LLMCache | None = None, task: str = "completion",
+                    json_mode: bool = False, accept: Callable[[str], bool] | None = None) -> str:
+    """Envoie un prompt utilisateur au LLM et renvoie le texte de la réponse (mémoïsé si cache fourni).
+
+    `json_mode` impose un objet JSON (mode JSON de Groq). `task` nomme l'appel dans les mesures
+    et sert au routage : sans `model` explicite, le modèle est choisi par `route_model`.
+    Avec `accept`, seules les réponses acceptées sont mémorisées ou reprises du cache
+    (ex: JSON conforme au schéma attendu, voir structured.py).
+    La réponse n'est pas diffusée token par token : le mode JSON de Groq ne se
+    diffuse pas, l'affichage anticipé se fait par étape (`on_update`, analyzer.py).
+    Si le modèle est limité en débit, en erreur serveur ou hors délai, son modèle de secours
+    (`FALLBACK_MODELS`) prend le relais ; les autres erreurs (400, 401...) sont relevées telles quelles.
+    """
+    if model is None:
+        model = route_model(task, tokens.count_tokens(prompt, DEFAULT_MODEL))
+    attempts = _attempts(prompt, max_tokens, temperature, model, cache, task, json_mode, accept)
+
+    with metrics.measure(f"llm:{task}", model=model):
+        for position, call in enumerate(attempts):
+            try:
+                return _chat_completion(groq_client, call)
+            except Exception as e:
+                if not _falls_back(e, attempts, position):
+                    raise
+
+
+def _chat_completion(groq_client, call: _Completion) -> str:
+    cached = call.prepare()
+    if cached is not None:
+        return cached
+
+    scheduler = get_scheduler()
+    for attempt in range(call.max_retries + 1):
+        queued_at = time.perf_counter()
+        with scheduler.slot(call.model, call.reserved_tokens, call.priority) as ticket:
+            call.admitted(queued_at)
+            try:
+                response = groq_client.chat.completions.create(**call.request())
+            except Exception as e:
+                if not call.failed(e, attempt):
+                    raise
+                continue
+            content = call.received(response, ticket)
+        break
+
+    call.store(content)
+    return content
+
+
+def _fit_prompt(prompt: str, model: str, max_tokens: int) -> tuple[str, int]:
+    """Dernier garde-fou contre les erreurs de longueur de contexte.
+
+    Renvoie le prompt et sa réservation de tokens pour l'ordonnanceur (estimation recalée sur l'usage réel).
+    """
+    budget = tokens.prompt_budget(model, max_tokens)
+    if tokens.count_tokens(prompt, model) > budget:
+        warn(f"⚠️ Prompt tronqué à {budget} tokens pour tenir dans le contexte de {model}")
+        prompt = tokens.truncate_to_tokens(prompt, budget, model)
+    return prompt, tokens.estimate_tokens(prompt, model)
+
+
+def _cached_completion(cache: LLMCache | None, model: str, prompt: str, max_tokens: int, temperature: float,
+                       json_mode: bool, accept: Callable[[str], bool] | None = None) -> tuple[str | None, str | None]:
+    """Clé de cache de l'appel et réponse déjà mémorisée (None si absente, refusée par `accept` ou sans cache)."""
+    if cache is None:
+        return None, None
+    key = LLMCache.make_key(model, prompt, max_tokens, temperature, json_mode)
+    cached = cache.get(key)
+    if cached is not None and accept is not None and not accept(cached):
+        # Réponse invalide mémorisée avant ce contrôle : redemandée puis remplacée
+        cached = None
+    if cached is not None:
+        metrics.add(cache_hit=True)
+    return key, cached
+
+
+# ============================================================================
+# COMPLÉTIONS ASYNCHRONES
+# ============================================================================
+
+async def async_chat_completion(groq_client, prompt: str, max_tokens: int, temperature: float = 0.7,
+                                model: str | None = None, cache: LLMCache | None = None,
+                                task: str = "completion", json_mode: bool = False,
+                                accept: Callable[[str], bool] | None = None) -> str:
+    """Variante asynchrone de `chat_completion` pour un client AsyncGroq.
+
+    Mêmes routage, replis, cache, ordonnancement et mesures (`_Completion`) ;
+    l'attente d'un emplacement et l'appel réseau cèdent la boucle d'événements.
+    """
+    if model is None:
+        # Comptage des tokens (CPU) hors de la boucle d'événements
+        model = route_model(task, await asyncio.to_thread(tokens.count_tokens, prompt, DEFAULT_MODEL))
+    attempts = _attempts(prompt, max_tokens, temperature, model, cache, task, json_mode, accept)
+
+    with metrics.measure(f"llm:{task}", model=model):
+        for position, call in enumerate(attempts):
+            try:
+                return await _async_chat_completion(groq_client, call)
+            except Exception as e:
+                if not _falls_back(e, attempts, position):
+                    raise
+
+
+async def _async_chat_completion(groq_client, call: _Completion) -> str:
+    # Comptage des tokens et cache SQLite hors de la boucle d'événements
+    cached = await asyncio.to_thread(call.prepare)
+    if cached is not None:
+        return cached
+
+    scheduler = get_scheduler()
+    for attempt in range(call.max_retries + 1):
+        queued_at = time.perf_counter()
+        async with scheduler.async_slot(call.model, call.reserved_tokens, call.priority) as ticket:
+            call.admitted(queued_at)
+            try:
+                response = await groq_client.chat.completions.create(**call.request())
+            except Exception as e:
+                if not call.failed(e, attempt):
+                    raise
+                continue
+            content = call.received(response, ticket)
+        break
+
+    await asyncio.to_thread(call.store, content)
+    return content
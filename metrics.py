@@ -0,0 +1,149 @@
+"""
+Instrumentation du pipeline : temps, octets, tokens et hits de cache par étape
+Les mesures sont rattachées à la vidéo en cours via des variables de contexte
+et exportables en JSON ou au format texte Prometheus
+"""
+
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+METRIC_PREFIX = "youtube_analyzer"
+
+_collector: ContextVar["Metrics | None"] = ContextVar("metrics_collector", default=None)
+_video_id: ContextVar[str | None] = ContextVar("metrics_video_id", default=None)
+_sample: ContextVar[dict | None] = ContextVar("metrics_sample", default=None)
+
+
+class Metrics:
+    """Collecteur thread-safe des mesures d'une exécution du pipeline."""
+
+    def __init__(self):
+        self.samples: list[dict] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_samples(cls, samples: list[dict]) -> "Metrics":
+        """Reconstruit un collecteur à partir d'échantillons persistés (ex: analyse en arrière-plan)."""
+        collector = cls()
+        collector.samples = list(samples)
+        return collector
+
+    def _append(self, sample: dict):
+        with self._lock:
+            self.samples.append(sample)
+
+    def add(self, sample: dict, **values):
+        """Ajoute des compteurs (octets, tokens...) à un échantillon en cours."""
+        with self._lock:
+            for key, value in values.items():
+                if isinstance(value, bool):
+                    sample[key] = sample.get(key, False) or value
+                elif isinstance(value, (int, float)):
+                    sample[key] = sample.get(key, 0) + value
+                else:
+                    sample[key] = value
+
+    def for_video(self, video_id: str) -> list[dict]:
+        with self._lock:
+            return [sample for sample in self.samples if sample["video_id"] == video_id]
+
+    def summary(self) -> list[dict]:
+        """Agrège les échantillons par étape."""
+        totals = defaultdict(lambda: {"calls": 0, "seconds": 0.0, "bytes": 0, "prompt_tokens": 0,
+                                      "completion_tokens": 0, "cache_hits": 0})
+        with self._lock:
+            for sample in self.samples:
+                total = totals[sample["stage"]]
+                total["calls"] += 1
+                total["seconds"] += sample["seconds"]
+                total["bytes"] += sample.get("bytes", 0)
+                total["prompt_tokens"] += sample.get("prompt_tokens", 0)
+                total["completion_tokens"] += sample.get("completion_tokens", 0)
+                total["cache_hits"] += int(sample.get("cache_hit", False))
+        return [{"stage": stage, **total, "seconds": round(total["seconds"], 6)}
+                for stage, total in sorted(totals.items())]
+
+    def to_json(self) -> str:
+        with self._lock:
+            samples = list(self.samples)
+        return json.dumps({"summary": self.summary(), "samples": samples}, ensure_ascii=False, indent=2)
+
+    def to_prometheus(self) -> str:
+        """Exporte les agrégats par étape au format d'exposition texte Prometheus."""
+        summary = self.summary()
+        lines = [
+            f"# HELP {METRIC_PREFIX}_stage_seconds Durée des appels par étape",
+            f"# TYPE {METRIC_PREFIX}_stage_seconds summary",
+        ]
+        for s in summary:
+            lines.append(f'{METRIC_PREFIX}_stage_seconds_sum{{stage="{s["stage"]}"}} {s["seconds"]}')
+            lines.append(f'{METRIC_PREFIX}_stage_seconds_count{{stage="{s["stage"]}"}} {s["calls"]}')
+
+        def counter(name: str, help_text: str, values: list[tuple[str, int]]):
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} counter")
+            for labels, value in values:
+                lines.append(f"{METRIC_PREFIX}_{name}{{{labels}}} {value}")
+
+        counter("stage_bytes_total", "Octets reçus par étape",
+                [(f'stage="{s["stage"]}"', s["bytes"]) for s in summary])
+        counter("llm_tokens_total", "Tokens consommés par les appels LLM",
+                [(f'stage="{s["stage"]}",kind="{kind}"', s[f"{kind}_tokens"])
+                 for s in summary if s["stage"].startswith("llm") for kind in ("prompt", "completion")])
+        counter("cache_hits_total", "Appels servis par un cache",
+                [(f'stage="{s["stage"]}"', s["cache_hits"]) for s in summary])
+        return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def use(collector: "Metrics | None", video_id: str | None = None):
+    """Active un collecteur (et la vidéo courante) pour le contexte d'exécution courant."""
+    collector_token = _collector.set(collector)
+    video_token = _video_id.set(video_id)
+    try:
+        yield collector
+    finally:
+        _video_id.reset(video_token)
+        _collector.reset(collector_token)
+
+
+@contextmanager
+def measure(stage: str, **fields):
+    """Chronomètre un appel et l'enregistre dans le collecteur actif (s'il y en a un)."""
+    collector = _collector.get()
+    if collector is None:
+        yield {}
+        return
+    sample = {"video_id": _video_id.get(), "stage": stage, **fields}
+    token = _sample.set(sample)
+    start = time.perf_counter()
+    try:
+        yield sample
+    finally:
+        sample["seconds"] = time.perf_counter() - start
+        _sample.reset(token)
+        collector._append(sample)
+
+
+def add(**values):
+    """Ajoute des compteurs à la mesure en cours (sans effet hors de `measure`)."""
+    collector = _collector.get()
+    sample = _sample.get()
+    if collector is not None and sample is not None:
+        collector.add(sample, **values)
+
+
+def timed(stage: str):
+    """Décorateur : mesure chaque appel de la fonction sous le nom d'étape `stage`."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with measure(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,148 @@
+"""
+Moteur d'exécution concurrente du pipeline d'analyse
+Parallélisme borné par backend (YouTube Data API, transcriptions, Groq)
+"""
+
+import contextvars
+import logging
+import queue
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from contextlib import contextmanager
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# LIMITES DE CONCURRENCE PAR BACKEND
+# ============================================================================
+
+# Nombre maximal d'appels simultanés vers chaque service externe
+BACKEND_LIMITS = {
+    "youtube": 8,
+    "transcript": 4,
+    "groq": 4,
+}
+
+# Nombre maximal de vidéos traitées en parallèle
+MAX_VIDEO_WORKERS = 8
+
+# Fréquence à laquelle le thread principal relève les mises à jour des workers
+UPDATES_POLL_INTERVAL = 0.1
+
+
+class BackendLimiter:
+    """Sémaphores nommés bornant le nombre d'appels simultanés par backend."""
+
+    def __init__(self, limits: dict[str, int]):
+        self._semaphores = {name: threading.BoundedSemaphore(limit) for name, limit in limits.items()}
+
+    @contextmanager
+    def slot(self, backend: str):
+        """Réserve un emplacement pour le backend le temps du bloc `with`."""
+        semaphore = self._semaphores.get(backend)
+        if semaphore is None:
+            yield
+            return
+        with semaphore:
+            yield
+
+
+limiter = BackendLimiter(BACKEND_LIMITS)
+
+
+def backend_slot(backend: str):
+    """Raccourci vers le limiteur partagé du module."""
+    return limiter.slot(backend)
+
+
+# ============================================================================
+# AVERTISSEMENTS
+# ============================================================================
+
+# Liste collectant les avertissements de la vidéo en cours (suit les threads liés et les tâches asyncio)
+_warnings: contextvars.ContextVar[list[str] | None] = contextvars.ContextVar("pipeline_warnings", default=None)
+_warning_sink: Callable[[str], Any] | None = None
+
+
+def set_warning_sink(sink: Callable[[str], Any] | None):
+    """Définit la fonction d'affichage des avertissements hors workers (ex: st.warning)."""
+    global _warning_sink
+    _warning_sink = sink
+
+
+def warn(message: str):
+    """Émet un avertissement, ou le collecte si l'on est dans un worker du pipeline."""
+    collected = _warnings.get()
+    if collected is not None:
+        collected.append(message)
+    elif _warning_sink is not None:
+        _warning_sink(message)
+    else:
+        logger.warning(message)
+
+
+@contextmanager
+def collect_warnings():
+    """Collecte les avertissements émis dans le contexte courant (thread ou tâche asyncio) au lieu de les afficher."""
+    messages: list[str] = []
+    token = _warnings.set(messages)
+    try:
+        yield messages
+    finally:
+        _warnings.reset(token)
+
+
+def bind_context(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Enveloppe `func` pour l'exécuter dans un autre thread avec le contexte de l'appelant.
+
+    Les avertissements rejoignent le collecteur de l'appelant et les variables
+    de contexte (ex: mesures de la vidéo en cours) sont propagées.
+    """
+    context = contextvars.copy_context()
+
+    def wrapper(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+
+    return wrapper
+
+
+# ============================================================================
+# EXÉCUTION
+# ============================================================================
+
+def run_concurrently(func: Callable[..., Any], items: Iterable[Any],
+                     max_workers: int = MAX_VIDEO_WORKERS) -> Iterator[Any]:
+    """Applique `func` à chaque élément en parallèle et renvoie les résultats dès qu'ils sont prêts."""
+    items = list(items)
+    if not items:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as executor:
+        futures = [executor.submit(func, item) for item in items]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def stream_concurrently(func: Callable[..., Any], items: Iterable[Any], updates: queue.Queue,
+                        max_workers: int = MAX_VIDEO_WORKERS) -> Iterator[tuple[str, Any]]:
+    """Comme `run_concurrently`, mais relaie aussi les mises à jour publiées par les workers.
+
+    Produit des tuples ("update", message) pour chaque élément déposé dans `updates`
+    et ("result", résultat) pour chaque élément terminé. Les mises à jour d'un
+    élément sont toujours relayées avant son résultat.
+    """
+    items = list(items)
+    if not items:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as executor:
+        pending = {executor.submit(func, item) for item in items}
+        while pending:
+            done, pending = wait(pending, timeout=UPDATES_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            while True:
+                try:
+                    yield "update", updates.get_nowait()
+                except queue.Empty:
+                    break
+            for future in done:
+                yield "result", future.result()
@@ -0,0 +1,203 @@
+"""
+Rendu HTML des cartes de résultats, indépendant de Streamlit
+Chaque analyse (JSON structuré, ou texte pour les anciennes réponses) est
+convertie une seule fois en modèle d'affichage puis émise en un seul bloc HTML
+(un seul élément st.markdown par carte au lieu d'un par ligne)
+"""
+
+import html
+import json
+import re
+from collections.abc import Callable
+from functools import lru_cache, wraps
+
+from transcripts import format_timestamp, timestamp_url
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Cartes mémorisées (les reruns réaffichent les mêmes analyses)
+RENDER_CACHE_SIZE = 512
+
+# Sections de l'analyse des commentaires : (champ du schéma "comments", titre affiché)
+COMMENTS_SECTIONS = [
+    ("appreciated", "Points appréciés"),
+    ("criticisms", "Critiques principales"),
+    ("questions", "Questions fréquentes"),
+    ("insights", "Insights surprenants"),
+]
+
+_POINT_LINE = re.compile(r'^(\d+)\.\s*(.+)')
+_BOLD = re.compile(r'\*\*(.+?)\*\*')
+_HEADING_MARKS = re.compile(r'[\*#]+')
+
+
+def _inline(text: str) -> str:
+    """Échappe le texte du LLM et conserve seulement le gras markdown."""
+    return _BOLD.sub(r'<strong>\1</strong>', html.escape(text, quote=False))
+
+
+def _is_heading(line: str) -> bool:
+    return line.startswith('**') or line.startswith('##')
+
+
+def _is_bullet(line: str) -> bool:
+    return line.startswith('-') or line.startswith('•')
+
+
+# ============================================================================
+# MODÈLES STRUCTURÉS
+# ============================================================================
+
+def _memoized(render: Callable[..., str]) -> Callable[..., str]:
+    """Mémorise une carte par contenu : les documents JSON sont indexés par leur forme canonique."""
+    @lru_cache(maxsize=RENDER_CACHE_SIZE)
+    def cached(key: str, structured: bool, *args):
+        return render(json.loads(key) if structured else key, *args)
+
+    @wraps(render)
+    def wrapper(analysis: dict | str, *args):
+        if isinstance(analysis, dict):
+            return cached(json.dumps(analysis, ensure_ascii=False, sort_keys=True), True, *args)
+        return cached(analysis, False, *args)
+    return wrapper
+
+
+def parse_points(analysis: str) -> list[dict]:
+    """Points numérotés ({"number", "text"}) ; une ligne non numérotée prolonge le point précédent."""
+    points = []
+    for line in analysis.strip().split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        match = _POINT_LINE.match(line)
+        if match:
+            points.append({"number": match.group(1), "text": match.group(2)})
+        elif points:
+            points[-1]["text"] += f" {line}"
+    return points
+
+
+def parse_sections(analysis: str) -> list[dict]:
+    """Sections ({"title", "lines"}) délimitées par les lignes **titre** ou ## titre.
+
+    Chaque ligne est {"kind": "bullet" | "text", "text"} ; les lignes placées
+    avant le premier titre forment une section sans titre.
+    """
+    sections = [{"title": None, "lines": []}]
+    for line in analysis.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        if _is_heading(line):
+            sections.append({"title": _HEADING_MARKS.sub('', line).strip(), "lines": []})
+        elif _is_bullet(line):
+            sections[-1]["lines"].append({"kind": "bullet", "text": line.lstrip('-•').strip()})
+        else:
+            sections[-1]["lines"].append({"kind": "text", "text": line})
+    return [section for section in sections if section["title"] is not None or section["lines"]]
+
+
+def points_model(analysis: dict | str) -> list[dict]:
+    """Points numérotés ({"number", "text", "start"}) ; "start" (secondes) est None si inconnu."""
+    if isinstance(analysis, dict):
+        return [{"number": str(number), "text": point["text"], "start": point.get("start")}
+                for number, point in enumerate(analysis["points"], start=1)]
+    return [{**point, "start": None} for point in parse_points(analysis)]
+
+
+def comments_model(analysis: dict | str) -> list[dict]:
+    """Sections de l'analyse des commentaires (schéma "comments" ou texte historique)."""
+    if not isinstance(analysis, dict):
+        return parse_sections(analysis)
+    sentiment = analysis["sentiment"]
+    if analysis.get("score") is not None:
+        sentiment += f" (Note: {analysis['score']:g}/10)"
+    sections = [{"title": "Sentiment général", "lines": [{"kind": "text", "text": sentiment}]}]
+    for field, title in COMMENTS_SECTIONS:
+        if analysis.get(field):
+            sections.append({"title": title, "lines": [{"kind": "bullet", "text": text} for text in analysis[field]]})
+    return sections
+
+
+def trends_model(analysis: dict | str) -> list[dict]:
+    """Sections des tendances : constats puis citations (schéma "trends" ou texte historique)."""
+    if not isinstance(analysis, dict):
+        return parse_sections(analysis)
+    return [
+        {
+            "title": section["title"],
+            "lines": [{"kind": "text", "text": text} for text in section.get("items", [])]
+                     + [{"kind": "quote", "text": text} for text in section.get("quotes", [])],
+        }
+        for section in analysis["sections"]
+    ]
+
+
+# ============================================================================
+# CARTES HTML
+# ============================================================================
+
+def _card(color: str, icon: str, title: str, subtitle: str, badge: str, body: str) -> str:
+    # Une seule ligne : une indentation de 4 espaces serait lue comme du code par le markdown
+    return (
+        f'<div class="result-card card-{color}">'
+        f'<div class="card-header">'
+        f'<span class="card-icon">{icon}</span>'
+        f'<div><p class="card-title">{title}</p><p class="card-subtitle">{html.escape(subtitle)}</p></div>'
+        f'<span class="badge badge-{color}" style="margin-left: auto;">{badge}</span>'
+        f'</div>{body}</div>'
+    )
+
+
+def _point_time(video_id: str | None, start: float | None) -> str:
+    if video_id is None or start is None:
+        return ""
+    return (f' <a class="point-time" href="{html.escape(timestamp_url(video_id, start))}" target="_blank">'
+            f'⏱️ {format_timestamp(start)}</a>')
+
+
+@_memoized
+def points_card(analysis: dict | str, video_title: str, video_id: str | None = None) -> str:
+    """Carte des 10 points d'une vidéo ; chaque point daté renvoie à sa position dans la vidéo."""
+    body = "".join(
+        f'<div class="point-item"><span class="point-number">{point["number"]}</span>'
+        f'<span class="point-text">{_inline(point["text"])}{_point_time(video_id, point["start"])}</span></div>'
+        for point in points_model(analysis)
+    )
+    return _card("green", "💎", "10 Pépites Méconnues", video_title, "TRANSCRIPTION", body)
+
+
+@_memoized
+def comments_card(analysis: dict | str, video_title: str) -> str:
+    """Carte de l'analyse des commentaires d'une vidéo."""
+    parts = []
+    for section in comments_model(analysis):
+        if section["title"] is not None:
+            parts.append(f'<p class="card-section-title">{_inline(section["title"])}</p>')
+        for line in section["lines"]:
+            if line["kind"] == "bullet":
+                parts.append(f'<div class="comment-insight">{_inline(line["text"])}</div>')
+            else:
+                parts.append(f'<p class="card-text">{_inline(line["text"])}</p>')
+    return _card("yellow", "💬", "Analyse des Commentaires", video_title, "AUDIENCE", "".join(parts))
+
+
+@_memoized
+def trends_card(analysis: dict | str) -> str:
+    """Carte des tendances multi-vidéos : chaque section est un bloc qui contient ses lignes."""
+    parts = []
+    for section in trends_model(analysis):
+        if section["title"] is None:
+            parts.extend(f'<p class="card-text">{_inline(line["text"])}</p>' for line in section["lines"])
+            continue
+        descriptions = "".join(
+            f'<p class="trend-quote">« {_inline(line["text"])} »</p>' if line["kind"] == "quote"
+            else f'<p class="trend-description">{_inline(line["text"])}</p>'
+            for line in section["lines"]
+        )
+        parts.append(f'<div class="trend-item"><p class="trend-title">🔮 {_inline(section["title"])}</p>'
+                      f'{descriptions}</div>')
+    return _card("purple", "📊", "Tendances Multi-Vidéos", "Points communs entre les communautés",
+                 "TENDANCES", "".join(parts))
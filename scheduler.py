@@ -0,0 +1,343 @@
+"""
+Planification des appels Groq
+Seaux à jetons par modèle pour les limites RPM (requêtes/minute) et TPM
+(tokens/minute), file d'attente à priorités et pause automatique sur 429
+"""
+
+import asyncio
+import itertools
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from pipeline import BACKEND_LIMITS
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Limites par modèle (offre gratuite de Groq) ; les modèles absents utilisent DEFAULT_RATE_LIMITS
+GROQ_RATE_LIMITS = {
+    "llama-3.3-70b-versatile": {"rpm": 30, "tpm": 12_000},
+    "llama-3.1-8b-instant": {"rpm": 30, "tpm": 6_000},
+}
+DEFAULT_RATE_LIMITS = {"rpm": 30, "tpm": 6_000}
+
+# Priorité par tâche (plus petit = servi en premier) : les 10 points d'abord, les tendances en dernier
+TASK_PRIORITIES = {
+    "map": 0,
+    "points": 0,
+    "comments": 1,
+    "trends": 2,
+}
+DEFAULT_PRIORITY = 1
+
+# Retries sur 429 (le client Groq est créé sans retries internes)
+LLM_MAX_RETRIES = 5
+LLM_BACKOFF_BASE = 1.0
+LLM_BACKOFF_MAX = 60.0
+
+# Adaptation du débit : réduction multiplicative sur 429, remontée additive sur succès
+RATE_DECREASE_FACTOR = 0.7
+RATE_INCREASE_STEP = 0.05
+RATE_MIN_FRACTION = 0.2
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def parse_duration(value: str | None) -> float | None:
+    """Convertit un délai d'en-tête ("2", "7.66s", "1m30.5s", "250ms") en secondes."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    units = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    return sum(float(amount) * units[unit] for amount, unit in parts)
+
+
+def _status(error: Exception) -> int | None:
+    """Statut HTTP porté par une erreur du client Groq (ou de sa réponse), s'il y en a un."""
+    return getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+
+
+def is_transient(error: Exception) -> bool:
+    """Vrai pour une limite de débit (429), une erreur serveur (5xx), un délai dépassé ou une coupure réseau.
+
+    Seules ces erreurs justifient de basculer sur un autre modèle ; une requête
+    invalide (400) ou une clé refusée (401) échouerait de la même façon.
+    """
+    status = _status(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    # Erreurs de connexion du SDK (APITimeoutError en hérite) ; groq est déjà chargé s'il les a levées
+    groq = sys.modules.get("groq")
+    connection_errors = (groq.APIConnectionError,) if groq is not None else ()
+    return isinstance(error, (TimeoutError, ConnectionError) + connection_errors)
+
+
+def rate_limit_delay(error: Exception, attempt: int) -> float | None:
+    """Délai avant nouvel essai si `error` est une limite de débit (429), sinon None."""
+    if _status(error) != 429:
+        return None
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    delays = [parse_duration(headers.get(name)) for name in
+              ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")]
+    server_delay = max((d for d in delays if d is not None), default=None)
+    if server_delay is not None:
+        return min(LLM_BACKOFF_MAX, server_delay)
+    # Backoff exponentiel avec "full jitter" si le serveur n'indique rien
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
+
+
+class TokenBucket:
+    """Seau à jetons rechargé en continu (capacité = limite par minute)."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.nominal_rate = self.rate
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Secondes avant que `amount` jetons soient disponibles (0 si tout de suite)."""
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+    def give_back(self, amount: float):
+        self.level = min(self.capacity, self.level + amount)
+
+
+class _ModelState:
+    def __init__(self, limits: dict):
+        self.requests = TokenBucket(limits["rpm"])
+        self.tokens = TokenBucket(limits["tpm"])
+        self.paused_until = 0.0
+
+
+class Ticket:
+    """Réservation accordée par l'ordonnanceur pour un appel."""
+
+    def __init__(self, model: str, reserved_tokens: int):
+        self.model = model
+        self.reserved_tokens = reserved_tokens
+        self.used_tokens: int | None = None
+
+
+class LLMScheduler:
+    """Ordonnanceur partagé des appels LLM.
+
+    Un appel n'est admis que s'il est le plus prioritaire en attente, qu'un
+    emplacement de concurrence est libre et que les seaux RPM/TPM de son modèle
+    le permettent. Les tokens réservés (prompt estimé + max_tokens) sont
+    partiellement rendus une fois l'usage réel connu.
+    """
+
+    def __init__(self, rate_limits: dict[str, dict] | None = None, default_limits: dict = DEFAULT_RATE_LIMITS,
+                 max_concurrent: int = BACKEND_LIMITS["groq"]):
+        self.rate_limits = rate_limits if rate_limits is not None else GROQ_RATE_LIMITS
+        self.default_limits = default_limits
+        self.max_concurrent = max_concurrent
+        self._models: dict[str, _ModelState] = {}
+        self._waiting: list[tuple[int, int, str]] = []
+        self._sequence = itertools.count()
+        self._running = 0
+        self._condition = threading.Condition()
+        # Appels asynchrones en attente : (boucle, événement) réveillés avec les threads
+        self._async_waiters: dict[tuple[int, int, str], tuple[asyncio.AbstractEventLoop, asyncio.Event]] = {}
+        self.rate_limited = 0
+
+    def _state(self, model: str) -> _ModelState:
+        state = self._models.get(model)
+        if state is None:
+            state = self._models[model] = _ModelState(self.rate_limits.get(model, self.default_limits))
+        return state
+
+    def _notify(self):
+        """Réveille les appels en attente (verrou tenu par l'appelant).
+
+        Côté asynchrone, seul le premier appel en attente de chaque modèle peut
+        être admis : les autres sont réveillés quand ils passent en tête.
+        """
+        self._condition.notify_all()
+        if not self._async_waiters:
+            return
+        heads: dict[str, tuple[int, int, str]] = {}
+        for entry in self._waiting:
+            if entry[2] not in heads or entry < heads[entry[2]]:
+                heads[entry[2]] = entry
+        for entry in heads.values():
+            waiter = self._async_waiters.get(entry)
+            if waiter is not None:
+                loop, event = waiter
+                loop.call_soon_threadsafe(event.set)
+
+    def _admission_delay(self, state: _ModelState, tokens: int, now: float) -> float:
+        state.requests.refill(now)
+        state.tokens.refill(now)
+        return max(state.paused_until - now, state.requests.wait_time(1), state.tokens.wait_time(tokens))
+
+    def _try_admit(self, entry: tuple[int, int, str], tokens: int) -> tuple[bool, float | None]:
+        """Admet l'appel en attente `entry` si c'est son tour (verrou tenu par l'appelant).
+
+        Renvoie (admis, délai) : le délai avant la prochaine tentative utile,
+        ou None s'il faut attendre la fin d'un autre appel.
+        """
+        model = entry[2]
+        # Priorité stricte entre appels d'un même modèle : un modèle saturé ne bloque pas les autres
+        first_for_model = min(e for e in self._waiting if e[2] == model)
+        if first_for_model != entry or self._running >= self.max_concurrent:
+            return False, None
+        state = self._state(model)
+        delay = self._admission_delay(state, tokens, time.monotonic())
+        if delay > 0:
+            return False, delay
+        self._waiting.remove(entry)
+        state.requests.take(1)
+        state.tokens.take(tokens)
+        self._running += 1
+        self._notify()
+        return True, None
+
+    def _withdraw(self, entry: tuple[int, int, str]):
+        with self._condition:
+            self._waiting.remove(entry)
+            self._notify()
+
+    def _release(self, ticket: Ticket):
+        with self._condition:
+            self._running -= 1
+            if ticket.used_tokens is not None and ticket.used_tokens < ticket.reserved_tokens:
+                self._state(ticket.model).tokens.give_back(ticket.reserved_tokens - ticket.used_tokens)
+            self._notify()
+
+    @contextmanager
+    def slot(self, model: str, tokens: int, priority: int = DEFAULT_PRIORITY):
+        """Attend son tour puis réserve 1 requête et `tokens` tokens pour le bloc `with`."""
+        entry = (priority, next(self._sequence), model)
+        with self._condition:
+            self._waiting.append(entry)
+            try:
+                while True:
+                    admitted, delay = self._try_admit(entry, tokens)
+                    if admitted:
+                        break
+                    self._condition.wait(timeout=delay)
+            except BaseException:
+                self._waiting.remove(entry)
+                self._notify()
+                raise
+
+        ticket = Ticket(model, tokens)
+        try:
+            yield ticket
+        finally:
+            self._release(ticket)
+
+    @asynccontextmanager
+    async def async_slot(self, model: str, tokens: int, priority: int = DEFAULT_PRIORITY):
+        """Variante asynchrone de `slot` : l'attente cède la boucle d'événements au lieu de bloquer un thread."""
+        entry = (priority, next(self._sequence), model)
+        wakeup = asyncio.Event()
+        with self._condition:
+            self._waiting.append(entry)
+            self._async_waiters[entry] = (asyncio.get_running_loop(), wakeup)
+        try:
+            while True:
+                with self._condition:
+                    wakeup.clear()
+                    admitted, delay = self._try_admit(entry, tokens)
+                if admitted:
+                    break
+                try:
+                    await asyncio.wait_for(wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self._withdraw(entry)
+            raise
+        finally:
+            with self._condition:
+                self._async_waiters.pop(entry, None)
+
+        ticket = Ticket(model, tokens)
+        try:
+            yield ticket
+        finally:
+            self._release(ticket)
+
+    def rate_limited_for(self, model: str, delay: float):
+        """Suspend les admissions du modèle après un 429 et réduit son débit."""
+        with self._condition:
+            self.rate_limited += 1
+            state = self._state(model)
+            state.paused_until = max(state.paused_until, time.monotonic() + delay)
+            for bucket in (state.requests, state.tokens):
+                bucket.rate = max(bucket.nominal_rate * RATE_MIN_FRACTION, bucket.rate * RATE_DECREASE_FACTOR)
+            self._notify()
+
+    def succeeded(self, model: str):
+        """Remonte progressivement le débit du modèle vers sa limite nominale."""
+        with self._condition:
+            state = self._state(model)
+            for bucket in (state.requests, state.tokens):
+                bucket.rate = min(bucket.nominal_rate, bucket.rate + bucket.nominal_rate * RATE_INCREASE_STEP)
+
+    def stats(self) -> list[dict]:
+        """État courant par modèle (débits effectifs et jetons disponibles)."""
+        with self._condition:
+            now = time.monotonic()
+            rows = []
+            for model, state in sorted(self._models.items()):
+                state.requests.refill(now)
+                state.tokens.refill(now)
+                rows.append({
+                    "model": model,
+                    "rpm": round(state.requests.rate * 60, 1),
+                    "tpm": round(state.tokens.rate * 60),
+                    "tokens_available": round(state.tokens.level),
+                    "paused_s": round(max(0.0, state.paused_until - now), 2),
+                })
+            return rows
+
+
+_scheduler: LLMScheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> LLMScheduler:
+    """Renvoie l'ordonnanceur partagé du processus (créé au premier appel)."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler()
+        return _scheduler
+
+
+def set_scheduler(scheduler: LLMScheduler):
+    """Remplace l'ordonnanceur partagé (autres limites de débit, backend simulé...)."""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = scheduler
+
+
+def task_priority(task: str) -> int:
+    return TASK_PRIORITIES.get(task, DEFAULT_PRIORITY)
@@ -0,0 +1,190 @@
+"""
+Chaînes et playlists YouTube : résolution des URLs, énumération paginée des
+vidéos et synchronisation incrémentale à partir de l'état enregistré dans store.py
+"""
+
+import re
+
+from analyzer import extract_video_id, iter_pages
+from pipeline import warn
+from store import Store
+from youtube_api import get_client as youtube_client
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Nombre maximal de vidéos retenues par chaîne ou playlist
+MAX_SOURCE_VIDEOS = 500
+
+# Taille maximale d'une page playlistItems
+PLAYLIST_PAGE_SIZE = 50
+
+SOURCE_PATTERNS = [
+    ("playlist", re.compile(r'youtube\.com/(?:playlist|watch)\?(?:.*&)?list=([a-zA-Z0-9_-]+)')),
+    ("channel", re.compile(r'youtube\.com/channel/(UC[a-zA-Z0-9_-]{22})')),
+    ("handle", re.compile(r'youtube\.com/(@[\w.-]+)')),
+    ("user", re.compile(r'youtube\.com/user/([\w.-]+)')),
+    # Les anciennes URLs personnalisées (/c/nom) correspondent en général au handle @nom
+    ("handle", re.compile(r'youtube\.com/c/([\w.-]+)')),
+]
+
+
+def parse_source(url: str) -> tuple[str, str] | None:
+    """Identifie une URL de playlist ou de chaîne : (type, identifiant), ou None."""
+    for kind, pattern in SOURCE_PATTERNS:
+        match = pattern.search(url)
+        if match:
+            value = match.group(1)
+            if kind == "handle" and not value.startswith("@"):
+                value = f"@{value}"
+            return kind, value
+    return None
+
+
+def resolve_source(kind: str, value: str, api_key: str) -> dict:
+    """Résout une chaîne ou une playlist en playlist à parcourir (uploads pour une chaîne)."""
+    client = youtube_client()
+    if kind == "playlist":
+        items = client.get("playlists", {"part": "snippet", "id": value, "key": api_key}).get("items", [])
+        if not items:
+            raise ValueError(f"playlist introuvable: {value}")
+        return {"kind": kind, "title": items[0]["snippet"]["title"], "playlist_id": value}
+
+    lookup = {"channel": "id", "handle": "forHandle", "user": "forUsername"}[kind]
+    items = client.get("channels", {"part": "snippet,contentDetails", lookup: value, "key": api_key}).get("items", [])
+    if not items:
+        raise ValueError(f"chaîne introuvable: {value}")
+    return {
+        "kind": kind,
+        "title": items[0]["snippet"]["title"],
+        "playlist_id": items[0]["contentDetails"]["relatedPlaylists"]["uploads"],
+    }
+
+
+def iter_playlist_videos(playlist_id: str, api_key: str):
+    """Vidéos d'une playlist ({"video_id", "published_at"}), page par page."""
+    params = {
+        "part": "contentDetails",
+        "playlistId": playlist_id,
+        "maxResults": PLAYLIST_PAGE_SIZE,
+        "key": api_key,
+    }
+    for item in iter_pages("playlistItems", params):
+        details = item["contentDetails"]
+        yield {"video_id": details["videoId"], "published_at": details.get("videoPublishedAt")}
+
+
+def sync_source(kind: str, value: str, api_key: str, store: Store, max_videos: int = MAX_SOURCE_VIDEOS) -> dict:
+    """Met à jour la liste des vidéos d'une source et renvoie ses vidéos les plus récentes.
+
+    La playlist des uploads d'une chaîne est triée de la plus récente à la plus
+    ancienne : le parcours s'arrête à la première vidéo déjà connue (marqueur
+    de dernière synchronisation). Une playlist quelconque est parcourue en entier.
+    """
+    source_id = f"{kind}:{value}"
+    source = store.get_source(source_id)
+    if source is None:
+        source = {"source_id": source_id, **resolve_source(kind, value, api_key)}
+        store.save_source(source_id, source["kind"], source["title"], source["playlist_id"])
+
+    known = store.known_video_ids(source_id)
+    uploads_order = kind != "playlist"
+    discovered = []
+    videos = iter_playlist_videos(source["playlist_id"], api_key)
+    try:
+        for video in videos:
+            if video["video_id"] in known:
+                if uploads_order:
+                    break
+                continue
+            discovered.append(video)
+            if len(discovered) >= max_videos:
+                break
+    finally:
+        videos.close()
+    store.add_source_videos(source_id, discovered)
+
+    return {
+        "source_id": source_id,
+        "title": source["title"],
+        "new_videos": len(discovered),
+        "video_ids": store.source_video_ids(source_id, max_videos),
+    }
+
+
+def expand_urls(urls: list[str], api_key: str, store: Store | None,
+                max_per_source: int = MAX_SOURCE_VIDEOS) -> tuple[list[tuple[str, str]], list[dict], list[str]]:
+    """Transforme les URLs saisies en vidéos à traiter.
+
+    Renvoie (paires (url, video_id) sans doublon, sources synchronisées, URLs
+    invalides). Les URLs de chaînes et playlists ne sont prises en charge
+    qu'avec un `store`.
+    """
+    videos = []
+    seen = set()
+    sources = []
+    invalid = []
+
+    def add(url: str, video_id: str):
+        if video_id not in seen:
+            seen.add(video_id)
+            videos.append((url, video_id))
+
+    for url in urls:
+        video_id = extract_video_id(url)
+        if video_id:
+            add(url, video_id)
+            continue
+        source = parse_source(url)
+        if source is None or store is None:
+            invalid.append(url)
+            continue
+        try:
+            synced = sync_source(*source, api_key, store, max_per_source)
+        except Exception as e:
+            warn(f"⚠️ Synchronisation impossible pour {url}: {e}")
+            continue
+        sources.append(synced)
+        for video_id in synced["video_ids"]:
+            add(f"https://www.youtube.com/watch?v={video_id}", video_id)
+    return videos, sources, invalid
+
+
+def _comment_count(info: dict | None) -> int | None:
+    count = (info or {}).get("comments_count")
+    return int(count) if isinstance(count, str) and count.isdigit() else None
+
+
+def select_changed(videos: list[tuple[str, str]], videos_info: dict[str, dict],
+                   store: Store) -> tuple[list[dict], int]:
+    """Synchronisation incrémentale : ne garde que les vidéos nouvelles ou ayant reçu des commentaires.
+
+    Le nombre de commentaires renvoyé par videos.list (déjà récupéré par lots de
+    50) sert de marqueur : une vidéo dont le compteur n'a pas bougé n'est pas
+    retraitée. Renvoie (vidéos à traiter avec `comments_since`, vidéos ignorées).
+    """
+    states = store.video_states([video_id for _, video_id in videos])
+    selected = []
+    for url, video_id in videos:
+        state = states.get(video_id)
+        if state is None:
+            selected.append({"url": url, "video_id": video_id, "comments_since": None})
+            continue
+        count = _comment_count(videos_info.get(video_id))
+        if count == state["comment_count"] or (
+                count is not None and state["comment_count"] is not None and count < state["comment_count"]):
+            continue
+        selected.append({"url": url, "video_id": video_id, "comments_since": state["comments_synced_at"]})
+    return selected, len(videos) - len(selected)
+
+
+def record_synced(store: Store, result: dict, synced_at: str):
+    """Enregistre le marqueur d'une vidéo traitée (à appeler avec l'horodatage du début de l'exécution).
+
+    Seulement si ses commentaires ont été récupérés et analysés sans erreur :
+    avec --no-comments ou après un échec, la vidéo reste à synchroniser.
+    """
+    if not result.get("comments_synced"):
+        return
+    store.mark_video_synced(result["video_id"], _comment_count(result["info"]), synced_at)
@@ -0,0 +1,106 @@
+"""
+Budget de démarrage de l'application
+Mesure le temps d'import du cœur headless et le temps d'exécution (premier run
+et rerun) du script Streamlit, et échoue si un budget est dépassé.
+
+Usage:
+    python startup_budget.py
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Budgets en millisecondes (médiane de plusieurs mesures)
+HEADLESS_IMPORT_BUDGET_MS = 250
+APP_FIRST_RUN_BUDGET_MS = 1200
+APP_RERUN_BUDGET_MS = 150
+
+# Modules lourds qui ne doivent pas être chargés au démarrage
+LAZY_MODULES = ["groq", "youtube_transcript_api"]
+HEADLESS_FORBIDDEN_MODULES = ["streamlit"] + LAZY_MODULES
+
+RUNS = 5
+
+_IMPORT_PROBE = """
+import sys, time
+start = time.perf_counter()
+import cli
+elapsed = (time.perf_counter() - start) * 1000
+loaded = [m for m in {modules!r} if m in sys.modules]
+print(elapsed, ",".join(loaded))
+"""
+
+
+def median(values: list[float]) -> float:
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def measure_headless_import() -> tuple[float, list[str]]:
+    """Temps d'import de cli.py dans un interpréteur neuf, et modules lourds chargés."""
+    timings = []
+    loaded = []
+    for _ in range(RUNS):
+        output = subprocess.run(
+            [sys.executable, "-c", _IMPORT_PROBE.format(modules=HEADLESS_FORBIDDEN_MODULES)],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        elapsed, modules = output.split(" ", 1) if " " in output else (output, "")
+        timings.append(float(elapsed))
+        loaded = [m for m in modules.split(",") if m]
+    return median(timings), loaded
+
+
+def measure_app_runs() -> tuple[float, float, list[str]]:
+    """Temps du premier run et d'un rerun de app.py, et modules lourds chargés."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60)
+    start = time.perf_counter()
+    at.run()
+    first_run = (time.perf_counter() - start) * 1000
+    if at.exception:
+        raise RuntimeError(f"app.py a levé une exception: {at.exception[0].value}")
+
+    reruns = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        at.run()
+        reruns.append((time.perf_counter() - start) * 1000)
+    loaded = [m for m in LAZY_MODULES if m in sys.modules]
+    return first_run, median(reruns), loaded
+
+
+def main() -> int:
+    failures = []
+
+    import_ms, loaded = measure_headless_import()
+    print(f"Import headless (cli.py)   {import_ms:8.1f} ms  (budget {HEADLESS_IMPORT_BUDGET_MS} ms)")
+    if import_ms > HEADLESS_IMPORT_BUDGET_MS:
+        failures.append("import headless trop lent")
+    if loaded:
+        failures.append(f"modules chargés au démarrage headless: {', '.join(loaded)}")
+
+    first_ms, rerun_ms, loaded = measure_app_runs()
+    print(f"Premier run (app.py)       {first_ms:8.1f} ms  (budget {APP_FIRST_RUN_BUDGET_MS} ms)")
+    print(f"Rerun (app.py)             {rerun_ms:8.1f} ms  (budget {APP_RERUN_BUDGET_MS} ms)")
+    if first_ms > APP_FIRST_RUN_BUDGET_MS:
+        failures.append("premier run trop lent")
+    if rerun_ms > APP_RERUN_BUDGET_MS:
+        failures.append("rerun trop lent")
+    if loaded:
+        failures.append(f"modules chargés par l'interface sans analyse: {', '.join(loaded)}")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Budgets de démarrage respectés")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
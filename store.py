@@ -0,0 +1,325 @@
+"""
+Stockage persistant (SQLite, sans éviction) de l'état de synchronisation
+Chaînes/playlists suivies, vidéos connues, marqueurs de dernière synchronisation,
+historique des analyses de commentaires et analyses soumises en arrière-plan
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data", "youtube_analyzer.sqlite")
+
+# Colonnes des analyses stockées en JSON
+JOB_COLUMNS = ("job_id", "status", "params", "videos", "completed", "messages", "trends", "metrics", "error",
+               "created_at", "updated_at", "owner")
+JOB_JSON_COLUMNS = {"params", "videos", "messages", "trends", "metrics"}
+
+# Statuts d'une analyse encore en cours
+ACTIVE_JOB_STATUSES = ("queued", "running")
+
+
+def utc_timestamp(now: float | None = None) -> str:
+    """Horodatage ISO 8601 UTC au format de l'API YouTube (comparable comme chaîne)."""
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now))
+
+
+class Store:
+    """Base SQLite des données suivies d'une exécution à l'autre, partagée entre threads.
+
+    Contrairement au cache, rien n'y expire : c'est la référence pour les
+    synchronisations incrémentales.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sources (
+                source_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                title TEXT,
+                playlist_id TEXT NOT NULL,
+                synced_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS source_videos (
+                source_id TEXT NOT NULL,
+                video_id TEXT NOT NULL,
+                published_at TEXT,
+                PRIMARY KEY (source_id, video_id)
+            );
+            CREATE TABLE IF NOT EXISTS video_sync (
+                video_id TEXT PRIMARY KEY,
+                comment_count INTEGER,
+                comments_synced_at TEXT
+            );
+            CREATE TABLE IF NOT EXISTS seen_comments (
+                video_id TEXT NOT NULL,
+                comment_id TEXT NOT NULL,
+                PRIMARY KEY (video_id, comment_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS comment_analyses (
+                analysis_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                video_id TEXT NOT NULL,
+                analyzed_at TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                sentiment REAL,
+                new_comments INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS comment_analyses_video ON comment_analyses (video_id, analysis_id);
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                params TEXT NOT NULL,
+                videos TEXT,
+                completed INTEGER NOT NULL DEFAULT 0,
+                messages TEXT NOT NULL DEFAULT '[]',
+                trends TEXT,
+                metrics TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                owner TEXT
+            );
+            CREATE TABLE IF NOT EXISTS job_results (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                video_index INTEGER NOT NULL,
+                result TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS job_results_job ON job_results (job_id, seq);
+        """)
+        # Bases créées avant le rattachement des analyses à leur propriétaire
+        if "owner" not in {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_owner ON jobs (owner, created_at)")
+
+    # ------------------------------------------------------------------
+    # Chaînes et playlists
+    # ------------------------------------------------------------------
+
+    def get_source(self, source_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT source_id, kind, title, playlist_id, synced_at FROM sources WHERE source_id = ?",
+                (source_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("source_id", "kind", "title", "playlist_id", "synced_at"), row))
+
+    def save_source(self, source_id: str, kind: str, title: str | None, playlist_id: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sources (source_id, kind, title, playlist_id) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(source_id) DO UPDATE SET kind = excluded.kind, title = excluded.title, "
+                "playlist_id = excluded.playlist_id",
+                (source_id, kind, title, playlist_id)
+            )
+
+    def known_video_ids(self, source_id: str) -> set[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT video_id FROM source_videos WHERE source_id = ?", (source_id,)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def add_source_videos(self, source_id: str, videos: list[dict]):
+        """Enregistre les vidéos découvertes ({"video_id", "published_at"}) et date la synchronisation."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO source_videos (source_id, video_id, published_at) VALUES (?, ?, ?)",
+                [(source_id, video["video_id"], video.get("published_at")) for video in videos]
+            )
+            self._conn.execute("UPDATE sources SET synced_at = ? WHERE source_id = ?", (time.time(), source_id))
+            self._conn.execute("COMMIT")
+
+    def source_video_ids(self, source_id: str, limit: int | None = None) -> list[str]:
+        """Vidéos connues d'une source, de la plus récente à la plus ancienne."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT video_id FROM source_videos WHERE source_id = ? "
+                "ORDER BY published_at DESC LIMIT ?",
+                (source_id, -1 if limit is None else limit)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    # ------------------------------------------------------------------
+    # Marqueurs par vidéo
+    # ------------------------------------------------------------------
+
+    def video_states(self, video_ids: list[str]) -> dict[str, dict]:
+        """Dernier état synchronisé (nombre de commentaires, date de synchronisation) par vidéo."""
+        states = {}
+        # Par lots, sous la limite de paramètres de SQLite
+        for start in range(0, len(video_ids), 500):
+            batch = video_ids[start:start + 500]
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT video_id, comment_count, comments_synced_at FROM video_sync "
+                    f"WHERE video_id IN ({','.join('?' * len(batch))})",
+                    batch
+                ).fetchall()
+            states.update({row[0]: {"comment_count": row[1], "comments_synced_at": row[2]} for row in rows})
+        return states
+
+    def mark_video_synced(self, video_id: str, comment_count: int | None, comments_synced_at: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO video_sync (video_id, comment_count, comments_synced_at) VALUES (?, ?, ?)",
+                (video_id, comment_count, comments_synced_at)
+            )
+
+    # ------------------------------------------------------------------
+    # Analyses incrémentales des commentaires
+    # ------------------------------------------------------------------
+
+    def seen_comment_ids(self, video_id: str) -> set[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT comment_id FROM seen_comments WHERE video_id = ?", (video_id,)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def latest_comment_analysis(self, video_id: str) -> dict | None:
+        """Dernier résumé enregistré pour la vidéo (base de la prochaine mise à jour)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT analyzed_at, summary, sentiment, new_comments FROM comment_analyses "
+                "WHERE video_id = ? ORDER BY analysis_id DESC LIMIT 1",
+                (video_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("analyzed_at", "summary", "sentiment", "new_comments"), row))
+
+    def record_comment_analysis(self, video_id: str, comment_ids: list[str], summary: str,
+                                sentiment: float | None, analyzed_at: str):
+        """Enregistre un résumé et marque ses commentaires comme vus, en une transaction."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO seen_comments (video_id, comment_id) VALUES (?, ?)",
+                [(video_id, comment_id) for comment_id in comment_ids]
+            )
+            self._conn.execute(
+                "INSERT INTO comment_analyses (video_id, analyzed_at, summary, sentiment, new_comments) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (video_id, analyzed_at, summary, sentiment, len(comment_ids))
+            )
+            self._conn.execute("COMMIT")
+
+    def sentiment_history(self, video_id: str, limit: int = 90) -> list[dict]:
+        """Notes de sentiment successives de la vidéo, de la plus ancienne à la plus récente."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT analyzed_at, sentiment, new_comments FROM comment_analyses "
+                "WHERE video_id = ? ORDER BY analysis_id DESC LIMIT ?",
+                (video_id, limit)
+            ).fetchall()
+        return [{"analyzed_at": row[0], "sentiment": row[1], "new_comments": row[2]} for row in reversed(rows)]
+
+    # ------------------------------------------------------------------
+    # Analyses en arrière-plan
+    # ------------------------------------------------------------------
+
+    def create_job(self, job_id: str, params: dict, owner: str | None = None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, status, params, created_at, updated_at, owner) "
+                "VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, json.dumps(params, ensure_ascii=False), now, now, owner)
+            )
+
+    def update_job(self, job_id: str, **fields):
+        """Met à jour des colonnes d'une analyse (les colonnes JSON sont sérialisées ici)."""
+        values = [json.dumps(value, ensure_ascii=False) if name in JOB_JSON_COLUMNS else value
+                  for name, value in fields.items()]
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {assignments}, updated_at = ? WHERE job_id = ?",
+                (*values, time.time(), job_id)
+            )
+
+    def get_job(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {name: json.loads(value) if name in JOB_JSON_COLUMNS and value is not None else value
+                for name, value in zip(JOB_COLUMNS, row)}
+
+    def recent_jobs(self, owner: str, limit: int = 10) -> list[dict]:
+        """Dernières analyses soumises par `owner` (sans leurs résultats), de la plus récente à la plus ancienne."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, status, params, completed, created_at FROM jobs WHERE owner = ? "
+                "ORDER BY created_at DESC LIMIT ?",
+                (owner, limit)
+            ).fetchall()
+        return [
+            {"job_id": row[0], "status": row[1], "params": json.loads(row[2]), "completed": row[3],
+             "created_at": row[4]}
+            for row in rows
+        ]
+
+    def add_job_result(self, job_id: str, video_index: int, result: dict):
+        """Enregistre le résultat d'une vidéo et incrémente l'avancement de l'analyse."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "INSERT INTO job_results (job_id, video_index, result) VALUES (?, ?, ?)",
+                (job_id, video_index, json.dumps(result, ensure_ascii=False))
+            )
+            self._conn.execute(
+                "UPDATE jobs SET completed = completed + 1, updated_at = ? WHERE job_id = ?",
+                (time.time(), job_id)
+            )
+            self._conn.execute("COMMIT")
+
+    def job_results(self, job_id: str, after_seq: int = 0) -> list[tuple[int, dict]]:
+        """Résultats (seq, résultat) enregistrés après `after_seq`, dans l'ordre d'arrivée."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, result FROM job_results WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, after_seq)
+            ).fetchall()
+        return [(seq, json.loads(result)) for seq, result in rows]
+
+    def interrupt_active_jobs(self) -> int:
+        """Marque comme interrompues les analyses d'un processus précédent restées en cours."""
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET status = 'interrupted', updated_at = ? "
+                f"WHERE status IN ({','.join('?' * len(ACTIVE_JOB_STATUSES))})",
+                (time.time(), *ACTIVE_JOB_STATUSES)
+            )
+        return cursor.rowcount
+
+    def purge_jobs(self, older_than: float) -> int:
+        """Supprime les analyses (et leurs résultats) créées avant `older_than` (timestamp)."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "DELETE FROM job_results WHERE job_id IN (SELECT job_id FROM jobs WHERE created_at < ?)",
+                (older_than,)
+            )
+            cursor = self._conn.execute("DELETE FROM jobs WHERE created_at < ?", (older_than,))
+            self._conn.execute("COMMIT")
+        return cursor.rowcount
@@ -0,0 +1,400 @@
+"""
+Réponses JSON structurées du LLM (mode JSON de Groq)
+Schémas compilés une fois en validateurs qui réparent ce qui peut l'être,
+écartent les éléments invalides et redemandent seulement les éléments manquants
+"""
+
+import json
+import re
+from collections.abc import Callable, Generator
+from typing import Any
+
+import metrics
+from llm import LLMCache, async_chat_completion, chat_completion
+from pipeline import warn
+
+# ============================================================================
+# SCHÉMAS
+# ============================================================================
+
+# Sous-ensemble de JSON Schema : object/array/string/number, properties, required,
+# items, minItems/maxItems, minimum/maximum ; "description" sert d'exemple dans le prompt
+STRING_LIST = {"type": "array", "items": {"type": "string", "description": "phrase courte"}}
+
+SCHEMAS = {
+    "points": {
+        "type": "object",
+        "properties": {
+            "points": {
+                "type": "array",
+                "minItems": 10,
+                "maxItems": 10,
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "text": {"type": "string", "description": "point méconnu, 2-3 phrases max"},
+                    },
+                    "required": ["text"],
+                },
+            },
+        },
+        "required": ["points"],
+    },
+    "comments": {
+        "type": "object",
+        "properties": {
+            "sentiment": {"type": "string", "description": "sentiment général (positif, négatif ou mitigé) en une phrase"},
+            "score": {"type": "number", "minimum": 0, "maximum": 10,
+                      "description": "note de sentiment de 0 (très négatif) à 10 (très positif)"},
+            "appreciated": STRING_LIST,
+            "criticisms": STRING_LIST,
+            "questions": STRING_LIST,
+            "insights": STRING_LIST,
+        },
+        "required": ["sentiment"],
+    },
+    "trends": {
+        "type": "object",
+        "properties": {
+            "sections": {
+                "type": "array",
+                "minItems": 1,
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "title": {"type": "string", "description": "titre de la section"},
+                        "items": STRING_LIST,
+                        "quotes": {"type": "array",
+                                   "items": {"type": "string", "description": "citation exacte d'un commentaire"}},
+                    },
+                    "required": ["title"],
+                },
+            },
+        },
+        "required": ["sections"],
+    },
+}
+
+# Une seule relance pour un JSON illisible, une seule pour compléter les éléments manquants
+JSON_RETRIES = 1
+ITEM_RETRIES = 1
+
+_LIST_MARK = re.compile(r'^\s*(?:\d+[.)]|[-•*])\s+')
+_BOLD_MARKS = re.compile(r'^\*\*(.+?)\*\*:?$')
+_CODE_FENCE = re.compile(r'^```(?:json)?\s*|\s*```$')
+_TRAILING_COMMA = re.compile(r',\s*([}\]])')
+_NUMBER = re.compile(r'-?\d+(?:[.,]\d+)?')
+
+Validator = Callable[[Any, str, list[str]], Any]
+
+
+class Invalid(ValueError):
+    """Valeur irréparable pour son schéma."""
+
+
+# ============================================================================
+# COMPILATION DES VALIDATEURS
+# ============================================================================
+
+def _compile_string(schema: dict) -> Validator:
+    def validate(value, path, errors):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+        if not isinstance(value, str):
+            raise Invalid(f"{path}: texte attendu")
+        cleaned = _LIST_MARK.sub('', value.strip())
+        cleaned = _BOLD_MARKS.sub(r'\1', cleaned).strip()
+        if not cleaned:
+            raise Invalid(f"{path}: texte vide")
+        return cleaned
+    return validate
+
+
+def _compile_number(schema: dict) -> Validator:
+    minimum = schema.get("minimum")
+    maximum = schema.get("maximum")
+
+    def validate(value, path, errors):
+        if isinstance(value, str):
+            # "7/10", "7,5" : premier nombre du texte
+            match = _NUMBER.search(value)
+            if match is None:
+                raise Invalid(f"{path}: nombre attendu")
+            value = float(match.group().replace(",", "."))
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise Invalid(f"{path}: nombre attendu")
+        if minimum is not None and value < minimum:
+            errors.append(f"{path}: {value} ramené à {minimum}")
+            value = minimum
+        if maximum is not None and value > maximum:
+            errors.append(f"{path}: {value} ramené à {maximum}")
+            value = maximum
+        return float(value)
+    return validate
+
+
+def _compile_array(schema: dict) -> Validator:
+    validate_item = compile_schema(schema["items"])
+    max_items = schema.get("maxItems")
+
+    def validate(value, path, errors):
+        if isinstance(value, (str, dict)):
+            # Élément unique renvoyé sans tableau
+            value = [value]
+        if not isinstance(value, list):
+            raise Invalid(f"{path}: tableau attendu")
+        items = []
+        for index, item in enumerate(value):
+            try:
+                items.append(validate_item(item, f"{path}[{index}]", errors))
+            except Invalid as e:
+                # Validation élément par élément : un élément invalide n'invalide pas le reste
+                errors.append(str(e))
+        if max_items is not None and len(items) > max_items:
+            errors.append(f"{path}: {len(items)} éléments, {max_items} conservés")
+            items = items[:max_items]
+        return items
+    return validate
+
+
+def _compile_object(schema: dict) -> Validator:
+    properties = {name: compile_schema(sub) for name, sub in schema.get("properties", {}).items()}
+    required = set(schema.get("required", []))
+    defaults = {name: [] if sub.get("type") == "array" else None
+                for name, sub in schema.get("properties", {}).items()}
+    single_required = next(iter(required)) if len(required) == 1 and len(properties) == 1 else None
+
+    def validate(value, path, errors):
+        if not isinstance(value, dict):
+            if single_required is not None and value is not None:
+                # "texte" au lieu de {"text": "texte"}
+                value = {single_required: value}
+            else:
+                raise Invalid(f"{path}: objet attendu")
+        if single_required is not None and single_required not in value and len(value) == 1:
+            # Clé inattendue ({"point": ...}) : seule valeur disponible
+            value = {single_required: next(iter(value.values()))}
+        result = {}
+        for name, validate_property in properties.items():
+            if value.get(name) is None:
+                if name in required:
+                    raise Invalid(f"{path}.{name}: champ manquant")
+                result[name] = defaults[name]
+                continue
+            try:
+                result[name] = validate_property(value[name], f"{path}.{name}", errors)
+            except Invalid:
+                if name in required:
+                    raise
+                errors.append(f"{path}.{name}: valeur invalide ignorée")
+                result[name] = defaults[name]
+        return result
+    return validate
+
+
+_COMPILERS = {
+    "string": _compile_string,
+    "number": _compile_number,
+    "array": _compile_array,
+    "object": _compile_object,
+}
+
+
+def compile_schema(schema: dict) -> Validator:
+    """Compile un schéma en fonction validate(valeur, chemin, erreurs) qui renvoie la valeur réparée."""
+    return _COMPILERS[schema["type"]](schema)
+
+
+VALIDATORS = {name: compile_schema(schema) for name, schema in SCHEMAS.items()}
+
+
+def schema_example(schema: dict) -> Any:
+    """Exemple de document conforme, inséré dans le prompt pour décrire le format attendu."""
+    if schema["type"] == "object":
+        return {name: schema_example(sub) for name, sub in schema["properties"].items()}
+    if schema["type"] == "array":
+        return [schema_example(schema["items"])]
+    return schema.get("description", "...")
+
+
+# ============================================================================
+# ANALYSE DES RÉPONSES
+# ============================================================================
+
+def parse_json(content: str | None) -> Any:
+    """Décode une réponse JSON en réparant les défauts courants (balises de code, texte autour, virgules finales).
+
+    Renvoie None si le contenu reste illisible.
+    """
+    if not content:
+        return None
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        pass
+    text = _CODE_FENCE.sub('', content.strip())
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    text = _TRAILING_COMMA.sub(r'\1', text[start:end + 1])
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return None
+
+
+def validate(name: str, data: Any) -> tuple[dict | None, list[str]]:
+    """Valide et répare un document selon le schéma `name` ; (None, erreurs) s'il est irréparable."""
+    errors: list[str] = []
+    try:
+        return VALIDATORS[name](data, name, errors), errors
+    except Invalid as e:
+        errors.append(str(e))
+        return None, errors
+
+
+def missing_items(name: str, result: dict) -> dict[str, int]:
+    """Nombre d'éléments manquants par tableau de premier niveau (minItems non atteint)."""
+    missing = {}
+    for field, sub in SCHEMAS[name]["properties"].items():
+        if sub["type"] == "array" and len(result[field]) < sub.get("minItems", 0):
+            missing[field] = sub["minItems"] - len(result[field])
+    return missing
+
+
+def json_instructions(name: str) -> str:
+    """Consigne de format ajoutée aux prompts en mode JSON."""
+    example = json.dumps(schema_example(SCHEMAS[name]), ensure_ascii=False)
+    return f"FORMAT DE RÉPONSE: uniquement un objet JSON valide, sans texte autour, de la forme:\n{example}"
+
+
+def _structured_steps(prompt: str, name: str,
+                      task: str) -> Generator[tuple[str, Callable[[str], bool]], str | None, dict | str]:
+    """Déroulé d'une complétion structurée, indépendant du transport.
+
+    Produit chaque prompt à envoyer en mode JSON, avec le contrôle qui décide si
+    la réponse peut être mémorisée, et reçoit la réponse (ou l'exception de
+    l'appel) ; renvoie le résultat validé ou le texte brut.
+    Partagé par `structured_completion` et `async_structured_completion`.
+    """
+    def is_valid(content: str) -> bool:
+        return validate(name, parse_json(content))[0] is not None
+
+    prompt = f"{prompt}\n\n{json_instructions(name)}"
+    content = yield prompt, is_valid
+    result, errors = validate(name, parse_json(content))
+    for _ in range(JSON_RETRIES):
+        if result is not None:
+            break
+        content = yield f"{prompt}\n\nTa réponse précédente était invalide ({'; '.join(errors[:3])}). " \
+                        f"Réponds uniquement par l'objet JSON demandé.", is_valid
+        result, errors = validate(name, parse_json(content))
+    if result is None:
+        warn(f"⚠️ Réponse non structurée pour « {task} », affichage en texte brut")
+        return content
+
+    for _ in range(ITEM_RETRIES):
+        missing = missing_items(name, result)
+        if not missing:
+            break
+        for field, count in missing.items():
+            def has_items(content: str, field: str = field, count: int = count) -> bool:
+                return bool(_parse_items(name, field, content, count))
+
+            try:
+                content = yield _items_prompt(prompt, field, result[field], count), has_items
+            except Exception as e:
+                warn(f"⚠️ Éléments manquants non obtenus pour « {task} »: {e}")
+                continue
+            result[field].extend(_parse_items(name, field, content, count))
+
+    if errors:
+        with metrics.measure(f"json:{task}"):
+            metrics.add(repaired=len(errors))
+    return result
+
+
+def _items_prompt(prompt: str, field: str, existing: list, count: int) -> str:
+    """Redemande uniquement les `count` éléments manquants du tableau `field`."""
+    return (
+        f"{prompt}\n\nÉléments déjà obtenus pour \"{field}\":\n{json.dumps(existing, ensure_ascii=False)}\n\n"
+        f"Fournis UNIQUEMENT {count} élément(s) supplémentaire(s), différents des précédents, "
+        f"sous la forme {{\"{field}\": [...]}}."
+    )
+
+
+def _parse_items(name: str, field: str, content: str | None, count: int) -> list:
+    data = parse_json(content)
+    if isinstance(data, dict):
+        data = data.get(field, [])
+    errors: list[str] = []
+    try:
+        items = compile_schema(SCHEMAS[name]["properties"][field])(data, field, errors)
+    except Invalid:
+        return []
+    return items[:count]
+
+
+def structured_completion(groq_client, prompt: str, name: str, max_tokens: int, temperature: float = 0.7,
+                          cache: LLMCache | None = None, task: str | None = None) -> dict | str:
+    """Complétion en mode JSON validée par le schéma `name`.
+
+    Un JSON illisible est redemandé une fois ; les éléments invalides sont
+    écartés puis seuls les éléments manquants sont redemandés. Si aucun JSON
+    exploitable n'est obtenu, le texte brut est renvoyé (affichage historique).
+    Les réponses non conformes ne sont jamais mémorisées dans `cache`.
+    """
+    task = task or name
+    steps = _structured_steps(prompt, name, task)
+    try:
+        request, accept = next(steps)
+        while True:
+            try:
+                content = chat_completion(groq_client, request, max_tokens=max_tokens, temperature=temperature,
+                                          cache=cache, task=task, json_mode=True, accept=accept)
+            except Exception as e:
+                request, accept = steps.throw(e)
+            else:
+                request, accept = steps.send(content)
+    except StopIteration as done:
+        return done.value
+
+
+async def async_structured_completion(groq_client, prompt: str, name: str, max_tokens: int,
+                                      temperature: float = 0.7, cache: LLMCache | None = None,
+                                      task: str | None = None) -> dict | str:
+    """Variante asynchrone de `structured_completion` (client AsyncGroq)."""
+    task = task or name
+    steps = _structured_steps(prompt, name, task)
+    try:
+        request, accept = next(steps)
+        while True:
+            try:
+                content = await async_chat_completion(groq_client, request, max_tokens=max_tokens,
+                                                      temperature=temperature, cache=cache, task=task,
+                                                      json_mode=True, accept=accept)
+            except Exception as e:
+                request, accept = steps.throw(e)
+            else:
+                request, accept = steps.send(content)
+    except StopIteration as done:
+        return done.value
+
+
+# ============================================================================
+# SÉRIALISATION
+# ============================================================================
+
+def dump_result(result: dict | str) -> str:
+    """Sérialise un résultat structuré (ou texte historique) pour le stockage."""
+    return json.dumps(result, ensure_ascii=False) if isinstance(result, dict) else result
+
+
+def load_result(text: str) -> dict | str:
+    """Inverse de `dump_result` : les anciens résultats texte restent du texte."""
+    if text.startswith("{"):
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            pass
+    return text
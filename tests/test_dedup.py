@@ -0,0 +1,99 @@
+"""
+Déduplication des commentaires (dedup.py) : seuils de quasi-doublons, spam et réactions courtes
+"""
+
+import numpy as np
+import pytest
+
+import dedup
+from dedup import deduplicate_comments, is_spam, minhash_signatures, normalize
+
+BASE = ("Cette vidéo explique enfin clairement la photosynthèse, surtout la partie sur la phase claire "
+        "et le rôle de la chlorophylle dans la capture de la lumière")
+
+
+def _estimated_similarity(first: str, second: str) -> float:
+    signatures = minhash_signatures([normalize(first), normalize(second)])
+    return float((signatures[0] == signatures[1]).mean())
+
+
+# ============================================================================
+# QUASI-DOUBLONS
+# ============================================================================
+
+def test_exact_duplicates_after_normalization_are_counted():
+    entries, spam = deduplicate_comments(["Super vidéo !!!!!!", "super   VIDÉO !!!", "Super vidéo !!!"])
+    assert spam == 0
+    assert entries == [{"text": "Super vidéo !!!!!!", "count": 3}]
+
+
+def test_near_duplicate_above_threshold_is_merged():
+    variant = BASE.replace("enfin ", "") + " !"
+    assert _estimated_similarity(BASE, variant) >= dedup.SIMILARITY_THRESHOLD
+    entries, _ = deduplicate_comments([BASE, variant])
+    assert entries == [{"text": BASE, "count": 2}]
+
+
+def test_partly_rewritten_comment_below_threshold_is_kept():
+    variant = BASE[:60] + " mais le passage sur le cycle de Calvin va beaucoup trop vite pour moi"
+    assert _estimated_similarity(BASE, variant) < dedup.SIMILARITY_THRESHOLD
+    entries, _ = deduplicate_comments([BASE, variant])
+    assert [entry["count"] for entry in entries] == [1, 1]
+
+
+def test_threshold_controls_merging(monkeypatch):
+    variant = BASE.replace("enfin ", "") + " !"
+    monkeypatch.setattr(dedup, "SIMILARITY_THRESHOLD", 1.01)
+    entries, _ = deduplicate_comments([BASE, variant])
+    assert len(entries) == 2
+
+
+def test_merged_groups_keep_first_occurrence_and_original_order():
+    other = "Quelqu'un connaît le nom de la musique à la fin ? Elle est vraiment superbe"
+    entries, _ = deduplicate_comments([other, BASE, BASE + " !", other, BASE.replace("enfin ", "")])
+    assert entries == [{"text": other, "count": 2}, {"text": BASE, "count": 3}]
+
+
+def test_signatures_are_deterministic_and_identical_for_identical_texts():
+    texts = [BASE, BASE, "ok"]
+    signatures = minhash_signatures(texts)
+    assert signatures.shape == (3, dedup.NUM_PERMUTATIONS)
+    assert np.array_equal(signatures[0], signatures[1])
+    assert np.array_equal(signatures, minhash_signatures(texts))
+
+
+def test_copy_paste_beyond_signature_limit_is_merged():
+    long_comment = BASE * 5
+    assert len(long_comment.encode("utf-8")) > dedup.MAX_SIGNATURE_BYTES
+    entries, _ = deduplicate_comments([long_comment, long_comment + " (copié)"])
+    assert entries[0]["count"] == 2
+
+
+# ============================================================================
+# SPAM ET RÉACTIONS COURTES
+# ============================================================================
+
+@pytest.mark.parametrize("comment", [
+    "first!!", "Premier", "...", "https://bit.ly/abc", "👉 www.promo.com/offre",
+    "Code promo -20% sur https://shop.com/x", "abonnez-vous à ma chaine", "check my channel",
+    "contact whatsapp +33612345678",
+])
+def test_spam_is_discarded(comment):
+    assert is_spam(normalize(comment))
+
+
+@pytest.mark.parametrize("comment", [
+    "ok", "lol", "👍🔥", "10/10", "Merci pour la source https://arxiv.org/abs/1234 très utile",
+])
+def test_reactions_and_cited_links_are_kept(comment):
+    assert not is_spam(normalize(comment))
+
+
+def test_short_reactions_are_counted():
+    entries, spam = deduplicate_comments(["ok", "OK", "👍🔥", "👍🔥", "first", "..."])
+    assert spam == 2
+    assert entries == [{"text": "ok", "count": 2}, {"text": "👍🔥", "count": 2}]
+
+
+def test_only_spam_returns_no_entries():
+    assert deduplicate_comments(["first", "https://bit.ly/x", ""]) == ([], 3)
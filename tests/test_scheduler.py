@@ -0,0 +1,188 @@
+"""
+Ordonnanceur des appels Groq (scheduler.py) : priorités, seaux RPM/TPM et backoff sur 429
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+import scheduler
+from scheduler import LLMScheduler, is_transient, parse_duration, rate_limit_delay
+
+MODEL = "test-model"
+
+
+class RateLimitError(Exception):
+    """Erreur 429 minimale, comme celles du client Groq (status_code et response.headers)."""
+
+    def __init__(self, headers: dict | None = None, status_code: int = 429):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = type("Response", (), {"status_code": status_code, "headers": headers or {}})()
+
+
+def make_scheduler(rpm: int = 10_000, tpm: int = 10_000_000, max_concurrent: int = 1) -> LLMScheduler:
+    return LLMScheduler(rate_limits={MODEL: {"rpm": rpm, "tpm": tpm}}, max_concurrent=max_concurrent)
+
+
+# ============================================================================
+# PRIORITÉS
+# ============================================================================
+
+def test_higher_priority_is_admitted_first():
+    llm_scheduler = make_scheduler()
+    order = []
+
+    async def call(name: str, priority: int):
+        async with llm_scheduler.async_slot(MODEL, 10, priority):
+            order.append(name)
+
+    async def main():
+        async with llm_scheduler.async_slot(MODEL, 10, priority=0):
+            # Tâches mises en file pendant que l'unique emplacement est occupé
+            tasks = [asyncio.create_task(call("trends", 2)), asyncio.create_task(call("comments", 1)),
+                     asyncio.create_task(call("points", 0))]
+            await asyncio.sleep(0.05)
+            assert order == []
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert order == ["points", "comments", "trends"]
+
+
+def test_same_priority_keeps_arrival_order_across_threads():
+    llm_scheduler = make_scheduler()
+    order = []
+    holder = llm_scheduler.slot(MODEL, 10)
+    holder.__enter__()
+
+    def call(name: str):
+        with llm_scheduler.slot(MODEL, 10, priority=1):
+            order.append(name)
+
+    threads = []
+    for name in ("a", "b", "c"):
+        thread = threading.Thread(target=call, args=(name,))
+        thread.start()
+        threads.append(thread)
+        # Arrivée dans l'ordre a, b, c
+        while len(llm_scheduler._waiting) < len(threads):
+            time.sleep(0.001)
+    holder.__exit__(None, None, None)
+    for thread in threads:
+        thread.join(timeout=5)
+    assert order == ["a", "b", "c"]
+
+
+def test_task_priorities():
+    assert scheduler.task_priority("points") < scheduler.task_priority("comments") < scheduler.task_priority("trends")
+    assert scheduler.task_priority("inconnue") == scheduler.DEFAULT_PRIORITY
+
+
+# ============================================================================
+# SEAUX À JETONS
+# ============================================================================
+
+def test_tokens_per_minute_delay_admission():
+    # 600 tokens/minute = 10 tokens/s : une deuxième réservation de 5 tokens attend ~0,5 s
+    llm_scheduler = make_scheduler(tpm=600, max_concurrent=4)
+    with llm_scheduler.slot(MODEL, 600):
+        pass
+    start = time.monotonic()
+    with llm_scheduler.slot(MODEL, 5):
+        pass
+    assert 0.3 <= time.monotonic() - start < 2
+
+
+def test_unused_reserved_tokens_are_given_back():
+    llm_scheduler = make_scheduler(tpm=600, max_concurrent=4)
+    with llm_scheduler.slot(MODEL, 600) as ticket:
+        ticket.used_tokens = 100
+    assert llm_scheduler.stats()[0]["tokens_available"] >= 500
+
+
+# ============================================================================
+# 429 ET BACKOFF
+# ============================================================================
+
+@pytest.mark.parametrize("value, seconds", [
+    ("2", 2.0), ("7.66s", 7.66), ("1m30.5s", 90.5), ("250ms", 0.25), ("", None), ("bientôt", None),
+])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == (pytest.approx(seconds) if seconds is not None else None)
+
+
+def test_server_delay_is_used_and_capped():
+    assert rate_limit_delay(RateLimitError({"retry-after": "3"}), attempt=0) == 3.0
+    # Le plus long des délais annoncés
+    error = RateLimitError({"x-ratelimit-reset-requests": "1.5s", "x-ratelimit-reset-tokens": "4s"})
+    assert rate_limit_delay(error, attempt=0) == 4.0
+    assert rate_limit_delay(RateLimitError({"retry-after": "10m"}), attempt=0) == scheduler.LLM_BACKOFF_MAX
+
+
+def test_exponential_backoff_with_jitter_without_server_delay():
+    for attempt in range(4):
+        bound = scheduler.LLM_BACKOFF_BASE * 2 ** attempt
+        delays = [rate_limit_delay(RateLimitError(), attempt) for _ in range(50)]
+        assert all(0 <= delay <= bound for delay in delays)
+        assert len(set(delays)) > 1
+    assert rate_limit_delay(RateLimitError(), attempt=20) <= scheduler.LLM_BACKOFF_MAX
+
+
+def test_other_errors_are_not_retried():
+    assert rate_limit_delay(RateLimitError(status_code=500), attempt=0) is None
+    assert rate_limit_delay(ValueError("boom"), attempt=0) is None
+
+
+def test_only_transient_errors_justify_a_fallback():
+    assert is_transient(RateLimitError())
+    assert is_transient(RateLimitError(status_code=503))
+    assert is_transient(TimeoutError())
+    assert not is_transient(RateLimitError(status_code=400))
+    assert not is_transient(RateLimitError(status_code=401))
+    assert not is_transient(ValueError("boom"))
+
+
+def test_rate_limit_pauses_the_model_and_reduces_its_rate():
+    llm_scheduler = make_scheduler(rpm=600, max_concurrent=4)
+    with llm_scheduler.slot(MODEL, 10):
+        pass
+    nominal = llm_scheduler._state(MODEL).requests.nominal_rate
+
+    llm_scheduler.rate_limited_for(MODEL, 0.3)
+    assert llm_scheduler.rate_limited == 1
+    assert llm_scheduler._state(MODEL).requests.rate == pytest.approx(nominal * scheduler.RATE_DECREASE_FACTOR)
+    start = time.monotonic()
+    with llm_scheduler.slot(MODEL, 10):
+        pass
+    assert time.monotonic() - start >= 0.25
+
+    # Remontée additive jusqu'au débit nominal, jamais au-delà
+    for _ in range(100):
+        llm_scheduler.succeeded(MODEL)
+    assert llm_scheduler._state(MODEL).requests.rate == pytest.approx(nominal)
+
+
+def test_rate_never_drops_below_minimum_fraction():
+    llm_scheduler = make_scheduler(rpm=600)
+    for _ in range(50):
+        llm_scheduler.rate_limited_for(MODEL, 0)
+    state = llm_scheduler._state(MODEL)
+    assert state.requests.rate == pytest.approx(state.requests.nominal_rate * scheduler.RATE_MIN_FRACTION)
+
+
+def test_async_wait_survives_timeouts():
+    # Attente asynchrone rythmée par le seau (asyncio.wait_for expire puis réessaie)
+    llm_scheduler = make_scheduler(rpm=120, max_concurrent=4)
+
+    async def main():
+        for _ in range(3):
+            async with llm_scheduler.async_slot(MODEL, 1):
+                pass
+
+    llm_scheduler._state(MODEL).requests.level = 1
+    start = time.monotonic()
+    asyncio.run(main())
+    assert time.monotonic() - start >= 0.8
@@ -0,0 +1,203 @@
+"""
+Validateurs des réponses JSON structurées (structured.py) : acceptation, rejet, réparation et cache
+"""
+
+import json
+
+import structured
+from llm import LLMCache
+from structured import parse_json, validate
+
+
+def _points(count: int) -> list[dict]:
+    return [{"text": f"Point {i}"} for i in range(1, count + 1)]
+
+
+# ============================================================================
+# ACCEPTATION
+# ============================================================================
+
+def test_valid_comments_document_is_accepted_unchanged():
+    document = {"sentiment": "positif", "score": 8, "appreciated": ["Le rythme"], "criticisms": [],
+                "questions": ["Une suite ?"], "insights": ["Public fidèle"]}
+    result, errors = validate("comments", document)
+    assert errors == []
+    assert result == {**document, "score": 8.0}
+
+
+def test_optional_fields_get_defaults():
+    result, errors = validate("comments", {"sentiment": "mitigé"})
+    assert errors == []
+    assert result == {"sentiment": "mitigé", "score": None, "appreciated": [], "criticisms": [],
+                      "questions": [], "insights": []}
+
+
+def test_valid_points_document_is_accepted():
+    result, errors = validate("points", {"points": _points(10)})
+    assert errors == []
+    assert [point["text"] for point in result["points"]] == [f"Point {i}" for i in range(1, 11)]
+
+
+# ============================================================================
+# REJET
+# ============================================================================
+
+def test_missing_required_field_is_rejected():
+    result, errors = validate("comments", {"score": 5, "appreciated": ["x"]})
+    assert result is None
+    assert errors == ["comments.sentiment: champ manquant"]
+
+
+def test_wrong_top_level_type_is_rejected():
+    result, errors = validate("comments", ["pas", "un", "objet"])
+    assert result is None
+    assert errors == ["comments: objet attendu"]
+
+
+def test_invalid_items_are_dropped_without_rejecting_the_document():
+    document = {"sections": [{"title": "Tendance"}, {"items": ["sans titre"]}, {"title": "   "}]}
+    result, errors = validate("trends", document)
+    assert [section["title"] for section in result["sections"]] == ["Tendance"]
+    assert "trends.sections[1].title: champ manquant" in errors
+    assert len(errors) == 2
+
+
+def test_invalid_optional_field_is_reset_to_its_default():
+    result, errors = validate("comments", {"sentiment": "positif", "score": "aucune idée"})
+    assert result["score"] is None
+    assert "comments.score: valeur invalide ignorée" in errors
+
+
+def test_unreadable_content_is_not_parsed():
+    assert parse_json("Voici mon analyse, sans JSON.") is None
+    assert parse_json("") is None
+    assert parse_json(None) is None
+
+
+# ============================================================================
+# RÉPARATION
+# ============================================================================
+
+def test_score_text_is_parsed_and_clamped():
+    result, errors = validate("comments", {"sentiment": "positif", "score": "7,5/10"})
+    assert result["score"] == 7.5
+    assert errors == []
+
+    result, errors = validate("comments", {"sentiment": "positif", "score": 14})
+    assert result["score"] == 10
+    assert errors == ["comments.score: 14 ramené à 10"]
+
+
+def test_list_marks_and_bold_are_stripped_from_strings():
+    result, _ = validate("comments", {"sentiment": "positif", "appreciated": ["1. **Le montage**", "- Le son"]})
+    assert result["appreciated"] == ["Le montage", "Le son"]
+
+
+def test_bare_values_are_wrapped_in_the_expected_shape():
+    # Chaîne au lieu de {"text": ...}, clé inattendue, élément unique au lieu d'un tableau
+    result, _ = validate("points", {"points": ["Premier", {"point": "Deuxième"}]})
+    assert result["points"] == [{"text": "Premier"}, {"text": "Deuxième"}]
+
+    result, _ = validate("comments", {"sentiment": "positif", "questions": "Une seule question"})
+    assert result["questions"] == ["Une seule question"]
+
+
+def test_extra_items_are_truncated_to_max_items():
+    result, errors = validate("points", {"points": _points(12)})
+    assert len(result["points"]) == 10
+    assert errors == ["points.points: 12 éléments, 10 conservés"]
+
+
+def test_json_wrapped_in_code_fence_with_trailing_comma_is_repaired():
+    content = 'Voici le JSON :\n```json\n{"sentiment": "positif", "appreciated": ["a", "b",],}\n```'
+    assert parse_json(content) == {"sentiment": "positif", "appreciated": ["a", "b"]}
+
+
+# ============================================================================
+# RELANCES
+# ============================================================================
+
+def _fake_completion(responses: list[str], prompts: list[str]):
+    def complete(groq_client, prompt, **kwargs):
+        assert kwargs["json_mode"] is True
+        prompts.append(prompt)
+        return responses.pop(0)
+    return complete
+
+
+def test_unreadable_json_is_requested_again_once(monkeypatch):
+    prompts = []
+    responses = ["pas du JSON", json.dumps({"sentiment": "positif"})]
+    monkeypatch.setattr(structured, "chat_completion", _fake_completion(responses, prompts))
+
+    result = structured.structured_completion(None, "Analyse", "comments", max_tokens=100)
+    assert result["sentiment"] == "positif"
+    assert len(prompts) == 2
+    assert "Ta réponse précédente était invalide" in prompts[1]
+
+
+def test_raw_text_is_returned_when_json_stays_unreadable(monkeypatch):
+    prompts = []
+    responses = ["pas du JSON", "toujours pas"]
+    monkeypatch.setattr(structured, "chat_completion", _fake_completion(responses, prompts))
+
+    assert structured.structured_completion(None, "Analyse", "comments", max_tokens=100) == "toujours pas"
+    assert len(prompts) == 1 + structured.JSON_RETRIES
+
+
+def test_only_missing_items_are_requested(monkeypatch):
+    prompts = []
+    responses = [json.dumps({"points": _points(7)}),
+                 json.dumps({"points": [{"text": f"Complément {i}"} for i in range(1, 6)]})]
+    monkeypatch.setattr(structured, "chat_completion", _fake_completion(responses, prompts))
+
+    result = structured.structured_completion(None, "Analyse", "points", max_tokens=100)
+    assert len(result["points"]) == 10
+    assert result["points"][-1] == {"text": "Complément 3"}
+    assert "Fournis UNIQUEMENT 3 élément(s)" in prompts[1]
+
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+class _FakeGroq:
+    """Client Groq minimal renvoyant les réponses données, dans l'ordre."""
+
+    def __init__(self, responses: list[str]):
+        self.responses = responses
+        self.calls = 0
+        self.chat = self.completions = self
+
+    def create(self, **kwargs):
+        self.calls += 1
+        message = type("Message", (), {"content": self.responses.pop(0)})()
+        return type("Response", (), {"choices": [type("Choice", (), {"message": message})()], "usage": None})()
+
+
+def test_invalid_json_is_not_cached():
+    cache = LLMCache()
+    valid = json.dumps({"sentiment": "positif"})
+    client = _FakeGroq(["pas du JSON", valid, valid])
+
+    structured.structured_completion(client, "Analyse", "comments", max_tokens=100, cache=cache)
+    assert list(cache._entries.values()) == [valid]
+
+    # Le prompt initial n'a pas de réponse mémorisée : il est redemandé
+    assert structured.structured_completion(client, "Analyse", "comments", max_tokens=100,
+                                            cache=cache)["sentiment"] == "positif"
+    assert client.calls == 3
+
+
+def test_refreshing_cache_skips_reads_but_stores_new_answers():
+    cache = LLMCache()
+    first, second = json.dumps({"sentiment": "positif"}), json.dumps({"sentiment": "négatif"})
+    client = _FakeGroq([first, second])
+
+    structured.structured_completion(client, "Analyse", "comments", max_tokens=100, cache=cache)
+    refreshed = structured.structured_completion(client, "Analyse", "comments", max_tokens=100,
+                                                 cache=cache.refreshing())
+    assert refreshed["sentiment"] == "négatif"
+    assert structured.structured_completion(client, "Analyse", "comments", max_tokens=100,
+                                            cache=cache)["sentiment"] == "négatif"
+    assert client.calls == 2
@@ -0,0 +1,42 @@
+"""
+Comptage et troncature (tokens.py) : cache par empreinte et coupes aux frontières de caractères
+"""
+
+import pytest
+
+import tokens
+from tokens import count_tokens, truncate_to_tokens
+
+
+class _ByteEncoding:
+    """Encodage factice d'un token par octet UTF-8 : toute coupe peut tomber dans un caractère."""
+
+    def encode(self, text, disallowed_special=()):
+        return list(text.encode("utf-8"))
+
+    def decode_bytes(self, token_ids):
+        return bytes(token_ids)
+
+
+@pytest.fixture
+def byte_encoding(monkeypatch):
+    monkeypatch.setattr(tokens, "_encoding", _ByteEncoding())
+    monkeypatch.setattr(tokens, "_encoding_loaded", True)
+    monkeypatch.setattr(tokens, "_counts", tokens.OrderedDict())
+
+
+def test_truncation_never_splits_a_multibyte_character(byte_encoding):
+    text = "aé🎬b"
+    for max_tokens in range(1, len(text.encode("utf-8"))):
+        prefix = truncate_to_tokens(text, max_tokens)
+        assert text.startswith(prefix)
+        assert "�" not in prefix
+        assert count_tokens(prefix) <= max_tokens
+
+
+def test_count_cache_is_bounded_and_keyed_by_digest(byte_encoding, monkeypatch):
+    monkeypatch.setattr(tokens, "TOKEN_COUNT_CACHE_SIZE", 2)
+    texts = ["x" * 10_000, "y", "z"]
+    assert [count_tokens(text) for text in texts] == [10_000, 1, 1]
+    assert len(tokens._counts) == 2
+    assert all(isinstance(key, bytes) and len(key) == 16 for key in tokens._counts)
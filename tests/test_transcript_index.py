@@ -0,0 +1,119 @@
+"""
+Index BM25 des transcriptions (transcript_index.py) : classement des passages et datation
+"""
+
+import numpy as np
+import pytest
+
+from transcript_index import TIMESTAMP_TOKENS, TranscriptIndex
+from transcripts import format_timestamp
+
+TOPICS = [
+    "les volcans islandais crachent une lave basaltique très fluide",
+    "la migration des saumons remonte les rivières glacées chaque automne",
+    "les algorithmes de compression réduisent la taille des fichiers audio",
+    "la fermentation du pain dépend des levures sauvages et de la température",
+]
+
+
+def make_transcript(texts: list[str], segment_seconds: float = 10.0) -> dict:
+    return {"language": "fr", "segments": [
+        {"text": text, "start": index * segment_seconds, "duration": segment_seconds}
+        for index, text in enumerate(texts)
+    ]}
+
+
+@pytest.fixture
+def index() -> TranscriptIndex:
+    # Un sujet par passage : passage_tokens plus petit que deux segments
+    return TranscriptIndex(make_transcript(TOPICS, segment_seconds=75.0), passage_tokens=1)
+
+
+# ============================================================================
+# STRUCTURE
+# ============================================================================
+
+def test_segments_are_grouped_into_passages_within_the_token_budget():
+    texts = [f"phrase numéro {i} sur les volcans" for i in range(40)]
+    index = TranscriptIndex(make_transcript(texts), passage_tokens=30)
+    assert len(index) > 1
+    assert index.passage_bounds[0] == 0 and index.passage_bounds[-1] == len(texts)
+    assert all(tokens <= 30 for tokens in index.passage_tokens)
+    # Les passages recouvrent tout le texte, dans l'ordre
+    assert " ".join(index.passage_text(passage) for passage in range(len(index))) == index.text
+
+
+def test_empty_transcript():
+    index = TranscriptIndex(make_transcript([]))
+    assert len(index) == 0
+    assert index.locate("volcans") is None
+    assert index.select(1000) == ""
+
+
+# ============================================================================
+# CLASSEMENT BM25
+# ============================================================================
+
+def test_query_ranks_matching_passage_first(index):
+    scores = index.scores("comment remontent les saumons ?")
+    assert int(np.argmax(scores)) == 1
+    assert scores[1] > 0
+    assert np.count_nonzero(scores) == 1
+
+
+def test_rare_terms_weigh_more_than_common_ones():
+    texts = ["volcans lave volcans", "volcans cendres", "volcans geysers", "saumons rivières"]
+    index = TranscriptIndex(make_transcript(texts), passage_tokens=1)
+    # "volcans" apparaît dans 3 passages sur 4, "saumons" dans un seul
+    assert index.scores("saumons").max() > index.scores("volcans").max()
+
+
+def test_term_frequency_saturates():
+    texts = ["lave " * 2 + "roche", "lave " * 20 + "roche"]
+    index = TranscriptIndex(make_transcript(texts), passage_tokens=1)
+    scores = index.scores("lave")
+    assert scores[1] > scores[0]
+    assert scores[1] < 10 * scores[0]
+
+
+def test_stopwords_and_unknown_terms_do_not_score(index):
+    assert not index.scores("les des une est").any()
+    assert not index.scores("astrophysique").any()
+
+
+def test_select_keeps_densest_passages_in_video_order_with_timestamps(index):
+    budget = int(index.passage_tokens[0] + index.passage_tokens[3]) + 2 * TIMESTAMP_TOKENS
+    selected = index.select(budget, title="fermentation du pain et volcans")
+    lines = selected.split("\n")
+    assert lines == [f"[0:00] {TOPICS[0]}", f"[3:45] {TOPICS[3]}"]
+
+
+def test_select_respects_the_token_budget(index):
+    assert index.select(1) == ""
+    everything = index.select(10_000)
+    assert everything.count("\n") == len(index) - 1
+
+
+# ============================================================================
+# DATATION
+# ============================================================================
+
+def test_locate_returns_start_of_best_passage(index):
+    assert index.locate("La lave basaltique des volcans") == 0
+    assert index.locate("Les levures sauvages font lever le pain") == 225
+    assert index.locate("sans rapport avec la vidéo") is None
+
+
+def test_locate_uses_first_segment_of_multi_segment_passage():
+    texts = ["introduction générale", "les volcans islandais", "place à la géologie", "crachent une lave fluide"]
+    index = TranscriptIndex(make_transcript(texts, segment_seconds=30.0), passage_tokens=12)
+    passage = next(p for p in range(len(index)) if "lave" in index.passage_text(p))
+    first_segment = int(index.passage_bounds[passage])
+    # La phrase citée est dans le dernier segment, le point est daté au début de son passage
+    assert first_segment < len(texts) - 1
+    assert index.locate("lave fluide") == first_segment * 30
+
+
+@pytest.mark.parametrize("seconds, label", [(0, "0:00"), (75.9, "1:15"), (3599, "59:59"), (3725, "1:02:05")])
+def test_format_timestamp(seconds, label):
+    assert format_timestamp(seconds) == label
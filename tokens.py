@@ -0,0 +1,238 @@
+"""
+Comptage de tokens et budgets de prompt par modèle
+Utilise tiktoken s'il est installé, sinon un estimateur hors ligne calé sur le
+tokenizer Llama 3. Le comptage est fixe (prompts et découpages reproductibles) ;
+seules les réservations de l'ordonnanceur sont recalées sur l'usage réel de Groq
+"""
+
+import hashlib
+import math
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Fenêtre de contexte (tokens) des modèles utilisés via Groq
+MODEL_CONTEXT_TOKENS = {
+    "llama-3.3-70b-versatile": 131072,
+    "llama-3.1-8b-instant": 131072,
+    "llama3-70b-8192": 8192,
+    "llama3-8b-8192": 8192,
+    "gemma2-9b-it": 8192,
+    "mixtral-8x7b-32768": 32768,
+}
+DEFAULT_CONTEXT_TOKENS = 8192
+
+# Tokens ajoutés par le gabarit de conversation autour du message utilisateur
+MESSAGE_OVERHEAD_TOKENS = 8
+
+# Encodage tiktoken le plus proche du vocabulaire Llama 3 (approximation : vocabulaire différent)
+TIKTOKEN_ENCODING = "cl100k_base"
+
+# Comptes mémorisés, indexés par empreinte du texte (les transcriptions complètes ne sont pas retenues)
+TOKEN_COUNT_CACHE_SIZE = 16384
+
+# Découpage préalable proche de celui des tokenizers BPE (lettres, nombres par 3, symboles, espaces)
+_PIECE_PATTERN = re.compile(r" ?[^\W\d_]+| ?\d{1,3}| ?[^\w\s]+|\s+")
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+_counts: OrderedDict[bytes, int] = OrderedDict()
+_counts_lock = threading.Lock()
+
+# Facteurs de correction par modèle (réel / compté), pour les seules réservations de l'ordonnanceur
+_calibration: dict[str, float] = {}
+_calibration_lock = threading.Lock()
+CALIBRATION_SMOOTHING = 0.2
+CALIBRATION_BOUNDS = (0.5, 2.0)
+
+
+def _get_encoding():
+    """Charge l'encodage tiktoken à la première utilisation (None s'il est indisponible)."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(TIKTOKEN_ENCODING)
+                except Exception:
+                    # Absent, ou fichiers de vocabulaire non téléchargeables hors ligne
+                    _encoding = None
+                _encoding_loaded = True
+    return _encoding
+
+
+def _estimate_piece(piece: str) -> int:
+    """Estimation hors ligne du nombre de tokens d'un fragment."""
+    word = piece.lstrip(" ")
+    if not word:
+        return 1
+    if word[0].isdigit() or word.isspace():
+        return 1
+    if not word[0].isalpha():
+        # Ponctuation et emoji : environ un token pour deux octets UTF-8
+        return max(1, math.ceil(len(word.encode("utf-8")) / 2))
+    if word.isascii():
+        return max(1, math.ceil(len(word) / 6))
+    highest = max(map(ord, word))
+    if highest < 0x250:
+        # Latin accentué (français, espagnol...) : les accents coupent les mots
+        return max(1, math.ceil(len(word) / 4))
+    if highest < 0x3000:
+        # Cyrillique, arabe, hébreu, indien...
+        return max(1, math.ceil(len(word) / 2))
+    # Idéogrammes et syllabaires : environ un token par caractère
+    return len(word)
+
+
+def _count(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return sum(_estimate_piece(piece) for piece in _PIECE_PATTERN.findall(text))
+
+
+def _raw_count(text: str) -> int:
+    """Comptage mis en cache (LRU) sous une empreinte de 16 octets plutôt que sous le texte lui-même."""
+    key = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    with _counts_lock:
+        count = _counts.get(key)
+        if count is not None:
+            _counts.move_to_end(key)
+            return count
+    count = _count(text)
+    with _counts_lock:
+        _counts[key] = count
+        if len(_counts) > TOKEN_COUNT_CACHE_SIZE:
+            _counts.popitem(last=False)
+    return count
+
+
+def count_tokens(text: str, model: str | None = None) -> int:
+    """Nombre de tokens de `text` (mis en cache par texte).
+
+    Comptage fixe, indépendant de l'usage observé : un même texte donne
+    toujours les mêmes découpages et troncatures, donc les mêmes prompts (et
+    les mêmes clés de cache LLM). Les modèles servis partagent le vocabulaire
+    Llama 3 ; `model` est accepté pour les appelants qui raisonnent par modèle.
+    """
+    if not text:
+        return 0
+    return _raw_count(text)
+
+
+def estimate_tokens(text: str, model: str) -> int:
+    """Tokens que Groq facturera pour `text` : comptage recalé sur l'usage réel du modèle.
+
+    Réservé aux estimations de débit (réservations TPM de l'ordonnanceur) ;
+    la construction des prompts utilise `count_tokens`.
+    """
+    if not text:
+        return 0
+    return math.ceil(_raw_count(text) * _calibration.get(model, 1.0))
+
+
+def observe_usage(model: str, prompt: str, prompt_tokens: int | None):
+    """Recale l'estimation du modèle sur le nombre de tokens réellement facturé par l'API.
+
+    Actif même avec tiktoken : cl100k_base n'est qu'une approximation du vocabulaire Llama 3.
+    """
+    if not prompt_tokens:
+        return
+    estimated = _raw_count(prompt)
+    if estimated <= 0:
+        return
+    ratio = max(prompt_tokens - MESSAGE_OVERHEAD_TOKENS, 1) / estimated
+    ratio = min(max(ratio, CALIBRATION_BOUNDS[0]), CALIBRATION_BOUNDS[1])
+    with _calibration_lock:
+        previous = _calibration.get(model, 1.0)
+        _calibration[model] = previous + CALIBRATION_SMOOTHING * (ratio - previous)
+
+
+def context_window(model: str) -> int:
+    return MODEL_CONTEXT_TOKENS.get(model, DEFAULT_CONTEXT_TOKENS)
+
+
+def prompt_budget(model: str, max_completion_tokens: int) -> int:
+    """Tokens disponibles pour le prompt une fois la réponse réservée."""
+    return context_window(model) - max_completion_tokens - MESSAGE_OVERHEAD_TOKENS
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str | None = None) -> str:
+    """Plus long préfixe de `text` tenant dans `max_tokens`."""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    encoding = _get_encoding()
+    if encoding is not None:
+        # Une coupe entre deux tokens peut tomber au milieu d'un caractère multi-octets : on l'écarte
+        prefix = encoding.decode_bytes(encoding.encode(text, disallowed_special=())[:max_tokens])
+        return prefix.decode("utf-8", errors="ignore")
+
+    used = 0
+    end = 0
+    for match in _PIECE_PATTERN.finditer(text):
+        used += _estimate_piece(match.group())
+        if used > max_tokens:
+            break
+        end = match.end()
+    return text[:end]
+
+
+def _separator_cost(separator: str, model: str | None) -> int:
+    """Coût marginal du séparateur une fois collé au fragment suivant (souvent nul pour une espace)."""
+    return count_tokens(separator + "x", model) - count_tokens("x", model)
+
+
+def pack(items: Iterable[str], max_tokens: int, model: str | None = None, separator: str = "\n") -> list[str]:
+    """Sélection gloutonne, dans l'ordre, des éléments qui tiennent dans le budget.
+
+    Un élément trop gros pour la place restante est sauté : les suivants, plus
+    courts, peuvent encore remplir le budget.
+    """
+    separator_tokens = _separator_cost(separator, model)
+    packed = []
+    used = 0
+    for item in items:
+        cost = count_tokens(item, model) + (separator_tokens if packed else 0)
+        if used + cost <= max_tokens:
+            packed.append(item)
+            used += cost
+    return packed
+
+
+def split_to_tokens(pieces: Iterable[str], max_tokens: int, model: str | None = None,
+                    separator: str = " ") -> Iterator[str]:
+    """Regroupe des fragments consécutifs en blocs d'au plus `max_tokens`.
+
+    Les fragments trop longs sont redécoupés par mots (sous-titres automatiques
+    sans ponctuation), puis tronqués si un mot dépasse à lui seul le budget.
+    """
+    separator_tokens = _separator_cost(separator, model)
+    current: list[str] = []
+    used = 0
+    for piece in pieces:
+        cost = count_tokens(piece, model)
+        if cost > max_tokens:
+            words = piece.split()
+            if len(words) > 1:
+                if current:
+                    yield separator.join(current)
+                    current, used = [], 0
+                yield from split_to_tokens(words, max_tokens, model, " ")
+                continue
+            piece = truncate_to_tokens(piece, max_tokens, model)
+            cost = count_tokens(piece, model)
+        if current and used + separator_tokens + cost > max_tokens:
+            yield separator.join(current)
+            current, used = [], 0
+        used += cost + (separator_tokens if current else 0)
+        current.append(piece)
+    if current:
+        yield separator.join(current)
@@ -0,0 +1,150 @@
+"""
+Index local d'une transcription horodatée
+Segments stockés en tableaux NumPy (texte concaténé + décalages, débuts, durées),
+regroupés en passages indexés par BM25 (format CSR) : sélection des passages
+les plus denses dans un budget de tokens et datation des points extraits
+"""
+
+import numpy as np
+
+from clustering import tokenize
+from tokens import count_tokens
+from transcripts import format_timestamp
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Taille visée d'un passage (segments consécutifs regroupés)
+PASSAGE_TOKENS = 250
+
+# Paramètres BM25 usuels
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Coût d'une marque [mm:ss] en tête de passage
+TIMESTAMP_TOKENS = 5
+
+# Termes les plus caractéristiques de la transcription servant de requête de densité
+DENSITY_QUERY_TERMS = 40
+
+
+class TranscriptIndex:
+    """Transcription horodatée compacte et index BM25 de ses passages."""
+
+    def __init__(self, transcript: dict, passage_tokens: int = PASSAGE_TOKENS, model: str | None = None):
+        segments = transcript["segments"]
+        texts = [segment["text"].strip() for segment in segments]
+        self.text = " ".join(texts)
+        # Segment i = text[offsets[i]:offsets[i + 1] - 1] (le séparateur est exclu)
+        self.offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum([len(text) + 1 for text in texts], out=self.offsets[1:])
+        self.starts = np.fromiter((segment["start"] for segment in segments), dtype=np.float32, count=len(segments))
+        self.durations = np.fromiter((segment["duration"] for segment in segments), dtype=np.float32,
+                                     count=len(segments))
+
+        # Passages : segments consécutifs jusqu'à `passage_tokens`
+        bounds = [0]
+        costs = []
+        used = 0
+        for index, text in enumerate(texts):
+            cost = count_tokens(text, model) + 1
+            if used and used + cost > passage_tokens:
+                bounds.append(index)
+                costs.append(used)
+                used = 0
+            used += cost
+        if texts:
+            bounds.append(len(texts))
+            costs.append(used)
+        self.passage_bounds = np.array(bounds, dtype=np.int64)
+        self.passage_tokens = np.array(costs, dtype=np.int64)
+        self._build_bm25()
+
+    def __len__(self) -> int:
+        return len(self.passage_bounds) - 1
+
+    def passage_text(self, passage: int) -> str:
+        first, last = self.passage_bounds[passage], self.passage_bounds[passage + 1]
+        return self.text[self.offsets[first]:self.offsets[last] - 1]
+
+    def passage_start(self, passage: int) -> float:
+        return float(self.starts[self.passage_bounds[passage]])
+
+    # ------------------------------------------------------------------
+    # BM25
+    # ------------------------------------------------------------------
+
+    def _build_bm25(self):
+        """Poids BM25 de chaque (passage, terme) au format CSR : (weights, indices, indptr)."""
+        vocabulary: dict[str, int] = {}
+        indptr = np.zeros(len(self) + 1, dtype=np.int64)
+        indices_parts = []
+        counts_parts = []
+        lengths = np.zeros(len(self), dtype=np.float32)
+        for passage in range(len(self)):
+            terms = tokenize(self.passage_text(passage))
+            ids, counts = np.unique(
+                np.fromiter((vocabulary.setdefault(term, len(vocabulary)) for term in terms), dtype=np.int64),
+                return_counts=True,
+            )
+            indices_parts.append(ids)
+            counts_parts.append(counts.astype(np.float32))
+            lengths[passage] = len(terms)
+            indptr[passage + 1] = indptr[passage] + len(ids)
+
+        self.vocabulary = vocabulary
+        self.indices = np.concatenate(indices_parts) if indices_parts else np.zeros(0, dtype=np.int64)
+        tf = np.concatenate(counts_parts) if counts_parts else np.zeros(0, dtype=np.float32)
+        self.indptr = indptr
+        self._row_ids = np.repeat(np.arange(len(self)), np.diff(indptr))
+
+        n_passages = len(self)
+        document_frequency = np.bincount(self.indices, minlength=len(vocabulary))
+        idf = np.log(1 + (n_passages - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+        average_length = max(float(lengths.mean()), 1.0) if n_passages else 1.0
+        norms = BM25_K1 * (1 - BM25_B + BM25_B * lengths / average_length)
+        self.weights = idf[self.indices] * tf * (BM25_K1 + 1) / (tf + norms[self._row_ids])
+
+    def scores(self, query: str | list[str]) -> np.ndarray:
+        """Score BM25 de chaque passage pour une requête (texte ou liste de termes)."""
+        terms = tokenize(query) if isinstance(query, str) else query
+        query_vector = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for term in terms:
+            if term in self.vocabulary:
+                query_vector[self.vocabulary[term]] += 1
+        return np.bincount(self._row_ids, weights=self.weights * query_vector[self.indices], minlength=len(self))
+
+    def density(self, title: str = "") -> np.ndarray:
+        """Densité d'information des passages : BM25 pour le titre et les termes caractéristiques."""
+        term_weights = np.bincount(self.indices, weights=self.weights, minlength=len(self.vocabulary))
+        top = np.argsort(-term_weights)[:DENSITY_QUERY_TERMS]
+        terms = list(self.vocabulary)
+        return self.scores([terms[term] for term in top] + tokenize(title))
+
+    # ------------------------------------------------------------------
+    # Recherche
+    # ------------------------------------------------------------------
+
+    def select(self, max_tokens: int, title: str = "") -> str:
+        """Passages les plus denses tenant dans `max_tokens`, dans l'ordre de la vidéo et datés [mm:ss]."""
+        selected = []
+        used = 0
+        for passage in np.argsort(-self.density(title), kind="stable"):
+            # Marque [mm:ss] et retour à la ligne compris
+            cost = int(self.passage_tokens[passage]) + TIMESTAMP_TOKENS
+            if used + cost <= max_tokens:
+                selected.append(int(passage))
+                used += cost
+        return "\n".join(
+            f"[{format_timestamp(self.passage_start(passage))}] {self.passage_text(passage)}"
+            for passage in sorted(selected)
+        )
+
+    def locate(self, text: str) -> int | None:
+        """Début (secondes) du passage le plus proche d'un texte, None si aucun terme commun."""
+        if not len(self):
+            return None
+        scores = self.scores(text)
+        best = int(np.argmax(scores))
+        return int(self.passage_start(best)) if scores[best] > 0 else None
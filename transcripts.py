@@ -0,0 +1,195 @@
+"""
+Service de transcriptions
+Liste les pistes disponibles une seule fois par vidéo, mémorise la langue
+retenue par vidéo et par chaîne, et télécharge les transcriptions d'un lot en
+parallèle (pool borné) en conservant les segments horodatés
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import metrics
+from cache import CACHE_TTLS, DiskCache
+from pipeline import BACKEND_LIMITS, backend_slot, warn
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Langues essayées dans l'ordre (après celles déjà retenues pour la vidéo ou sa chaîne)
+PREFERRED_LANGUAGES = ['fr', 'en', 'es', 'de', 'it', 'pt']
+
+
+def transcript_text(transcript: dict) -> str:
+    """Texte continu d'une transcription (segments joints par des espaces)."""
+    return " ".join(segment["text"] for segment in transcript["segments"])
+
+
+def format_timestamp(seconds: float) -> str:
+    """Position dans la vidéo : m:ss, ou h:mm:ss au-delà d'une heure."""
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+
+def timestamp_url(video_id: str, seconds: float) -> str:
+    """Lien vers la vidéo à la position donnée."""
+    return f"https://youtu.be/{video_id}?t={int(seconds)}"
+
+
+def _select_track(tracks: list, languages: list[str]):
+    """Piste à télécharger : par langue préférée, manuelle avant générée, sinon la première disponible."""
+    for language in languages:
+        for generated in (False, True):
+            for track in tracks:
+                if track.language_code == language and track.is_generated == generated:
+                    return track
+    return tracks[0] if tracks else None
+
+
+class TranscriptService:
+    """Récupération des transcriptions d'un lot de vidéos.
+
+    `prefetch` lance les téléchargements dès le début du lot dans un pool
+    borné ; `get` attend le résultat d'une vidéo (ou la télécharge dans le
+    thread appelant si elle n'a pas été préchargée) et émet
+    les avertissements dans le thread appelant, pour qu'ils rejoignent ceux
+    de la vidéo. Le nombre d'appels simultanés reste borné globalement par le
+    limiteur "transcript" du pipeline.
+    """
+
+    def __init__(self, cache: DiskCache | None = None, max_workers: int = BACKEND_LIMITS["transcript"]):
+        self.cache = cache
+        self.max_workers = max_workers
+        self._executor: ThreadPoolExecutor | None = None
+        self._futures: dict[str, Future] = {}
+        self._languages: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Langue retenue par vidéo et par chaîne
+    # ------------------------------------------------------------------
+
+    def _known_language(self, key: str) -> str | None:
+        with self._lock:
+            language = self._languages.get(key)
+        if language is None and self.cache is not None:
+            language = self.cache.get("transcript_language", key)
+            if language is not None:
+                with self._lock:
+                    self._languages[key] = language
+        return language
+
+    def _remember_language(self, key: str, language: str):
+        with self._lock:
+            self._languages[key] = language
+        if self.cache is not None:
+            self.cache.set("transcript_language", key, language, CACHE_TTLS["transcript_language"])
+
+    def languages_for(self, video_id: str, channel_id: str | None = None) -> list[str]:
+        """Ordre d'essai des langues : celle de la vidéo, celle de sa chaîne, puis les préférées."""
+        known = [self._known_language(f"video:{video_id}")]
+        if channel_id:
+            known.append(self._known_language(f"channel:{channel_id}"))
+        languages = []
+        for language in known + PREFERRED_LANGUAGES:
+            if language and language not in languages:
+                languages.append(language)
+        return languages
+
+    # ------------------------------------------------------------------
+    # Téléchargement
+    # ------------------------------------------------------------------
+
+    def fetch(self, video_id: str, channel_id: str | None = None) -> tuple[dict | None, str | None]:
+        """Télécharge une transcription : (transcription, None) ou (None, message d'erreur)."""
+        if self.cache is not None:
+            cached = self.cache.get("transcript", f"{video_id}:segments")
+            if cached is not None:
+                metrics.add(cache_hit=True)
+                return cached, None
+        try:
+            # Import différé : la bibliothèque n'est chargée qu'à la première transcription
+            from youtube_transcript_api import YouTubeTranscriptApi
+
+            with backend_slot("transcript"):
+                # Une seule liste des pistes, puis le téléchargement de la piste choisie
+                tracks = list(YouTubeTranscriptApi().list(video_id))
+                track = _select_track(tracks, self.languages_for(video_id, channel_id))
+                if track is None:
+                    return None, "⚠️ Transcription non disponible: aucune piste"
+                fetched = track.fetch()
+        except Exception as e:
+            return None, f"⚠️ Transcription non disponible: {e}"
+
+        transcript = {
+            "language": track.language_code,
+            "is_generated": track.is_generated,
+            "segments": [
+                {"text": snippet.text, "start": snippet.start, "duration": snippet.duration}
+                for snippet in fetched
+            ],
+        }
+        if not transcript["segments"]:
+            return None, None
+        metrics.add(bytes=sum(len(segment["text"].encode("utf-8")) for segment in transcript["segments"]))
+        self._remember_language(f"video:{video_id}", track.language_code)
+        if channel_id:
+            self._remember_language(f"channel:{channel_id}", track.language_code)
+        if self.cache is not None:
+            self.cache.set("transcript", f"{video_id}:segments", transcript, CACHE_TTLS["transcript"])
+        return transcript, None
+
+    def _submit(self, video_id: str, channel_id: str | None, collector: metrics.Metrics | None) -> Future:
+        with self._lock:
+            future = self._futures.get(video_id)
+            if future is None:
+                if self._executor is None:
+                    # Pool créé au premier préchargement : un appel isolé reste dans le thread appelant
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix="transcript")
+                future = self._futures[video_id] = self._executor.submit(
+                    self._fetch_measured, video_id, channel_id, collector
+                )
+        return future
+
+    def _fetch_measured(self, video_id: str, channel_id: str | None, collector: metrics.Metrics | None):
+        with metrics.use(collector, video_id), metrics.measure("transcript"):
+            return self.fetch(video_id, channel_id)
+
+    def prefetch(self, videos: list[tuple[str, str | None]], collector: metrics.Metrics | None = None):
+        """Lance en arrière-plan le téléchargement des transcriptions de (video_id, channel_id)."""
+        for video_id, channel_id in videos:
+            self._submit(video_id, channel_id, collector)
+
+    async def async_get(self, video_id: str, channel_id: str | None = None,
+                        collector: metrics.Metrics | None = None) -> dict | None:
+        """Variante asynchrone de `get` : le téléchargement reste dans le pool, la boucle n'est pas bloquée."""
+        transcript, error = await asyncio.wrap_future(self._submit(video_id, channel_id, collector))
+        if error:
+            warn(error)
+        return transcript
+
+    def get(self, video_id: str, channel_id: str | None = None) -> dict | None:
+        """Transcription d'une vidéo (attend un préchargement déjà lancé), None si indisponible."""
+        with self._lock:
+            future = self._futures.get(video_id)
+        if future is not None:
+            transcript, error = future.result()
+        else:
+            with metrics.measure("transcript"):
+                transcript, error = self.fetch(video_id, channel_id)
+        if error:
+            warn(error)
+        return transcript
@@ -0,0 +1,339 @@
+"""
+Client partagé de l'API YouTube Data v3
+Pool de connexions keep-alive, retries avec backoff exponentiel (jitter),
+limitation de débit, gestion du quota par clé API et statistiques par endpoint
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+API_BASE_URL = "https://www.googleapis.com/youtube/v3"
+
+# Taille du pool de connexions HTTP réutilisées (keep-alive)
+POOL_SIZE = 32
+
+# Requêtes simultanées vers l'API depuis la boucle asyncio (client asynchrone)
+ASYNC_MAX_IN_FLIGHT = 64
+
+REQUEST_TIMEOUT = 10
+
+# Retries sur erreurs transitoires
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 16.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Débit maximal de requêtes émises par le processus
+MAX_REQUESTS_PER_SECOND = 20
+
+# Coût en unités de quota de chaque endpoint (quota journalier par défaut: 10 000)
+QUOTA_COSTS = {
+    "videos": 1,
+    "commentThreads": 1,
+    "comments": 1,
+    "channels": 1,
+    "playlistItems": 1,
+    "playlists": 1,
+    "search": 100,
+}
+DAILY_QUOTA = 10_000
+
+# Le quota journalier de chaque clé est remis à zéro à minuit, heure du Pacifique
+QUOTA_TIMEZONE = "America/Los_Angeles"
+
+# Raisons d'erreur 403 : limites de débit (réessayables) vs quota journalier épuisé
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+QUOTA_REASONS = {"quotaExceeded", "dailyLimitExceeded"}
+
+
+class QuotaExceededError(Exception):
+    """Le quota journalier de l'API YouTube est épuisé."""
+
+
+class YouTubeAPIError(Exception):
+    """Échec d'un appel à l'API YouTube.
+
+    Le message ne cite que l'endpoint, le statut HTTP et la raison de
+    l'erreur : jamais l'URL, dont la chaîne de requête contient la clé API
+    (les messages finissent dans les avertissements persistés et le JSONL).
+    """
+
+    def __init__(self, endpoint: str, status_code: int | None = None, reason: str | None = None):
+        self.endpoint = endpoint
+        self.status_code = status_code
+        self.reason = reason
+        status = f"HTTP {status_code}" if status_code is not None else "erreur réseau"
+        super().__init__(f"API YouTube {endpoint} : {status}" + (f" ({reason})" if reason else ""))
+
+
+try:
+    _QUOTA_TZ = ZoneInfo(QUOTA_TIMEZONE)
+except ZoneInfoNotFoundError:
+    # Sans base tzdata (Windows) : heure normale du Pacifique, sans heure d'été
+    _QUOTA_TZ = timezone(timedelta(hours=-8))
+
+
+def quota_day() -> date:
+    """Journée de quota en cours (calendrier du Pacifique)."""
+    return datetime.now(_QUOTA_TZ).date()
+
+
+def _error_reason(response) -> str | None:
+    """Extrait la raison d'erreur renvoyée par l'API Google, si présente."""
+    try:
+        errors = response.json().get("error", {}).get("errors", [])
+    except ValueError:
+        return None
+    return errors[0].get("reason") if errors else None
+
+
+class _ClientState:
+    """Débit, quota et statistiques par endpoint, communs aux clients synchrone et asynchrone.
+
+    Le quota est suivi par clé API (paramètre `key` des requêtes) et par
+    journée de quota : une clé épuisée ne bloque pas les autres, et chaque
+    clé repart de zéro à minuit, heure du Pacifique.
+    """
+
+    def __init__(self, base_url: str, max_retries: int, requests_per_second: float, daily_quota: int):
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.daily_quota = daily_quota
+        self.requests_per_second = requests_per_second
+        self._min_interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+        # Clé API -> {"day": journée de quota, "used": unités consommées, "exhausted": épuisé selon l'API}
+        self._quotas: dict[str | None, dict] = {}
+        self._stats = defaultdict(lambda: {
+            "requests": 0, "retries": 0, "errors": 0, "latency_total": 0.0, "latency_max": 0.0
+        })
+
+    def _throttle_delay(self) -> float:
+        """Réserve le prochain créneau d'émission et renvoie l'attente nécessaire."""
+        if not self._min_interval:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self._min_interval
+        return slot - now
+
+    def _record(self, endpoint: str, latency: float | None = None, retry: bool = False, error: bool = False):
+        with self._lock:
+            stats = self._stats[endpoint]
+            if latency is not None:
+                stats["requests"] += 1
+                stats["latency_total"] += latency
+                stats["latency_max"] = max(stats["latency_max"], latency)
+            if retry:
+                stats["retries"] += 1
+            if error:
+                stats["errors"] += 1
+
+    def _quota(self, api_key: str | None) -> dict:
+        """État du quota de la clé pour la journée en cours (verrou tenu par l'appelant)."""
+        today = quota_day()
+        quota = self._quotas.get(api_key)
+        if quota is None or quota["day"] != today:
+            quota = self._quotas[api_key] = {"day": today, "used": 0, "exhausted": False}
+        return quota
+
+    def quota_used(self, api_key: str | None) -> int:
+        """Unités de quota consommées aujourd'hui avec cette clé."""
+        with self._lock:
+            return self._quota(api_key)["used"]
+
+    def _check_quota(self, endpoint: str, api_key: str | None):
+        with self._lock:
+            quota = self._quota(api_key)
+            exhausted = quota["exhausted"] or quota["used"] + QUOTA_COSTS.get(endpoint, 1) > self.daily_quota
+        if exhausted:
+            raise QuotaExceededError("quota journalier de l'API YouTube épuisé pour cette clé")
+
+    def _is_retryable(self, endpoint: str, response, api_key: str | None) -> bool:
+        """Classe une réponse : quota épuisé (exception), erreur transitoire (True) ou définitive/succès (False)."""
+        status = response.status_code
+        reason = _error_reason(response) if status == 403 else None
+        if reason in QUOTA_REASONS:
+            with self._lock:
+                self._quota(api_key)["exhausted"] = True
+            self._record(endpoint, error=True)
+            raise QuotaExceededError("quota journalier de l'API YouTube épuisé pour cette clé")
+        if status not in RETRY_STATUSES and reason not in RATE_LIMIT_REASONS:
+            if status >= 400:
+                self._record(endpoint, error=True)
+            return False
+        self._record(endpoint, error=True)
+        return True
+
+    @staticmethod
+    def _raise_for_status(endpoint: str, response):
+        """Équivalent de `raise_for_status` sans l'URL (et donc sans la clé API) dans le message."""
+        if response.status_code >= 400:
+            raise YouTubeAPIError(endpoint, response.status_code, _error_reason(response))
+
+    def _accepted(self, endpoint: str, response, api_key: str | None) -> dict:
+        """Comptabilise une réponse réussie et renvoie son JSON."""
+        with self._lock:
+            self._quota(api_key)["used"] += QUOTA_COSTS.get(endpoint, 1)
+        metrics.add(bytes=len(response.content), requests=1)
+        return response.json()
+
+    def _retry_delay(self, endpoint: str, attempt: int, retry_after: str | None) -> float:
+        """Backoff exponentiel avec "full jitter", ou délai imposé par le serveur."""
+        delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        self._record(endpoint, retry=True)
+        metrics.add(retries=1)
+        return delay
+
+    def stats(self) -> list[dict]:
+        """Renvoie les statistiques par endpoint (requêtes, retries, erreurs, latences en ms)."""
+        with self._lock:
+            return [
+                {
+                    "endpoint": endpoint,
+                    "requests": stats["requests"],
+                    "retries": stats["retries"],
+                    "errors": stats["errors"],
+                    "latency_avg_ms": round(1000 * stats["latency_total"] / stats["requests"], 1)
+                    if stats["requests"] else 0.0,
+                    "latency_max_ms": round(1000 * stats["latency_max"], 1),
+                }
+                for endpoint, stats in sorted(self._stats.items())
+            ]
+
+
+class YouTubeClient(_ClientState):
+    """Client HTTP thread-safe de l'API YouTube Data, partagé par tous les workers."""
+
+    def __init__(self, base_url: str = API_BASE_URL, pool_size: int = POOL_SIZE,
+                 max_retries: int = MAX_RETRIES, requests_per_second: float = MAX_REQUESTS_PER_SECOND,
+                 daily_quota: int = DAILY_QUOTA):
+        super().__init__(base_url, max_retries, requests_per_second, daily_quota)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, endpoint: str, params: dict) -> dict:
+        """Appelle un endpoint (ex: "videos") et renvoie le JSON, avec retries sur erreurs transitoires."""
+        api_key = params.get("key")
+        self._check_quota(endpoint, api_key)
+        url = f"{self.base_url}/{endpoint}"
+        for attempt in range(self.max_retries + 1):
+            delay = self._throttle_delay()
+            if delay > 0:
+                time.sleep(delay)
+            retry_after = None
+            start = time.monotonic()
+            try:
+                response = self.session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record(endpoint, error=True)
+                if attempt == self.max_retries:
+                    # Le message de requests reprend l'URL complète, clé API comprise
+                    raise YouTubeAPIError(endpoint, reason=type(e).__name__) from None
+            else:
+                self._record(endpoint, latency=time.monotonic() - start)
+                if not self._is_retryable(endpoint, response, api_key):
+                    self._raise_for_status(endpoint, response)
+                    return self._accepted(endpoint, response, api_key)
+                if attempt == self.max_retries:
+                    self._raise_for_status(endpoint, response)
+                retry_after = response.headers.get("Retry-After")
+            time.sleep(self._retry_delay(endpoint, attempt, retry_after))
+
+        raise RuntimeError("nombre de tentatives épuisé")
+
+
+class AsyncYouTubeClient(_ClientState):
+    """Client asynchrone (httpx) de l'API YouTube Data pour une boucle asyncio.
+
+    Mêmes retries, débit et quota que `YouTubeClient` ; `max_in_flight`
+    borne le nombre de requêtes simultanées vers l'hôte de l'API. À créer
+    et fermer (`aclose`) dans la boucle qui l'utilise.
+    """
+
+    def __init__(self, base_url: str = API_BASE_URL, max_in_flight: int = ASYNC_MAX_IN_FLIGHT,
+                 max_retries: int = MAX_RETRIES, requests_per_second: float = MAX_REQUESTS_PER_SECOND,
+                 daily_quota: int = DAILY_QUOTA):
+        # Import différé : httpx n'est chargé que pour le mode asynchrone
+        import httpx
+
+        super().__init__(base_url, max_retries, requests_per_second, daily_quota)
+        self._transport_errors = httpx.TransportError
+        self.http = httpx.AsyncClient(
+            timeout=REQUEST_TIMEOUT,
+            limits=httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight),
+        )
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+
+    async def aclose(self):
+        await self.http.aclose()
+
+    async def get(self, endpoint: str, params: dict) -> dict:
+        """Appelle un endpoint (ex: "videos") et renvoie le JSON, avec retries sur erreurs transitoires."""
+        api_key = params.get("key")
+        self._check_quota(endpoint, api_key)
+        url = f"{self.base_url}/{endpoint}"
+        for attempt in range(self.max_retries + 1):
+            delay = self._throttle_delay()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            retry_after = None
+            try:
+                async with self._in_flight:
+                    start = time.monotonic()
+                    response = await self.http.get(url, params=params)
+            except self._transport_errors as e:
+                self._record(endpoint, error=True)
+                if attempt == self.max_retries:
+                    raise YouTubeAPIError(endpoint, reason=type(e).__name__) from None
+            else:
+                self._record(endpoint, latency=time.monotonic() - start)
+                if not self._is_retryable(endpoint, response, api_key):
+                    self._raise_for_status(endpoint, response)
+                    return self._accepted(endpoint, response, api_key)
+                if attempt == self.max_retries:
+                    self._raise_for_status(endpoint, response)
+                retry_after = response.headers.get("Retry-After")
+            await asyncio.sleep(self._retry_delay(endpoint, attempt, retry_after))
+
+        raise RuntimeError("nombre de tentatives épuisé")
+
+
+_client: YouTubeClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> YouTubeClient:
+    """Renvoie le client partagé du processus (créé au premier appel)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = YouTubeClient()
+        return _client
+
+
+def set_client(client: YouTubeClient):
+    """Remplace le client partagé (ex: serveur local de benchmark, proxy)."""
+    global _client
+    with _client_lock:
+        _client = client